@@ -0,0 +1,103 @@
+"""
+Benchmark for clean_content over large raw page content.
+
+Compares the previous implementation (three uncompiled re.sub passes, each copying the whole
+text) with the precompiled single-pass clean_content and the incremental clean_content_stream
+fed in fixed-size chunks, on a synthetic multi-MB corpus of page text with boilerplate lines.
+
+Run from the repository root:
+    python -m benchmarks.bench_clean_content
+"""
+import argparse
+import random
+import re
+import timeit
+import tracemalloc
+
+from src.integration_nodes import clean_content, clean_content_stream
+
+WORDS = (
+    "artificial intelligence model language search result industry healthcare business "
+    "prediction transformer agent workflow retrieval context generation token latency"
+).split()
+BOILERPLATE = [
+    "Share this article on social media",
+    "Popular stories this week",
+    "Stay connected with our newsletter",
+    "Subscribe for unlimited access",
+    "© 2024 Example Media Group. All rights reserved.",
+]
+
+
+def legacy_clean_content(text):
+    """
+    The previous clean_content: three sequential re.sub passes.
+    """
+    text = re.sub(r"\b(Share|Popular|Deep Dive|Advertise|About|Help|Stay connected|Subscribe)\b.*\n?", "", text)
+    text = re.sub(r"©.*\n?", "", text)
+    text = re.sub(r"[\n\r]+", "\n", text)
+    return text.strip()
+
+
+def make_corpus(megabytes, seed=0):
+    """
+    Build synthetic raw page text: paragraphs separated by blank lines, with boilerplate lines mixed in.
+    """
+    rng = random.Random(seed)
+    lines = []
+    size = 0
+    while size < megabytes * 1024 * 1024:
+        if rng.random() < 0.15:
+            line = rng.choice(BOILERPLATE)
+        else:
+            line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))) + "."
+        line += rng.choice(["\n", "\n\n", "\r\n", "\n\n\n"])
+        lines.append(line)
+        size += len(line)
+    return "".join(lines)
+
+
+def peak_memory(func):
+    """
+    Return the peak traced memory allocated while running func, in MB.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=4.0, help="Size of the synthetic corpus.")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Chunk size for the streaming cleaner.")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per implementation (best is reported).")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.megabytes)
+    chunks = [corpus[idx:idx + args.chunk_size] for idx in range(0, len(corpus), args.chunk_size)]
+
+    def streamed():
+        for _ in clean_content_stream(iter(chunks)):
+            pass
+
+    expected = legacy_clean_content(corpus)
+    print(f"corpus: {len(corpus) / (1024 * 1024):.1f} MB, {len(chunks)} chunks of {args.chunk_size} characters")
+    print(f"outputs identical: {clean_content(corpus) == expected == ''.join(clean_content_stream(chunks))}")
+
+    for name, func in [
+        ("legacy (3 passes)", lambda: legacy_clean_content(corpus)),
+        ("single pass", lambda: clean_content(corpus)),
+        ("streaming", streamed),
+    ]:
+        elapsed = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print(
+            f"{name:<18} {elapsed * 1e3:8.1f} ms  {len(corpus) / (1024 * 1024) / elapsed:7.1f} MB/s  "
+            f"peak {peak_memory(func):6.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Offline end-to-end benchmark of the workflow against local Tavily and OpenAI stand-in servers.
+
+Starts stub servers for the Tavily /search and OpenAI /v1/chat/completions endpoints with
+log-normal latency and a configurable error rate, points the nodes at them through
+TAVILY_BASE_URL / OPENAI_BASE_URL, and drives ai_workflow and run_workflow_for_query at several
+concurrency levels. Reports throughput and p50/p95/p99 latency per level; --output writes the
+same numbers as JSON for tracking regressions.
+
+No API keys are needed, but tiktoken downloads its BPE files on first use: run it once with
+network access, or point TIKTOKEN_CACHE_DIR at a directory that holds them. The benchmark checks
+that the encoding loads before starting, and exits with status 1 when every request of a
+measurement failed, as its numbers then only time the error path.
+
+Run from the repository root:
+    python -m benchmarks.bench_e2e --concurrency 1,4,16 --requests 64 --output e2e.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+from functools import partial
+
+from src.batch import run_batch
+from benchmarks.stub_servers import tavily_stub, openai_stub, lognormal_latency
+
+TOPICS = [
+    "AI advancements in healthcare",
+    "Future of AI in business",
+    "Latest trends in machine learning",
+    "Retrieval augmented generation",
+    "Transformer model efficiency",
+]
+
+
+def percentile(values, pct):
+    """
+    Return the pct-th percentile of values, interpolating linearly between the closest ranks.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def make_queries(count, run):
+    """
+    Build distinct queries, so concurrent requests are not coalesced into one upstream call.
+    """
+    return [f"{TOPICS[idx % len(TOPICS)]} (run {run}, request {idx})" for idx in range(count)]
+
+
+def measure(name, workflow, queries, concurrency, servers):
+    """
+    Run the queries through a workflow with run_batch and summarize latency and throughput.
+    """
+    requests_before = {service: server.request_count for service, server in servers.items()}
+    batch = run_batch(queries, workflow, max_concurrency=concurrency)
+    summary = batch["summary"]
+    latencies = [entry["elapsed"] for entry in batch["entries"]]
+    return {
+        "workflow": name,
+        "concurrency": concurrency,
+        "requests": summary["total_queries"],
+        "successful": summary["successful"],
+        "failed": summary["failed"],
+        "total_time": summary["total_time"],
+        "throughput": summary["total_queries"] / summary["total_time"] if summary["total_time"] else None,
+        "latency": {
+            "mean": summary["mean_query_time"],
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": summary["max_query_time"],
+        },
+        "upstream_requests": {
+            service: server.request_count - requests_before[service] for service, server in servers.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=48, help="Queries per workflow and concurrency level.")
+    parser.add_argument("--tavily-latency", type=float, default=0.05, help="Median Tavily latency in seconds.")
+    parser.add_argument("--openai-latency", type=float, default=0.2, help="Median OpenAI latency in seconds.")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Log-normal latency spread (0 for fixed latency).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that an upstream request fails.")
+    parser.add_argument("--workflows", default="ai_workflow,run_workflow_for_query",
+                        help="Comma-separated workflows to drive.")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Hedge slow Tavily requests (see src/utils/hedging.py) and report hedge counters.")
+    parser.add_argument("--sub-queries", type=int, default=1,
+                        help="Searches per ai_workflow query; above 1 the query is fanned out (see src/fanout.py).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error sampling.")
+    parser.add_argument("--output", help="Write the results as JSON to this path ('-' for stdout).")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while the benchmark runs.")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    workflows = [name.strip() for name in args.workflows.split(",") if name.strip()]
+
+    from src.utils.tokenizer import get_encoding
+    try:
+        get_encoding()
+    except Exception as e:
+        sys.exit(f"Cannot load the tiktoken encoding ({e}). Run once with network access, "
+                 f"or set TIKTOKEN_CACHE_DIR to a directory holding the BPE files.")
+
+    tavily_server = tavily_stub(
+        latency=lognormal_latency(args.tavily_latency, args.sigma, seed=args.seed),
+        error_rate=args.error_rate, seed=args.seed
+    )
+    openai_server = openai_stub(
+        latency=lognormal_latency(args.openai_latency, args.sigma, seed=args.seed + 1),
+        error_rate=args.error_rate, seed=args.seed + 1
+    )
+    servers = {"tavily": tavily_server, "openai": openai_server}
+
+    with tavily_server, openai_server:
+        os.environ.setdefault("TAVILY_API_KEY", "benchmark-key")
+        os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+        os.environ["TAVILY_BASE_URL"] = tavily_server.url
+        os.environ["OPENAI_BASE_URL"] = f"{openai_server.url}/v1"
+        # Imported after the environment points at the stand-ins; src.main configures logging on import
+        from src.integration_nodes import TavilyAPI, OpenAINode, DEFAULT_POOL_SIZE
+        from src.langgraph_workflow import ai_workflow, WorkflowEngine, set_default_engine
+        from src.main import run_workflow_for_query
+        from src.utils.hedging import HedgePolicy
+        logging.getLogger().setLevel(args.log_level.upper())
+
+        pool_size = max(max(levels) * args.sub_queries, DEFAULT_POOL_SIZE)
+        hedge_policy = HedgePolicy() if args.hedge else None
+        engine = WorkflowEngine(pool_size=pool_size, hedge_policy=hedge_policy, sub_queries=args.sub_queries)
+        set_default_engine(engine)  # Shared by every ai_workflow call
+        tavily_api = TavilyAPI(pool_size=pool_size, hedge_policy=hedge_policy)
+        openai_node = OpenAINode()
+        drivers = {
+            "ai_workflow": ai_workflow,
+            "run_workflow_for_query": partial(run_workflow_for_query, tavily_api=tavily_api, openai_node=openai_node),
+        }
+
+        results = []
+        for name in workflows:
+            for concurrency in levels:
+                queries = make_queries(args.requests, run=len(results))
+                result = measure(name, drivers[name], queries, concurrency, servers)
+                result["valid"] = result["successful"] > 0
+                results.append(result)
+                latency = result["latency"]
+                print(
+                    f"{name:<24} c={concurrency:<4} {result['throughput']:7.1f} req/s  "
+                    f"p50 {latency['p50'] * 1e3:7.1f} ms  p95 {latency['p95'] * 1e3:7.1f} ms  "
+                    f"p99 {latency['p99'] * 1e3:7.1f} ms  failed {result['failed']}/{result['requests']}"
+                    f"{'' if result['valid'] else '  INVALID: every request failed'}",
+                    file=sys.stderr if args.output == "-" else sys.stdout
+                )
+        tavily_api.close()
+        engine.close()
+        if hedge_policy is not None:
+            hedging = hedge_policy.metrics()
+            print(
+                f"hedging: {hedging['hedges']} hedges for {hedging['requests']} Tavily requests, "
+                f"{hedging['hedges_won']} won, {hedging['throttled']} throttled, delay {hedging['delay'] * 1e3:.1f} ms",
+                file=sys.stderr if args.output == "-" else sys.stdout
+            )
+
+    if args.output:
+        report = {
+            "benchmark": "e2e",
+            "python": platform.python_version(),
+            "config": {
+                "concurrency": levels,
+                "requests": args.requests,
+                "tavily_latency": args.tavily_latency,
+                "openai_latency": args.openai_latency,
+                "sigma": args.sigma,
+                "error_rate": args.error_rate,
+                "seed": args.seed,
+                "hedge": args.hedge,
+                "sub_queries": args.sub_queries,
+            },
+            "results": results,
+        }
+        if hedge_policy is not None:
+            report["hedging"] = hedge_policy.metrics()
+        if args.output == "-":
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if not all(result["valid"] for result in results):
+        sys.exit("Every request of at least one measurement failed; its numbers are not valid.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Import-time benchmark for CLI and worker cold start.
+
+Imports a module in fresh interpreters with `python -X importtime` and reports the median
+cumulative import time, the modules with the largest self time, and whether any of the heavy
+libraries (openai, requests, httpx, tiktoken, numpy, dotenv, langchain) were loaded eagerly.
+With --budget-ms the exit status is non-zero when the median exceeds the budget or a heavy
+library is loaded, so the check can run in CI to catch regressions.
+
+Run from the repository root:
+    python -m benchmarks.bench_import_time --module src.langgraph_workflow --budget-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("openai", "requests", "httpx", "tiktoken", "numpy", "dotenv", "langchain")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module):
+    """
+    Import a module in a fresh isolated interpreter and return its -X importtime profile.
+
+    Returns:
+        tuple: ({module name: (self_us, cumulative_us)}, list of heavy modules that got loaded).
+    """
+    code = (
+        f"import sys; sys.path.insert(0, {ROOT!r}); import {module}; "
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    # -I ignores PYTHON* variables and user site-packages, so only the imports of the module are measured
+    completed = subprocess.run(
+        [sys.executable, "-I", "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    loaded = [name for name in completed.stdout.strip().split(",") if name]
+    return timings, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.langgraph_workflow", help="Module to import.")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters to measure.")
+    parser.add_argument("--top", type=int, default=10, help="Modules with the largest self time to list.")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import time exceeds this.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    totals = []
+    timings, loaded = {}, []
+    for _ in range(args.runs):
+        timings, loaded = import_profile(args.module)
+        totals.append(timings[args.module][1] / 1000)
+    median = statistics.median(totals)
+    slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    over_budget = args.budget_ms is not None and median > args.budget_ms
+
+    if args.json:
+        print(json.dumps({
+            "module": args.module,
+            "runs": args.runs,
+            "median_ms": median,
+            "min_ms": min(totals),
+            "heavy_modules_loaded": loaded,
+            "slowest_self_ms": {name: self_us / 1000 for name, (self_us, _) in slowest},
+            "budget_ms": args.budget_ms,
+        }, indent=2))
+    else:
+        print(f"import {args.module}: median {median:.1f} ms, min {min(totals):.1f} ms over {args.runs} runs")
+        print(f"heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+        print("largest self time:")
+        for name, (self_us, cumulative_us) in slowest:
+            print(f"  {self_us / 1000:8.2f} ms  (cumulative {cumulative_us / 1000:8.2f} ms)  {name}")
+
+    if loaded or over_budget:
+        if over_budget:
+            print(f"FAIL: median import time {median:.1f} ms exceeds the {args.budget_ms:.1f} ms budget", file=sys.stderr)
+        if loaded:
+            print(f"FAIL: heavy modules loaded at import: {', '.join(loaded)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
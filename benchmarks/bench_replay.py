@@ -0,0 +1,110 @@
+"""
+Replay a recorded upstream cassette through the workflow for offline profiling.
+
+Record a cassette by running any workload with the cassette in record mode, e.g. against the live
+APIs:
+    UPSTREAM_CASSETTE=upstream.jsonl.gz UPSTREAM_CASSETTE_MODE=record python -m src.batch_cli queries.jsonl
+
+This driver then re-runs the recorded search queries through ai_workflow with every Tavily and
+OpenAI call answered from the cassette (see src/utils/cassette.py): --latency original keeps the
+recorded upstream timing, --latency none removes it so only the local work is measured.
+--profile writes cProfile stats of the run and prints the top functions; profiling runs the
+queries on the main thread, as cProfile only sees the thread it was started on. No API keys or
+upstream access are needed; tiktoken still needs its BPE files, downloaded on first use or found
+in TIKTOKEN_CACHE_DIR.
+
+Run from the repository root:
+    python -m benchmarks.bench_replay upstream.jsonl.gz --latency none --repeat 5 --profile replay.prof
+"""
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import sys
+from time import perf_counter
+
+from src.utils.cassette import Cassette, set_cassette
+
+
+def recorded_queries(cassette):
+    """
+    Return the distinct search queries of a cassette in the order they were sent.
+    """
+    queries = []
+    for interaction in sorted(cassette.interactions, key=lambda item: item.get("started", 0)):
+        query = (interaction.get("request") or {}).get("query") if interaction["service"] == "tavily" else None
+        if isinstance(query, str) and query not in queries:
+            queries.append(query)
+    return queries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="Cassette recorded with UPSTREAM_CASSETTE_MODE=record.")
+    parser.add_argument("--latency", choices=["original", "none"], default="none",
+                        help="Replay the recorded upstream latency, or none of it.")
+    parser.add_argument("--repeat", type=int, default=1, help="Times every recorded query is replayed.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Queries run at once (ignored with --profile, which runs them one at a time).")
+    parser.add_argument("--lenient", action="store_true",
+                        help="Serve the next recorded response of the same endpoint to requests whose body was not "
+                             "recorded, instead of failing them.")
+    parser.add_argument("--profile", help="Write cProfile stats to this path.")
+    parser.add_argument("--top", type=int, default=25, help="Functions printed from the profile.")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while the replay runs.")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette, mode="replay", latency=args.latency, strict=not args.lenient)
+    queries = recorded_queries(cassette)
+    if not queries:
+        sys.exit(f"No Tavily searches recorded in {args.cassette}.")
+    set_cassette(cassette)
+
+    # Keys are stripped from cassettes; any value works in replay
+    os.environ.setdefault("TAVILY_API_KEY", "replay-key")
+    os.environ.setdefault("OPENAI_API_KEY", "replay-key")
+    # Imported after the cassette is set; src.main configures logging on import
+    from src.batch import run_batch
+    from src.langgraph_workflow import ai_workflow, get_default_engine
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    workload = queries * args.repeat
+    ai_workflow(workload[0])  # Create the clients and load lazy imports outside the measurement
+
+    start = perf_counter()
+    if args.profile:
+        profiler = cProfile.Profile()
+        latencies, failed = [], 0
+        for query in workload:
+            query_start = perf_counter()
+            profiler.enable()
+            results = ai_workflow(query)
+            profiler.disable()
+            latencies.append(perf_counter() - query_start)
+            failed += "error" in results
+    else:
+        batch = run_batch(workload, ai_workflow, max_concurrency=args.concurrency)
+        latencies = [entry["elapsed"] for entry in batch["entries"]]
+        failed = batch["summary"]["failed"]
+    elapsed = perf_counter() - start
+    get_default_engine().close()
+
+    stats = cassette.stats()
+    print(f"{len(queries)} recorded queries x {args.repeat}, latency {args.latency}: "
+          f"{len(workload) / elapsed:.1f} queries/s, p50 {percentile(latencies, 50) * 1e3:.2f} ms, "
+          f"p99 {percentile(latencies, 99) * 1e3:.2f} ms, failed {failed}/{len(workload)}")
+    print(f"upstream calls replayed {stats['replayed']}, unmatched bodies {stats['fallbacks']}, "
+          f"misses {stats['misses']}")
+    if args.profile:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
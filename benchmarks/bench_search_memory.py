@@ -0,0 +1,94 @@
+"""
+Memory benchmark for the search results a batch keeps alive.
+
+Builds synthetic Tavily JSON bodies shaped like real responses (answer, images, follow-up
+questions, per-result raw_content and published_date), decodes them as the node does, and
+measures with tracemalloc how much memory retaining them costs per query: as the raw decoded
+JSON (the previous behaviour), and as the compact SearchResponse records of src.search_results,
+with and without keep_raw.
+
+Run from the repository root:
+    python -m benchmarks.bench_search_memory --queries 2000 --results 5
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+
+from src.search_results import parse_search_response
+
+WORDS = (
+    "artificial intelligence model language search result industry healthcare business "
+    "prediction transformer agent workflow retrieval context generation token latency"
+).split()
+
+
+def make_body(query_id, results, content_words, raw_words, rng):
+    """
+    Build a Tavily-like JSON response body for one query.
+    """
+    def text(words):
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    return json.dumps({
+        "query": f"query {query_id}",
+        "follow_up_questions": [text(8) for _ in range(3)],
+        "answer": text(60),
+        "images": [f"https://images.example.com/{query_id}/{idx}.jpg" for idx in range(5)],
+        "results": [
+            {
+                "title": text(8),
+                "url": f"https://example.com/{query_id}/{idx}",
+                "content": text(content_words),
+                "score": rng.random(),
+                "raw_content": text(raw_words) if raw_words else None,
+                "published_date": "2024-05-01",
+            }
+            for idx in range(results)
+        ],
+        "response_time": round(rng.uniform(0.5, 2.0), 2),
+    })
+
+
+def retained_bytes(bodies, parse):
+    """
+    Return the memory still allocated after parsing every body and keeping the results.
+    """
+    gc.collect()
+    tracemalloc.start()
+    kept = [parse(json.loads(body)) for body in bodies]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000, help="Responses kept in memory.")
+    parser.add_argument("--results", type=int, default=5, help="Search results per response.")
+    parser.add_argument("--content-words", type=int, default=60, help="Words per result snippet.")
+    parser.add_argument("--raw-words", type=int, default=0,
+                        help="Words of raw_content per result (Tavily's include_raw_content; 0 sends null).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic text.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bodies = [make_body(idx, args.results, args.content_words, args.raw_words, rng) for idx in range(args.queries)]
+
+    variants = [
+        ("raw JSON dicts", lambda payload: payload),
+        ("SearchResponse", lambda payload: parse_search_response(payload)),
+        ("SearchResponse (keep_raw)", lambda payload: parse_search_response(payload, keep_raw=True)),
+    ]
+    baseline = None
+    for name, parse in variants:
+        per_query = retained_bytes(bodies, parse) / args.queries
+        baseline = baseline or per_query
+        print(f"{name:<26} {per_query / 1024:8.2f} KiB/query  ({per_query / baseline:6.1%} of raw)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark for the semantic answer cache at large sizes.
+
+Fills a SemanticCache with synthetic queries (3-8 content words drawn from a random vocabulary),
+then reports insert throughput, lookup latency percentiles for paraphrased (hit) and unrelated
+(miss) queries, the index size, and the time to save and reload it.
+
+Run from the repository root:
+    python -m benchmarks.bench_semantic_cache --entries 100000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+from time import perf_counter
+
+from src.semantic_cache import SemanticCache
+
+
+def make_vocabulary(size, rng):
+    """
+    Build random pseudo-words of 4-10 letters.
+    """
+    return ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100000, help="Queries stored in the cache.")
+    parser.add_argument("--lookups", type=int, default=2000, help="Lookups per measurement.")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="Distinct content words.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic queries.")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    queries = [" ".join(rng.sample(vocabulary, rng.randint(3, 8))) for _ in range(args.entries)]
+    cache = SemanticCache(max_entries=args.entries)
+
+    start = perf_counter()
+    for idx, query in enumerate(queries):
+        cache.store(query, {"gpt_response": f"Answer {idx}"})
+    elapsed = perf_counter() - start
+    print(f"store                {args.entries / elapsed:10.0f} entries/s  ({len(cache)} entries)")
+
+    # Paraphrases: the same words reordered, capitalized and punctuated differently
+    paraphrases = []
+    for query in rng.sample(queries, min(args.lookups, len(queries))):
+        words = query.split()
+        rng.shuffle(words)
+        paraphrases.append(f"{', '.join(words).title()}?")
+    unrelated = [" ".join(rng.sample(vocabulary, rng.randint(3, 8))) for _ in range(args.lookups)]
+
+    for name, lookups in [("lookup (paraphrase)", paraphrases), ("lookup (unrelated)", unrelated)]:
+        latencies = []
+        hits = 0
+        for query in lookups:
+            start = perf_counter()
+            hits += cache.lookup(query) is not None
+            latencies.append(perf_counter() - start)
+        print(
+            f"{name:<20} p50 {percentile(latencies, 50) * 1e3:6.3f} ms  p99 {percentile(latencies, 99) * 1e3:6.3f} ms  "
+            f"hit rate {hits / len(lookups):6.1%}"
+        )
+
+    latencies = []
+    for query in paraphrases[:200]:
+        start = perf_counter()
+        cache.search(query, k=10)
+        latencies.append(perf_counter() - start)
+    print(f"{'search (top-10)':<20} p50 {percentile(latencies, 50) * 1e3:6.3f} ms  p99 {percentile(latencies, 99) * 1e3:6.3f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "semantic_cache.npz")
+        start = perf_counter()
+        cache.save(path)
+        saved = perf_counter() - start
+        start = perf_counter()
+        reloaded = SemanticCache(max_entries=args.entries, path=path)
+        loaded = perf_counter() - start
+        print(f"save {saved:.2f} s, load {loaded:.2f} s, {os.path.getsize(path) / 2**20:.1f} MiB, "
+              f"{len(reloaded)} entries reloaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark of per-request latency for TavilyAPI.search against a local stub server.
+
+Compares unpooled requests.post calls (a new connection per request) with the pooled,
+keep-alive session owned by TavilyAPI. The savings grow with real TLS endpoints, where each
+new connection also pays a TLS handshake.
+
+Run from the repository root:
+    python -m benchmarks.bench_tavily_session --requests 500
+"""
+import argparse
+import os
+import time
+
+import requests
+
+from benchmarks.stub_servers import tavily_stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="Sequential requests per measurement.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated server latency in seconds.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("TAVILY_API_KEY", "benchmark-key")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+    from src.integration_nodes import TavilyAPI  # Imported after the dummy keys are set
+
+    with tavily_stub(latency=args.latency) as server:
+        url = f"{server.url}/search"
+        payload = {"query": "AI advancements", "api_key": "benchmark-key"}
+
+        connections_before = server.connection_count
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            requests.post(url, json=payload).raise_for_status()
+        unpooled = (time.perf_counter() - start) / args.requests
+        unpooled_connections = server.connection_count - connections_before
+
+        tavily_api = TavilyAPI()
+        tavily_api.base_url = url
+        connections_before = server.connection_count
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            assert tavily_api.search("AI advancements") is not None
+        pooled = (time.perf_counter() - start) / args.requests
+        pooled_connections = server.connection_count - connections_before
+        tavily_api.close()
+
+    print(f"unpooled requests.post  {unpooled * 1e3:8.3f} ms/request  ({unpooled_connections} connections)")
+    print(f"pooled TavilyAPI        {pooled * 1e3:8.3f} ms/request  ({pooled_connections} connections)")
+    print(f"saved per request       {(unpooled - pooled) * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark for token counting in process_search_results.
+
+Compares the previous implementation (encoding lookup + encode per result) with the cached
+encoding and batched, memoized counting in src.utils.tokenizer.
+
+Run from the repository root (requires the tiktoken BPE files, downloaded on first use):
+    python -m benchmarks.bench_tokenizer
+"""
+import argparse
+import random
+import timeit
+
+import tiktoken
+
+from src.utils.tokenizer import count_tokens_batch, clear_token_memo
+
+WORDS = (
+    "artificial intelligence model language search result industry healthcare business "
+    "prediction transformer agent workflow retrieval context generation token latency"
+).split()
+
+
+def legacy_count_tokens(text):
+    """
+    The previous count_tokens: looks up the encoding on every call.
+    """
+    tokenizer = tiktoken.encoding_for_model("gpt-4")
+    return len(tokenizer.encode(text))
+
+
+def make_snippets(count, words_per_snippet, seed=0):
+    """
+    Build synthetic search result snippets.
+    """
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_snippet)) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=5, help="Search results per query.")
+    parser.add_argument("--words", type=int, default=150, help="Words per result snippet.")
+    parser.add_argument("--queries", type=int, default=200, help="Simulated queries per measurement.")
+    args = parser.parse_args()
+
+    snippets = make_snippets(args.results, args.words)
+
+    def legacy():
+        for _ in range(args.queries):
+            [legacy_count_tokens(snippet) for snippet in snippets]
+
+    def batched_cold():
+        for _ in range(args.queries):
+            clear_token_memo()
+            count_tokens_batch(snippets)
+
+    def batched_warm():
+        for _ in range(args.queries):
+            count_tokens_batch(snippets)
+
+    count_tokens_batch(snippets)  # Load the encoding outside the timed region
+
+    for name, func in [("legacy", legacy), ("batched (cold memo)", batched_cold), ("batched (warm memo)", batched_warm)]:
+        elapsed = min(timeit.repeat(func, number=1, repeat=5))
+        print(f"{name:<22} {elapsed / args.queries * 1e6:10.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
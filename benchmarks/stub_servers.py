@@ -0,0 +1,260 @@
+"""
+Local stand-ins for the Tavily and OpenAI HTTP APIs, used by the benchmarks and the tests.
+"""
+import json
+import logging
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+def default_search_response(query):
+    """
+    Build a canned Tavily search response for a query.
+    """
+    return {
+        "query": query,
+        "results": [
+            {
+                "title": f"Result {idx} for {query}",
+                "url": f"http://example.com/{idx}",
+                "content": f"Synthetic search result {idx} about {query}.",
+                "score": 1.0 - idx / 10,
+            }
+            for idx in range(1, 4)
+        ],
+    }
+
+
+def default_completion(messages):
+    """
+    Build a canned assistant answer for a chat messages payload.
+    """
+    prompt = messages[-1].get("content", "") if messages else ""
+    query = prompt.rsplit("Answer the query:", 1)[-1].strip()
+    return f"Synthetic answer about {query}."
+
+
+def lognormal_latency(median, sigma=0.5, seed=None):
+    """
+    Build a latency sampler with a log-normal distribution, the usual shape of upstream API latency.
+
+    Args:
+        median (float): Median latency in seconds.
+        sigma (float): Spread of the underlying normal distribution; 0.5 puts p99 at about 3.2x the median.
+        seed (int, optional): Seed for reproducible samples.
+
+    Returns:
+        callable: Returns one latency sample in seconds per call.
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def sample():
+        with lock:
+            return median * math.exp(rng.gauss(0.0, sigma))
+
+    return sample
+
+
+def _upstream_simulator(latency, error_rate, seed):
+    """
+    Build a function that sleeps for one latency sample and reports whether the request should fail.
+
+    latency is a number of seconds or a sampler such as lognormal_latency(); error_rate is the
+    probability of failing a request.
+    """
+    sample_latency = latency if callable(latency) else (lambda: latency)
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def simulate():
+        delay = sample_latency()
+        if delay > 0:
+            time.sleep(delay)
+        with lock:
+            return rng.random() < error_rate
+
+    return simulate
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that dispatches POST requests to the owning server's routes.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True  # Headers and body are separate writes; avoid delayed-ACK stalls
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Invalid JSON body."})
+            return
+
+        route = self.server.routes.get(self.path)
+        if route is None:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        self.server.record_request(self.path, body)
+        status, payload = route(body)
+        self._send_json(status, payload)
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Local HTTP stand-in for upstream APIs, served from a background thread.
+
+    Routes map a request path to a function taking the parsed JSON body and returning
+    (status, payload). Use as a context manager; the server listens on an ephemeral port.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, routes, host="127.0.0.1", port=0):
+        super().__init__((host, port), _StubHandler)
+        self.routes = routes
+        self.request_count = 0
+        self.connection_count = 0
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self, path, body):
+        with self._count_lock:
+            self.request_count += 1
+
+    def process_request(self, request, client_address):
+        with self._count_lock:
+            self.connection_count += 1
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        # Clients that time out and hang up are expected in tests; do not print tracebacks
+        logger.debug(f"Error handling request from {client_address}", exc_info=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def tavily_stub(latency=0.0, response_factory=default_search_response, error_rate=0.0, error_status=500,
+                seed=None):
+    """
+    Create a StubServer that answers POST /search like the Tavily API.
+
+    Args:
+        latency (float or callable): Seconds to wait before answering each request, or a sampler
+            such as lognormal_latency() returning them.
+        response_factory (callable): Builds the response payload from the query.
+        error_rate (float): Probability of answering a request with error_status instead.
+        error_status (int): HTTP status of simulated failures.
+        seed (int, optional): Seed for reproducible failures.
+
+    Returns:
+        StubServer: A server that is not started yet; use it as a context manager.
+    """
+    simulate = _upstream_simulator(latency, error_rate, seed)
+
+    def search(body):
+        failed = simulate()
+        if not body.get("api_key"):
+            return 401, {"error": "Missing API key."}
+        if failed:
+            return error_status, {"error": "Simulated upstream error."}
+        return 200, response_factory(body.get("query", ""))
+
+    return StubServer({"/search": search})
+
+
+def openai_stub(latency=0.0, completion_factory=default_completion, error_rate=0.0, error_status=500,
+                seed=None):
+    """
+    Create a StubServer that answers POST /v1/chat/completions like the OpenAI API (without streaming).
+
+    Point clients at it with base_url=f"{server.url}/v1" (or OPENAI_BASE_URL).
+
+    Args:
+        latency (float or callable): Seconds to wait before answering each request, or a sampler
+            such as lognormal_latency() returning them.
+        completion_factory (callable): Builds the answer text from the messages payload.
+        error_rate (float): Probability of answering a request with error_status instead.
+        error_status (int): HTTP status of simulated failures.
+        seed (int, optional): Seed for reproducible failures.
+
+    Returns:
+        StubServer: A server that is not started yet; use it as a context manager.
+    """
+    simulate = _upstream_simulator(latency, error_rate, seed)
+
+    def chat_completions(body):
+        failed = simulate()
+        if failed:
+            return error_status, {"error": {"message": "Simulated upstream error.", "type": "server_error"}}
+        if body.get("stream"):
+            return 400, {"error": {"message": "Streaming is not supported by the stub.", "type": "invalid_request_error"}}
+
+        messages = body.get("messages", [])
+        content = completion_factory(messages)
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in messages)
+        words = content.split()
+        finish_reason = "stop"
+        if body.get("max_tokens") is not None and len(words) > body["max_tokens"]:
+            # Words stand in for tokens: cut the answer at max_tokens like the API does
+            words = words[:body["max_tokens"]]
+            content, finish_reason = " ".join(words), "length"
+        completion_tokens = len(words)
+        return 200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return StubServer({"/v1/chat/completions": chat_completions})
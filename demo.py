@@ -1,9 +1,11 @@
 import logging
 import re
+from functools import partial
 from src.utils.logger_config import configure_logging
 from src.utils.config import get_api_keys
 from src.integration_nodes import TavilyAPI, OpenAINode, logger
-from src.langgraph_workflow import fetch_search_results, process_search_results, generate_response, logger
+from src.langgraph_workflow import fetch_search_results, process_search_results, generate_response, ai_workflow_stream, logger
+from src.batch import run_batch, DEFAULT_MAX_CONCURRENCY
 
 
 # Set logging level to WARNING for minimal logs
@@ -39,7 +41,7 @@ def process_query(query, tavily_api, openai_node):
         return {"error": "No results were found for your query. Ensure your query is relevant and try again."}
 
     logging.info("Processing search results...")
-    context = process_search_results(search_results)
+    context = process_search_results(search_results, query=query)
     if not context:
         logging.warning("No valid content found for context generation.")
         return {
@@ -101,7 +103,48 @@ def display_results(query, results):
         print(gpt_response)
 
 
-def predefined_demo(tavily_api, openai_node):
+def display_stream(query, tavily_api, openai_node):
+    """
+    Run the streaming workflow for a query and print the response as it is generated.
+    """
+    print(f"\n✨ === Workflow Results for Query: '{query}' === ✨\n")
+
+    if not query.strip():
+        print(
+            "❌ Error: The query cannot be empty. Please type a question or phrase to search for. "
+            "Example: 'Explain the role of AI in healthcare.'"
+        )
+        return
+
+    result = {}
+    streaming = False
+    for event in ai_workflow_stream(query, tavily_api, openai_node):
+        if event["type"] == "search_results":
+            print("🔍 --- Search Results ---\n")
+            for idx, item in enumerate(event["search_results"].get("results", [])[:3], 1):
+                print(f"{idx}. {item.get('title', 'No Title')}\n   URL: {item.get('url', 'No URL')}")
+        elif event["type"] == "delta":
+            if not streaming:
+                print("\n🧠 --- Generated Response ---\n")
+                streaming = True
+            print(event["content"], end="", flush=True)
+        elif event["type"] == "result":
+            result = event["result"]
+
+    if streaming:
+        print()
+    if "error" in result:
+        print(f"❌ Error: {result['error']}")
+
+    timings = result.get("timings")
+    if timings and timings["time_to_first_token"] is not None:
+        print(
+            f"\n⏱️ First token after {timings['time_to_first_token']:.2f} seconds, "
+            f"full response in {timings['generation_time']:.2f} seconds."
+        )
+
+
+def predefined_demo(tavily_api, openai_node, max_concurrency=DEFAULT_MAX_CONCURRENCY):
     predefined_queries = [
         "Who is serving as the President of the United States in 2024?",
         "Latest AI advancements",
@@ -114,12 +157,26 @@ def predefined_demo(tavily_api, openai_node):
     ]
 
     print("\n--- Running Predefined Demo Queries ---")
+    valid_queries = [query for query in predefined_queries if query is not None]  # Skip None queries explicitly
+    batch = run_batch(
+        valid_queries,
+        partial(process_query, tavily_api=tavily_api, openai_node=openai_node),
+        max_concurrency=max_concurrency
+    )
+
+    entries = iter(batch["entries"])
     for query in predefined_queries:
-        if query is None:  # Skip None queries explicitly
+        if query is None:
             print("\n❌ Skipping invalid query: None")
             continue
-        results = process_query(query, tavily_api, openai_node)
-        display_results(query, results)
+        display_results(query, next(entries)["results"])
+
+    summary = batch["summary"]
+    print(
+        f"\n⏱️ Completed {summary['total_queries']} queries "
+        f"({summary['successful']} succeeded, {summary['failed']} failed) "
+        f"in {summary['total_time']:.2f} seconds."
+    )
 
 
 def demo():
@@ -145,8 +202,7 @@ def demo():
             predefined_demo(tavily_api, openai_node)
         else:
             logging.info(f"Processing query: {query}")
-            results = process_query(query, tavily_api, openai_node)
-            display_results(query, results)
+            display_stream(query, tavily_api, openai_node)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from time import perf_counter
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 4  # Workers in flight at once; bounded to stay within API rate limits
+
+
+def run_batch(queries, workflow, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    Run a workflow over many queries concurrently with a bounded worker pool.
+
+    Args:
+        queries (list): The queries to run. Invalid entries (None, empty) are passed through
+            to the workflow, which is expected to return an error dict for them.
+        workflow (callable): Called as workflow(query) and returns a result/error dict,
+            e.g. functools.partial(run_workflow_for_query, tavily_api=..., openai_node=...).
+        max_concurrency (int): Maximum number of queries processed at the same time.
+
+    Returns:
+        dict: "entries" holds one {"query", "results", "elapsed"} dict per query, in input
+        order, and "summary" holds the timing summary (see summarize_batch).
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+
+    queries = list(queries)
+    start_time = perf_counter()
+
+    if not queries:
+        entries = []
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(queries))) as executor:
+            # executor.map yields results in input order regardless of completion order
+            entries = list(executor.map(lambda query: run_one(workflow, query), queries))
+
+    total_time = perf_counter() - start_time
+    return {"entries": entries, "summary": summarize_batch(entries, total_time)}
+
+
+def iter_batch(queries, workflow, max_concurrency=DEFAULT_MAX_CONCURRENCY, max_pending=None):
+    """
+    Run a workflow over a stream of queries concurrently, yielding entries as they complete.
+
+    Unlike run_batch, queries are consumed lazily and at most max_pending of them are held at a
+    time, so memory stays constant however long the input is. Closing the generator early cancels
+    the queries that have not started and waits for the running ones.
+
+    Args:
+        queries (iterable): The queries to run; may be a generator.
+        workflow (callable): Called as workflow(query) and returns a result/error dict.
+        max_concurrency (int): Maximum number of queries processed at the same time.
+        max_pending (int, optional): Queries submitted but not yet yielded; defaults to twice
+            max_concurrency, so workers never wait for the next query to be read.
+
+    Yields:
+        dict: {"index", "query", "results", "elapsed"} per query in completion order, where index
+        is the position of the query in the input.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    max_pending = max(max_pending or 2 * max_concurrency, max_concurrency)
+
+    numbered = enumerate(queries)
+    pending = set()
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        try:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        index, query = next(numbered)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(run_one, workflow, query, index))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def run_one(workflow, query, index=None):
+    """
+    Run the workflow for one query, turning exceptions into an error dict and timing the call.
+
+    Returns:
+        dict: {"query", "results", "elapsed"}, plus "index" when given.
+    """
+    workflow_start = perf_counter()
+    try:
+        results = workflow(query)
+    except Exception as e:
+        logger.error(f"Unexpected error running workflow for query '{query}': {e}")
+        results = {"error": f"Unexpected error running workflow: {str(e)}"}
+    elapsed = perf_counter() - workflow_start
+    logger.info(f"Workflow for query '{query}' completed in {elapsed:.2f} seconds.")
+    entry = {"query": query, "results": results, "elapsed": elapsed}
+    if index is not None:
+        entry["index"] = index
+    return entry
+
+
+def is_successful(results):
+    """
+    Check whether a workflow result contains both search results and a generated response.
+    """
+    return (
+        isinstance(results, dict)
+        and "error" not in results
+        and bool(results.get("search_results"))
+        and bool(results.get("gpt_response"))
+    )
+
+
+def summarize_batch(entries, total_time):
+    """
+    Build the timing summary for a batch run.
+
+    Args:
+        entries (list): Entries as produced by run_batch.
+        total_time (float): Wall time of the whole batch in seconds.
+
+    Returns:
+        dict: Total/successful/failed counts, total wall time, the average wall time per
+        query and the mean and max of the individual per-query timings.
+    """
+    total = len(entries)
+    successful = sum(1 for entry in entries if is_successful(entry["results"]))
+    timings = [entry["elapsed"] for entry in entries]
+
+    return {
+        "total_queries": total,
+        "successful": successful,
+        "failed": total - successful,
+        "total_time": total_time,
+        "average_time": total_time / total if total else 0.0,
+        "mean_query_time": sum(timings) / total if total else 0.0,
+        "max_query_time": max(timings, default=0.0),
+    }
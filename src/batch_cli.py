@@ -0,0 +1,224 @@
+"""
+Streaming JSONL batch runner for offline jobs.
+
+Reads queries from a JSONL file (or stdin), one per line: either an object such as
+{"id": "q-1", "query": "..."} or a bare JSON string. Queries run concurrently on a shared
+WorkflowEngine and every result is appended to the output as one JSON line as soon as it
+completes, so memory stays constant however long the input is. Ids default to the line number.
+
+The output doubles as the checkpoint. With --resume, queries whose id already has a line in the
+output are skipped, so a crashed or killed run picks up where it stopped without re-running (and
+re-billing) completed queries; --retry-failed also re-runs queries whose recorded result failed.
+Results are written in completion order; when an id appears more than once the last line wins.
+
+Run from the repository root:
+    python -m src.batch_cli queries.jsonl --output results.jsonl --max-concurrency 8 --resume
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from time import perf_counter
+
+from src.batch import iter_batch, is_successful, DEFAULT_MAX_CONCURRENCY
+from src.search_results import json_default
+from src.utils.config import get_api_keys
+from src.utils.logger_config import configure_logging
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_FSYNC_EVERY = 100  # Results written between fsyncs of the output
+
+
+def read_queries(lines, skip_ids=()):
+    """
+    Parse JSONL input lazily into (id, query) pairs.
+
+    Blank lines are skipped but still counted, so line-number ids stay stable across runs. A
+    record without an id, or with a null one, gets its line number as id. Lines that are not
+    valid JSON, or whose id is not a string or number (a list or object cannot be matched
+    against the checkpoint), yield their line number and a None query, which the workflow
+    reports as an error.
+
+    Args:
+        lines (iterable): Lines of the input file.
+        skip_ids (set): Ids already completed, to leave out.
+
+    Yields:
+        tuple: (id, query).
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            logger.error(f"Line {line_number} is not valid JSON; recording it as failed.")
+            record = None
+        if isinstance(record, dict):
+            query_id, query = record.get("id"), record.get("query")
+            if query_id is None:
+                query_id = line_number  # A null id would make every null-id record look completed on resume
+            if isinstance(query_id, (list, dict)):
+                logger.error(f"Line {line_number} has an id that is not a string or number; recording it as failed.")
+                query_id, query = line_number, None
+        else:
+            query_id, query = line_number, record if isinstance(record, str) else None
+        if query_id in skip_ids:
+            continue
+        yield query_id, query
+
+
+def load_checkpoint(path, retry_failed=False):
+    """
+    Read the ids already completed from an existing output file and cut off a partial last line.
+
+    A run killed mid-write can leave an incomplete line at the end; it is truncated so the resumed
+    run appends after the last complete result.
+
+    Args:
+        path (str): The output file of the previous run.
+        retry_failed (bool): Only count ids with a successful result as completed.
+
+    Returns:
+        set: The completed ids; empty if the file does not exist.
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+
+    valid_length = 0
+    with open(path, "rb+") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Partial write from an interrupted run
+            valid_length += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or isinstance(record.get("id"), (list, dict)):
+                continue
+            if record.get("id") is not None and (record.get("ok") or not retry_failed):
+                completed.add(record["id"])
+        if f.tell() != valid_length:
+            logger.warning(f"Truncating an incomplete last line in {path}.")
+            f.truncate(valid_length)
+    return completed
+
+
+def run_jobs(lines, output, workflow, max_concurrency=DEFAULT_MAX_CONCURRENCY, skip_ids=(), max_pending=None,
+             fsync_every=DEFAULT_FSYNC_EVERY):
+    """
+    Run every query of a JSONL stream and write one JSON line per result as it completes.
+
+    Args:
+        lines (iterable): Lines of the JSONL input.
+        output (file): Text file the results are written to.
+        workflow (callable): Called as workflow(query) and returns a result/error dict.
+        max_concurrency (int): Maximum number of queries processed at the same time.
+        skip_ids (set): Ids already completed by an earlier run.
+        max_pending (int, optional): Queries read ahead of the results written (see iter_batch).
+        fsync_every (int): Results written between fsyncs; 0 only flushes.
+
+    Returns:
+        dict: Counts of processed, successful and failed queries, of input lines skipped because
+        their id was in skip_ids, wall time and query timings.
+    """
+    start_time = perf_counter()
+    summary = {"total_queries": 0, "successful": 0, "failed": 0, "skipped": 0, "total_time": 0.0,
+               "mean_query_time": 0.0, "max_query_time": 0.0}
+    pending_ids = {}
+    query_time = 0.0
+
+    def queries():
+        index = 0
+        for query_id, query in read_queries(lines):
+            if query_id in skip_ids:
+                summary["skipped"] += 1
+                continue
+            pending_ids[index] = query_id
+            index += 1
+            yield query
+
+    for entry in iter_batch(queries(), workflow, max_concurrency=max_concurrency, max_pending=max_pending):
+        ok = is_successful(entry["results"])
+        record = {
+            "id": pending_ids.pop(entry["index"]),
+            "query": entry["query"],
+            "ok": ok,
+            "elapsed": entry["elapsed"],
+            "results": entry["results"],
+        }
+        output.write(json.dumps(record, ensure_ascii=False, default=json_default) + "\n")
+        output.flush()
+
+        summary["total_queries"] += 1
+        summary["successful" if ok else "failed"] += 1
+        query_time += entry["elapsed"]
+        summary["max_query_time"] = max(summary["max_query_time"], entry["elapsed"])
+        if fsync_every and summary["total_queries"] % fsync_every == 0:
+            os.fsync(output.fileno())
+
+    if fsync_every and summary["total_queries"]:
+        os.fsync(output.fileno())
+    summary["total_time"] = perf_counter() - start_time
+    if summary["total_queries"]:
+        summary["mean_query_time"] = query_time / summary["total_queries"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of queries ('-' for stdin).")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to ('-' for stdout).")
+    parser.add_argument("--resume", action="store_true", help="Skip queries already recorded in the output.")
+    parser.add_argument("--retry-failed", action="store_true", help="With --resume, re-run failed queries too.")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Queries processed at the same time.")
+    parser.add_argument("--max-pending", type=int, help="Queries read ahead of the results written.")
+    parser.add_argument("--fsync-every", type=int, default=DEFAULT_FSYNC_EVERY,
+                        help="Results written between fsyncs of the output (0 to only flush).")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while the batch runs.")
+    args = parser.parse_args()
+
+    configure_logging(level=args.log_level.upper())
+    try:
+        get_api_keys()
+    except ValueError as e:
+        raise SystemExit(f"Configuration error: {e}")
+
+    to_stdout = args.output == "-"
+    if to_stdout and args.resume:
+        raise SystemExit("--resume needs an output file to read the checkpoint from.")
+    if not to_stdout and not args.resume and os.path.exists(args.output) and os.path.getsize(args.output):
+        raise SystemExit(f"{args.output} already exists; pass --resume to continue it or remove it.")
+    skip_ids = load_checkpoint(args.output, args.retry_failed) if args.resume else set()
+
+    from src.integration_nodes import DEFAULT_POOL_SIZE
+    from src.langgraph_workflow import WorkflowEngine
+
+    engine = WorkflowEngine(pool_size=max(args.max_concurrency, DEFAULT_POOL_SIZE))
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = sys.stdout if to_stdout else open(args.output, "a", encoding="utf-8")
+    try:
+        summary = run_jobs(
+            source, output, engine.run, max_concurrency=args.max_concurrency, skip_ids=skip_ids,
+            max_pending=args.max_pending, fsync_every=0 if to_stdout else args.fsync_every
+        )
+    except KeyboardInterrupt:
+        raise SystemExit("Interrupted; rerun with --resume to continue.")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        engine.close()
+
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
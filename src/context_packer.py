@@ -0,0 +1,147 @@
+import logging
+import random
+import re
+import zlib
+
+from src.integration_nodes import clean_content
+from src.utils.tokenizer import DEFAULT_MODEL, count_tokens_batch, truncate_to_tokens
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Near-duplicate detection settings
+SHINGLE_SIZE = 3  # Words per shingle
+NUM_PERMUTATIONS = 64  # MinHash signature length; the Jaccard estimate error is about 1/sqrt(64)
+DUPLICATE_THRESHOLD = 0.8  # Estimated Jaccard similarity above which a snippet is a near-duplicate
+MIN_TRUNCATED_TOKENS = 16  # Do not add a truncated snippet shorter than this
+
+# Multiply-shift hash functions h(x) = ((a * x + b) mod 2**64) >> 32 with odd a, which NumPy
+# evaluates for all shingles and permutations at once in uint64 arithmetic
+_rng = random.Random(1729)  # Fixed seed: signatures must be comparable across calls
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_PERMUTATIONS)]
+_permutation_arrays = None  # (a, b) as (NUM_PERMUTATIONS, 1) uint64 arrays, built on first use
+# Odd multipliers combining the hashes of a shingle's words into the shingle hash
+_SHINGLE_MULTIPLIERS = [_rng.getrandbits(64) | 1 for _ in range(SHINGLE_SIZE)]
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Return the distinct hashed word shingles of a text (case-insensitive, punctuation ignored)
+    as a uint64 NumPy array.
+
+    Each word is hashed once; a shingle's hash combines the hashes of its words in order, for
+    all shingles at once.
+    """
+    import numpy as np  # Imported on first use, like the reranker
+
+    words = _WORD_PATTERN.findall(text.casefold())
+    word_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64,
+                              count=len(words))
+    size = max(1, min(size, len(words)))  # A text shorter than a shingle is one shingle
+    count = len(words) - size + 1
+    hashed = np.zeros(count, dtype=np.uint64)
+    for offset in range(size):
+        multiplier = np.uint64(_SHINGLE_MULTIPLIERS[offset % SHINGLE_SIZE])
+        hashed += word_hashes[offset:offset + count] * multiplier  # Wraps modulo 2**64
+    return np.unique(hashed)
+
+
+def minhash_signature(text):
+    """
+    Compute the MinHash signature of a text's shingles: a uint64 NumPy array of NUM_PERMUTATIONS
+    minimum hashes, or None if the text has no words.
+
+    The shingles are hashed once and every permutation is applied to all of them in a single
+    broadcast NumPy expression, rather than in a Python loop per permutation and shingle.
+    """
+    import numpy as np
+
+    global _permutation_arrays
+    hashed = shingles(text)
+    if not len(hashed):
+        return None
+    if _permutation_arrays is None:
+        _permutation_arrays = tuple(
+            np.array(column, dtype=np.uint64).reshape(-1, 1) for column in zip(*_PERMUTATIONS)
+        )
+    a, b = _permutation_arrays
+    return ((a * hashed + b) >> np.uint64(32)).min(axis=1)  # uint64 products wrap modulo 2**64
+
+
+def estimate_similarity(signature_a, signature_b):
+    """
+    Estimate the Jaccard similarity of two texts from their MinHash signatures.
+    """
+    return int((signature_a == signature_b).sum()) / len(signature_a)
+
+
+def dedupe_snippets(contents, threshold=DUPLICATE_THRESHOLD, limit=None):
+    """
+    Clean snippets with clean_content and drop empty ones and near-duplicates of earlier ones.
+
+    Args:
+        contents (list): Snippet texts, in priority order.
+        threshold (float): Estimated Jaccard similarity at or above which a snippet is dropped.
+        limit (int): Stop once this many snippets are kept; None keeps all.
+
+    Returns:
+        list: The cleaned, distinct snippets in their original order.
+    """
+    kept = []
+    signatures = []
+    for content in contents:
+        cleaned = clean_content(content)
+        if not cleaned:
+            continue
+        signature = minhash_signature(cleaned)
+        if signature is not None and any(
+                estimate_similarity(signature, seen) >= threshold for seen in signatures):
+            logger.info("Dropping near-duplicate search result snippet.")
+            continue
+        kept.append(cleaned)
+        if signature is not None:
+            signatures.append(signature)
+        if limit is not None and len(kept) >= limit:
+            break
+    return kept
+
+
+def pack_context(contents, max_tokens, max_snippets=3, model=DEFAULT_MODEL, threshold=DUPLICATE_THRESHOLD):
+    """
+    Pack search result snippets into a token budget.
+
+    Each snippet is cleaned with clean_content, near-duplicates of snippets already kept are
+    dropped, and snippets are added in order until max_snippets are kept or the budget runs
+    out; the snippet that would overflow the budget is truncated at a token boundary so the
+    budget is filled exactly.
+
+    Args:
+        contents (list): Snippet texts, in priority order.
+        max_tokens (int): The token budget for all snippets together.
+        max_snippets (int): The maximum number of snippets to keep.
+        model (str): The model whose tokenizer is used.
+        threshold (float): Estimated Jaccard similarity at or above which a snippet is dropped.
+
+    Returns:
+        tuple: (snippets, tokens) with the packed snippet texts and their total token count.
+    """
+    candidates = dedupe_snippets(contents, threshold=threshold, limit=max_snippets)
+
+    packed = []
+    used_tokens = 0
+    for snippet, tokens in zip(candidates, count_tokens_batch(candidates, model)):
+        remaining = max_tokens - used_tokens
+        if tokens <= remaining:
+            packed.append(snippet)
+            used_tokens += tokens
+            continue
+
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            truncated, truncated_tokens = truncate_to_tokens(snippet, remaining, model)
+            if truncated.strip():
+                packed.append(truncated)
+                used_tokens += truncated_tokens
+        break  # The budget is full
+
+    return packed, used_tokens
@@ -0,0 +1,223 @@
+import logging
+import re
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from src.integration_nodes import normalize_query
+from src.search_results import SearchResult, SearchResponse
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUB_QUERIES = 3  # Searches per user query, including the query itself
+
+# Suffixes that widen a broad query once the splitting rules have run out of sub-queries
+FACETS = ("latest developments", "challenges and limitations", "examples")
+
+# Words dropped from the keyword form of a query
+STOPWORDS = frozenset(
+    "a an the of in on for to with about what which who whom how why when where is are was were be been "
+    "do does did can could should would will shall may might must tell me explain describe give list "
+    "i we you it its their there this that these those please some any".split()
+)
+
+# Separators between the parts of a compound query ("X vs Y", "X and Y", "X, Y")
+_SPLIT_PATTERN = re.compile(r"\s+(?:vs\.?|versus|compared (?:to|with)|and|or)\s+|\s*[,;]\s*", re.IGNORECASE)
+_WORD_PATTERN = re.compile(r"[\w'-]+")
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+
+
+def keywords(query):
+    """
+    Return the query without stopwords and question words, or the query itself if nothing is left.
+    """
+    words = [word for word in _WORD_PATTERN.findall(query) if word.casefold() not in STOPWORDS]
+    return " ".join(words) or query.strip()
+
+
+def split_compound(query):
+    """
+    Split a compound query into its parts, e.g. "AI in healthcare and finance" ->
+    ["AI in healthcare", "AI in finance"].
+
+    A later part shorter than the first one is read as a replacement for the first part's last
+    words, so the shared context ("AI in") carries over; when the last part is the longer one
+    ("Python vs Rust performance"), its trailing words carry over to the shorter parts instead.
+    """
+    parts = [part.strip() for part in _SPLIT_PATTERN.split(query) if part and part.strip()]
+    if len(parts) < 2:
+        return []
+
+    head = parts[0].split()
+    last = parts[-1].split()
+    tail = last[len(head):] if len(last) > len(head) else []
+    expanded = []
+    for part in parts:
+        words = part.split()
+        if len(words) < len(head):
+            words = head[:len(head) - len(words)] + words
+        elif tail and len(words) < len(last):
+            words = words + tail
+        expanded.append(" ".join(words))
+    return expanded
+
+
+def expand_query(query, max_queries=DEFAULT_SUB_QUERIES):
+    """
+    Derive up to max_queries search queries from a user query, without an LLM call.
+
+    The query itself always comes first. It is followed by the parts of a compound query
+    ("X vs Y", "X and Y"), then its keyword form, then the keyword form with FACETS appended.
+    Queries that normalize to the same cache key are only kept once.
+
+    Args:
+        query (str): The user's query.
+        max_queries (int): Maximum number of queries to return.
+
+    Returns:
+        list: The sub-queries, starting with the query itself.
+    """
+    query = " ".join(query.split())
+    core = keywords(query)
+    candidates = [query] + split_compound(query) + [core] + [f"{core} {facet}" for facet in FACETS]
+
+    sub_queries = []
+    seen = set()
+    for candidate in candidates:
+        key = normalize_query(candidate)
+        if key and key not in seen:
+            seen.add(key)
+            sub_queries.append(candidate)
+            if len(sub_queries) >= max_queries:
+                break
+    return sub_queries
+
+
+def canonical_url(url):
+    """
+    Normalize a URL for deduplication: lowercase scheme and host, no fragment, no trailing slash
+    and no tracking parameters.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    query = urlencode([
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(_TRACKING_PARAMS)
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+
+def merge_search_results(sub_queries, responses):
+    """
+    Merge the Tavily responses of several sub-queries into one, deduplicating results by URL.
+
+    Results are interleaved by rank (every sub-query's first result, then every second one, ...)
+    so each sub-query contributes its best hits before any of them contributes its tail. A URL
+    seen again keeps its first position and the higher of the two scores.
+
+    Args:
+        sub_queries (list): The sub-queries, in the order they were derived.
+        responses (list): The response (or error dict) of each sub-query.
+
+    Returns:
+        SearchResponse: The first successful response's fields with the merged results and the
+        sub_queries that succeeded, or the first error dict if every sub-query failed.
+    """
+    successful = [
+        (sub_query, response) for sub_query, response in zip(sub_queries, responses)
+        if isinstance(response, Mapping) and "error" not in response
+    ]
+    if not successful:
+        return next((response for response in responses if isinstance(response, Mapping)),
+                    {"error": "No results found from Tavily API."})
+
+    ranked = [
+        [result if isinstance(result, SearchResult) else SearchResult.from_json(result)
+         for result in response.get("results") or [] if isinstance(result, Mapping)]
+        for _, response in successful
+    ]
+    merged = []
+    positions = {}  # Canonical URL -> index in merged
+    for rank in range(max(len(results) for results in ranked)):
+        for results in ranked:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            if not result.url:
+                merged.append(result)
+                continue
+            key = canonical_url(result.url)
+            position = positions.get(key)
+            if position is None:
+                positions[key] = len(merged)
+                merged.append(result)
+            elif (result.score or 0) > (merged[position].score or 0):
+                merged[position] = merged[position].replace(score=result.score)
+
+    primary = successful[0][1]
+    return SearchResponse(
+        query=primary.get("query"), results=merged, answer=primary.get("answer"),
+        response_time=primary.get("response_time"), sub_queries=[sub_query for sub_query, _ in successful]
+    )
+
+
+def _as_error(sub_query, exc):
+    logger.error(f"Search for sub-query '{sub_query}' failed: {exc}")
+    return {"error": f"Error fetching results: {str(exc)}"}
+
+
+def fan_out(search, sub_queries, executor=None):
+    """
+    Run search(sub_query) for every sub-query concurrently and return the responses in order.
+
+    The first sub-query runs on the calling thread while the others run on the executor, so a
+    single sub-query costs no thread hop and N of them take about one round trip. Exceptions are
+    returned as error dicts, so one failed sub-query does not fail the others.
+
+    Args:
+        search (callable): Called as search(sub_query) and returns a response or error dict.
+        sub_queries (list): The queries to search for.
+        executor (concurrent.futures.Executor, optional): Runs the other sub-queries; a
+            temporary pool is used if omitted.
+
+    Returns:
+        list: One response per sub-query.
+    """
+    def run(sub_query):
+        try:
+            return search(sub_query)
+        except Exception as e:
+            return _as_error(sub_query, e)
+
+    if len(sub_queries) <= 1:
+        return [run(sub_query) for sub_query in sub_queries]
+
+    owned = executor is None
+    if owned:
+        executor = ThreadPoolExecutor(max_workers=len(sub_queries) - 1, thread_name_prefix="fanout")
+    try:
+        futures = [executor.submit(run, sub_query) for sub_query in sub_queries[1:]]
+        first = run(sub_queries[0])
+        return [first] + [future.result() for future in futures]
+    finally:
+        if owned:
+            executor.shutdown(wait=False)
+
+
+async def fan_out_async(search, sub_queries):
+    """
+    Asyncio counterpart of fan_out: await search(sub_query) for every sub-query concurrently.
+
+    Returns:
+        list: One response per sub-query.
+    """
+    import asyncio
+
+    responses = await asyncio.gather(*(search(sub_query) for sub_query in sub_queries), return_exceptions=True)
+    return [
+        _as_error(sub_query, response) if isinstance(response, Exception) else response
+        for sub_query, response in zip(sub_queries, responses)
+    ]
@@ -1,23 +1,197 @@
-import time
-import requests
-import openai
+import hashlib
+import json
 import re
 import logging
+import sys
+import threading
 
-from src.utils.config import get_api_keys
+from src.utils.config import get_api_keys, get_base_urls
+from src.utils.retry import RetryPolicy, CircuitBreaker, CircuitOpenError, parse_retry_after
+from src.utils.rate_limit import shared_rate_limiter
+from src.utils.hedging import hedged_call, hedged_call_async
+from src.search_results import SearchResponse, parse_search_response
+from src.utils.tokenizer import count_message_tokens, context_window, truncate_to_tokens
+from src.utils.metrics import get_registry, traced
+from src.utils.cassette import CassetteMissError, get_cassette
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# HTTP connection settings for the Tavily API
+DEFAULT_TAVILY_BASE_URL = "https://api.tavily.com"  # Overridden by TAVILY_BASE_URL
+DEFAULT_POOL_SIZE = 10  # Keep-alive connections kept open per host
+DEFAULT_TIMEOUT = (3.05, 30)  # (connect, read) timeouts in seconds
+
+# Completion size and prompt budgeting for OpenAI requests
+DEFAULT_MAX_COMPLETION_TOKENS = 500  # Sent as max_tokens; reserved in the token budget until usage is known
+PROMPT_MARGIN_TOKENS = 16  # Slack for tokens merging where the context meets the prompt template
+
+# Upstream HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# The HTTP and API client libraries (requests, httpx, openai) are imported where they are first
+# used rather than at module level, so importing the workflow stays fast for CLIs and workers.
+
+
+def client_error_types(*names):
+    """
+    Resolve exception classes of the client libraries by dotted name, e.g. "requests.exceptions.Timeout".
+
+    Libraries that were never imported are skipped rather than imported just to check an exception
+    against them: no exception can come from a library that is not loaded.
+
+    Returns:
+        tuple: The exception classes, usable in isinstance() checks and except clauses.
+    """
+    types = []
+    for name in names:
+        module_name, _, path = name.partition(".")
+        obj = sys.modules.get(module_name)
+        if obj is None:
+            continue
+        for attr in path.split("."):
+            obj = getattr(obj, attr)
+        types.append(obj)
+    return tuple(types)
+
+
+def cassette_miss(exc):
+    """
+    Return the CassetteMissError behind an error, raised directly or wrapped by a client library
+    (the OpenAI SDK raises APIConnectionError from it), or None.
+    """
+    while exc is not None:
+        if isinstance(exc, CassetteMissError):
+            return exc
+        exc = exc.__cause__
+    return None
+
+
+def classify_upstream_error(exc):
+    """
+    Classify an error raised by the Tavily or OpenAI clients for the retry policy.
+
+    A request missing from a replayed cassette is not retryable: replaying it again cannot succeed.
+
+    Returns:
+        tuple: (retryable, retry_after) where retry_after is the upstream's Retry-After hint in seconds or None.
+    """
+    if cassette_miss(exc) is not None:
+        return False, None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = None
+    if headers.get("retry-after-ms") is not None:
+        retry_after = parse_retry_after(headers.get("retry-after-ms"))
+        retry_after = retry_after / 1000 if retry_after is not None else None
+    if retry_after is None:
+        retry_after = parse_retry_after(headers.get("retry-after"))
+
+    if isinstance(exc, client_error_types("openai.APIConnectionError", "requests.exceptions.ConnectionError",
+                                          "requests.exceptions.Timeout", "httpx.TransportError")):
+        return True, retry_after
+    status_code = getattr(response, "status_code", None)
+    if isinstance(exc, client_error_types("openai.APIStatusError", "requests.exceptions.HTTPError",
+                                          "httpx.HTTPStatusError")):
+        return status_code in RETRYABLE_STATUS_CODES, retry_after
+    return False, None
+
+
+def log_openai_error(e):
+    """
+    Log an error raised while talking to OpenAI, once retries are exhausted.
+    """
+    miss = cassette_miss(e)
+    get_registry().increment("upstream_errors_total", service="openai", error=type(miss or e).__name__)
+    if miss is not None:
+        logger.error(f"OpenAI request not found in the cassette: {miss}")
+    elif isinstance(e, client_error_types("openai.RateLimitError")):
+        logger.error("Rate limit exceeded and retries exhausted.")
+    elif isinstance(e, CircuitOpenError):
+        logger.error(f"OpenAI request rejected: {e}")
+    elif isinstance(e, client_error_types("openai.AuthenticationError")):
+        logger.error("Error: Invalid OpenAI API key.")
+    else:
+        logger.error(f"Error communicating with OpenAI: {e}")
+
+
+def default_retry_policy():
+    """
+    Create the retry policy used by a node when none is given: bounded exponential backoff
+    with jitter and a circuit breaker of its own.
+    """
+    return RetryPolicy(classify=classify_upstream_error, circuit_breaker=CircuitBreaker())
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, service="tavily"):
+    """
+    Create a requests.Session with a keep-alive connection pool of the given size.
+
+    The underlying urllib3 pool is thread-safe, so one session can be shared by all
+    workers; connections are reused instead of paying a TCP+TLS handshake per request.
+    When an upstream cassette is active (see src.utils.cassette), requests are recorded or replayed.
+    """
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    cassette = get_cassette()
+    if cassette is not None:
+        adapter = cassette.requests_adapter(service, adapter)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 # Tavily API Node
 class TavilyAPI:
     """
     Tavily API Node: Handles search queries to retrieve relevant data.
     """
 
-    def __init__(self):
+    def __init__(self, cache=None, session=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retry_policy=None, rate_limiter=None, single_flight=None, hedge_policy=None, keep_raw=False):
+        """
+        Args:
+        - cache: optional LRUCache/SQLiteCache (see src.utils.cache) for search results,
+          keyed on the normalized query. Failed searches are never cached.
+        - session: optional requests.Session to share; by default a pooled session is created
+        - pool_size: int, keep-alive connections kept open when creating the session
+        - timeout: float or (connect, read) tuple in seconds applied to every request
+        - retry_policy: optional RetryPolicy (see src.utils.retry); defaults to default_retry_policy()
+        - rate_limiter: optional RateLimiter (see src.utils.rate_limit); defaults to the shared
+          Tavily limiter configured through TAVILY_RPM, if any
+        - single_flight: optional SingleFlight (see src.utils.singleflight) that coalesces concurrent
+          searches for the same normalized query into one upstream request
+        - hedge_policy: optional HedgePolicy (see src.utils.hedging); a request still unanswered after
+          its adaptive delay (e.g. the observed p95) is sent again and the first response wins. Off by default
+        - keep_raw: bool, keep the full JSON payload on each SearchResponse as .raw; by default only the
+          fields used downstream are kept (see src.search_results)
+        """
         self.api_key, _ = get_api_keys()
-        self.base_url = "https://api.tavily.com/search"
+        self.base_url = f"{(get_base_urls()['tavily'] or DEFAULT_TAVILY_BASE_URL).rstrip('/')}/search"
+        self.cache = cache
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else shared_rate_limiter("tavily")
+        self.single_flight = single_flight
+        self.hedge_policy = hedge_policy
+        self.keep_raw = keep_raw
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = session
+        self._session_lock = threading.Lock()
+        self._hedge_executor = None
+
+    @property
+    def session(self):
+        """
+        The shared HTTP session, created with a pool of pool_size connections on first use.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = create_session(self.pool_size)
+        return self._session
 
     def search(self, query):
         """
@@ -27,23 +201,221 @@ class TavilyAPI:
         - query: str, the search query
 
         Returns:
-        - dict, the JSON response from Tavily API or None if an error occurred
+        - SearchResponse (see src.search_results) parsed from the Tavily API response, or None if an error occurred
         """
         if not query.strip():
             logger.error("Query is empty. Please provide a valid search query.")
             return None
 
-        payload = {"query": query, "api_key": self.api_key}  # API request payload
+        cached = self._get_cached(query)
+        if cached is not None:
+            return cached
+
+        if self.single_flight is not None:
+            return self.single_flight.do(normalize_query(query), self._search_upstream, query)
+        return self._search_upstream(query)
+
+    def _search_upstream(self, query):
+        """
+        Query the Tavily API and cache successful results; returns None if an error occurred.
+        """
+        payload = self._build_payload(query)
         try:
             logger.info(f"Sending request to Tavily for query: '{query}'...")
-            response = requests.post(self.base_url, json=payload)
-            response.raise_for_status()
+            response = self.retry_policy.call(self._post, payload)
+            logger.info("Tavily API response received successfully.")
+            results = parse_search_response(response.json(), self.keep_raw)
+            self._store_cached(query, results)
+            return results
+        except (CassetteMissError, CircuitOpenError, *client_error_types("requests.exceptions.RequestException")) as e:
+            logger.error(f"Error fetching results from Tavily API: {e}")
+            get_registry().increment("upstream_errors_total", service="tavily", error=type(e).__name__)
+            return None
+
+    def _post(self, payload):
+        """
+        Send a request to Tavily, hedged if a hedge policy is set, raising on HTTP errors so the
+        retry policy can act on them.
+        """
+        if self.hedge_policy is None:
+            return self._send(payload)
+        return hedged_call(
+            self.hedge_policy, self.hedge_executor, self._send, payload, on_discard=lambda response: response.close()
+        )
+
+    @property
+    def hedge_executor(self):
+        """
+        Worker threads running hedged requests, created on first use: two per pooled connection, so
+        every caller can have a request and its hedge in flight.
+        """
+        if self._hedge_executor is None:
+            with self._session_lock:
+                if self._hedge_executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    self._hedge_executor = ThreadPoolExecutor(
+                        max_workers=2 * self.pool_size, thread_name_prefix="tavily-hedge"
+                    )
+        return self._hedge_executor
+
+    def _send(self, payload):
+        """
+        Send a single request to Tavily, raising on HTTP errors.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = self.session.post(self.base_url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def _build_payload(self, query):
+        """
+        Build the Tavily API request payload for a query.
+        """
+        return {"query": query, "api_key": self.api_key}
+
+    def close(self):
+        """
+        Close the HTTP session and release its pooled connections.
+        """
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False, cancel_futures=True)
+            self._hedge_executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _get_cached(self, query):
+        """
+        Return the cached results for a query, or None if caching is off or the query is not cached.
+        """
+        if self.cache is None:
+            return None
+        cached = self.cache.get(normalize_query(query))
+        if cached is None:
+            return None
+        logger.info(f"Serving Tavily results for query '{query}' from cache.")
+        return parse_search_response(cached, self.keep_raw)
+
+    def _store_cached(self, query, results):
+        """
+        Cache successful search results as plain JSON (the raw payload when kept, so it survives a
+        round trip through SQLiteCache). Anything that did not parse into a SearchResponse is
+        treated as an error and skipped.
+        """
+        if self.cache is not None and isinstance(results, SearchResponse):
+            self.cache.set(normalize_query(query), results.raw if results.raw is not None else results.to_dict())
+
+
+class AsyncTavilyAPI(TavilyAPI):
+    """
+    Asyncio variant of the Tavily API Node.
+
+    Requests go through a shared httpx.AsyncClient, so many searches can be in
+    flight on one event loop without a thread per query.
+    """
+
+    def __init__(self, client=None, cache=None, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 retry_policy=None, rate_limiter=None, single_flight=None, hedge_policy=None, keep_raw=False):
+        super().__init__(cache=cache, pool_size=pool_size, timeout=timeout, retry_policy=retry_policy,
+                         rate_limiter=rate_limiter, single_flight=single_flight, hedge_policy=hedge_policy,
+                         keep_raw=keep_raw)
+        self._client = client
+
+    async def search(self, query):
+        """
+        Send a query to Tavily and retrieve results without blocking the event loop.
+
+        Args:
+        - query: str, the search query
+
+        Returns:
+        - SearchResponse (see src.search_results) parsed from the Tavily API response, or None if an error occurred
+        """
+        if not query.strip():
+            logger.error("Query is empty. Please provide a valid search query.")
+            return None
+
+        cached = self._get_cached(query)
+        if cached is not None:
+            return cached
+
+        if self.single_flight is not None:
+            return await self.single_flight.do_async(normalize_query(query), self._search_upstream, query)
+        return await self._search_upstream(query)
+
+    async def _search_upstream(self, query):
+        """
+        Query the Tavily API and cache successful results; returns None if an error occurred.
+        """
+        payload = self._build_payload(query)
+        try:
+            logger.info(f"Sending async request to Tavily for query: '{query}'...")
+            response = await self.retry_policy.call_async(self._apost, payload)
             logger.info("Tavily API response received successfully.")
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            results = parse_search_response(response.json(), self.keep_raw)
+            self._store_cached(query, results)
+            return results
+        except (ValueError, CassetteMissError, CircuitOpenError, *client_error_types("httpx.HTTPError")) as e:
             logger.error(f"Error fetching results from Tavily API: {e}")
+            get_registry().increment("upstream_errors_total", service="tavily", error=type(e).__name__)
             return None
 
+    async def _apost(self, payload):
+        """
+        Send a request to Tavily, hedged if a hedge policy is set (the losing request is cancelled),
+        raising on HTTP errors so the retry policy can act on them.
+        """
+        if self.hedge_policy is None:
+            return await self._asend(payload)
+        return await hedged_call_async(self.hedge_policy, self._asend, payload)
+
+    async def _asend(self, payload):
+        """
+        Send a single request to Tavily, raising on HTTP errors.
+        """
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        response = await self._get_client().post(self.base_url, json=payload)
+        response.raise_for_status()
+        return response
+
+    def _get_client(self):
+        """
+        Return the shared AsyncClient, creating it on first use inside the running loop.
+        """
+        if self._client is None:
+            import httpx
+
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            transport = None
+            cassette = get_cassette()
+            if cassette is not None:
+                transport = cassette.async_transport("tavily", httpx.AsyncHTTPTransport(limits=limits))
+            self._client = httpx.AsyncClient(limits=limits, timeout=_httpx_timeout(self.timeout), transport=transport)
+        return self._client
+
+    async def aclose(self):
+        """
+        Close the underlying HTTP client and release its connections.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _httpx_timeout(timeout):
+    """
+    Convert a requests-style timeout (seconds or a (connect, read) tuple) to httpx.Timeout.
+    """
+    import httpx
+
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(read, connect=connect)
+    return httpx.Timeout(timeout)
+
 
 # OpenAI LLM Node
 class OpenAINode:
@@ -51,17 +423,45 @@ class OpenAINode:
     OpenAI LLM Node: Handles interaction with the OpenAI GPT API.
     """
 
-    def __init__(self, model="gpt-4"):
+    def __init__(self, model="gpt-4", client=None, cache=None, retry_policy=None, rate_limiter=None,
+                 single_flight=None, max_completion_tokens=DEFAULT_MAX_COMPLETION_TOKENS):
+        """
+        Args:
+        - model: str, the chat model to use; its context window bounds the prompt (see src.utils.tokenizer)
+        - client: optional openai.OpenAI client to share; by default one is created on first use
+          with this node's API key and base URL
+        - cache: optional LRUCache/SQLiteCache (see src.utils.cache) for generated responses,
+          keyed on a hash of the model and the full messages payload
+        - retry_policy: optional RetryPolicy (see src.utils.retry); defaults to default_retry_policy()
+        - rate_limiter: optional RateLimiter (see src.utils.rate_limit); defaults to the shared
+          OpenAI limiter configured through OPENAI_RPM / OPENAI_TPM, if any
+        - single_flight: optional SingleFlight (see src.utils.singleflight) that coalesces concurrent
+          identical requests (same model and messages) into one upstream call; streams are not coalesced
+        - max_completion_tokens: int, upper bound on the completion, sent as max_tokens. The context is
+          truncated when needed so that the prompt and this many completion tokens fit the context window
+        """
         _, self.api_key = get_api_keys()
         self.model = model
+        self.max_completion_tokens = max_completion_tokens
+        self.cache = cache
+        self.retry_policy = retry_policy or default_retry_policy()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else shared_rate_limiter("openai")
+        self.single_flight = single_flight
+        self.base_url = get_base_urls()["openai"]  # None uses the OpenAI SDK default
+        self._client = client
+        self._client_lock = threading.Lock()
 
-    def generate_response(self, context, query):
+    @traced("generate")
+    def generate_response(self, context, query, use_cache=True, context_tokens=None):
         """
         Generate a response based on the search context and query.
 
         Args:
         - context: str, the retrieved search results
         - query: str, the user's search query
+        - use_cache: bool, set to False to bypass the response cache for this call
+        - context_tokens: int, token count of the context if already known (e.g. from select_context);
+          lets a context that clearly fits the window skip re-tokenizing
 
         Returns:
         -   str: The generated response from the GPT-4 model or None if an error occurred.
@@ -70,50 +470,489 @@ class OpenAINode:
             logger.error("Context or query is empty. Cannot generate a response.")
             return None
 
-        openai.api_key = self.api_key  # Set the OpenAI API key
-        prompt = f"Using the following search results:\n{context}\n\nAnswer the query: {query}"
+        prepared = self.prepare_messages(context, query, context_tokens)
+        if prepared is None:
+            return None
+        messages, prompt_tokens = prepared
+        cache_key = self._cache_key(messages) if use_cache and self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving OpenAI response from cache.")
+                return cached
+
+        if self.single_flight is not None:
+            return self.single_flight.do(
+                cache_key or self._cache_key(messages),
+                self._generate_upstream, messages, cache_key, prompt_tokens
+            )
+        return self._generate_upstream(messages, cache_key, prompt_tokens)
 
+    def _generate_upstream(self, messages, cache_key, prompt_tokens):
+        """
+        Request a completion from OpenAI and cache the answer; returns None if an error occurred.
+        """
         try:
             logger.info("Sending request to OpenAI GPT-4...")
-            response = openai.chat.completions.create(
-                model=self.model,
-                # model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0
-            )
+            estimated_tokens = self._estimate_tokens(prompt_tokens)
+            response = self.retry_policy.call(self._create_completion, messages, estimated_tokens)
 
             # Access the correct part of the response
             generated_response = response.choices[0].message.content
             # logger.info("OpenAI response generated successfully.")
+            if cache_key is not None and generated_response:
+                self.cache.set(cache_key, generated_response)
+            return generated_response
+
+        except Exception as e:
+            log_openai_error(e)
+
+        return None
+
+    def generate_stream(self, context, query, use_cache=True, context_tokens=None):
+        """
+        Generate a response like generate_response, yielding content deltas as they arrive.
+
+        Args:
+        - context: str, the retrieved search results
+        - query: str, the user's search query
+        - use_cache: bool, set to False to bypass the response cache for this call
+        - context_tokens: int, token count of the context if already known
+
+        Yields:
+        -   str: Consecutive pieces of the response. A cached response is yielded in one piece;
+            nothing more is yielded once an error occurs.
+        """
+        if not context.strip() or not query.strip():
+            logger.error("Context or query is empty. Cannot generate a response.")
+            return
+
+        prepared = self.prepare_messages(context, query, context_tokens)
+        if prepared is None:
+            return
+        messages, prompt_tokens = prepared
+        cache_key = self._cache_key(messages) if use_cache and self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving OpenAI response from cache.")
+                yield cached
+                return
+
+        parts = []
+        try:
+            logger.info("Sending streaming request to OpenAI GPT-4...")
+            estimated_tokens = self._estimate_tokens(prompt_tokens)
+            # Only opening the stream is retried; a stream that fails midway cannot be replayed
+            stream = self.retry_policy.call(self._create_completion, messages, estimated_tokens, stream=True)
+            for chunk in stream:
+                delta = self._stream_delta(chunk, estimated_tokens)
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            log_openai_error(e)
+            return
+
+        generated_response = "".join(parts)
+        if cache_key is not None and generated_response:
+            self.cache.set(cache_key, generated_response)
+
+    def _get_client(self):
+        """
+        Return this node's OpenAI client, creating it on first use.
+
+        Every node owns its client instead of configuring the module-level openai client, so nodes
+        with different keys or endpoints can be used from many threads at once. The client's own
+        retries are disabled; retry_policy decides what is retried.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import openai
+
+                    http_client = None
+                    cassette = get_cassette()
+                    if cassette is not None:
+                        import httpx
+
+                        http_client = openai.DefaultHttpxClient(
+                            transport=cassette.transport("openai", httpx.HTTPTransport())
+                        )
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=http_client
+                    )
+        return self._client
+
+    def close(self):
+        """
+        Close the OpenAI client and release its pooled connections.
+        """
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    @staticmethod
+    def build_messages(context, query):
+        """
+        Build the chat messages payload sent to the model for a context and query.
+        """
+        prompt = f"Using the following search results:\n{context}\n\nAnswer the query: {query}"
+        return [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def prepare_messages(self, context, query, context_tokens=None):
+        """
+        Build the messages for a context and query so that the prompt plus max_completion_tokens
+        fit the model's context window, truncating the context if needed.
+
+        The system message, prompt template and query are counted exactly. A context_tokens count
+        that leaves at least PROMPT_MARGIN_TOKENS to spare is trusted; otherwise the context is
+        measured and cut at a token boundary, so oversized prompts are trimmed locally instead of
+        failing after a round trip.
+
+        Returns:
+        -   tuple: (messages, prompt_tokens), or None if the query alone does not fit the window.
+        """
+        window = context_window(self.model)
+        template_tokens = count_message_tokens(self.build_messages("", query), self.model)
+        available = window - self.max_completion_tokens - template_tokens - PROMPT_MARGIN_TOKENS
+        if available <= 0:
+            logger.error(
+                f"The query uses {template_tokens} tokens; with {self.max_completion_tokens} completion tokens "
+                f"it does not fit the {window}-token context window of {self.model}."
+            )
+            return None
+        if context_tokens is None or context_tokens + PROMPT_MARGIN_TOKENS > available:
+            measured_context, context_tokens = truncate_to_tokens(context, available, self.model)
+            if measured_context != context:
+                logger.warning(f"Context truncated to {context_tokens} tokens to fit the window of {self.model}.")
+                context = measured_context
+        return self.build_messages(context, query), template_tokens + context_tokens
+
+    def _create_completion(self, messages, estimated_tokens, stream=False):
+        """
+        Send a single chat completion request once the rate limiter admits it.
+
+        With stream=True the response is an iterator of chunks; its usage arrives in the final chunk.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(estimated_tokens)
+        response = self._get_client().chat.completions.create(
+            model=self.model,
+            # model="gpt-4",
+            messages=messages,
+            temperature=0,
+            max_tokens=self.max_completion_tokens,
+            **self._stream_options(stream)
+        )
+        if not stream:
+            self._reconcile_usage(response, estimated_tokens)
+        return response
+
+    @staticmethod
+    def _stream_options(stream):
+        """
+        Extra request options for streaming: ask for the usage to be reported in the final chunk.
+        """
+        return {"stream": True, "stream_options": {"include_usage": True}} if stream else {}
+
+    def _stream_delta(self, chunk, estimated_tokens):
+        """
+        Return the content delta of a streamed chunk, reconciling the token budget on the usage chunk.
+        """
+        if getattr(chunk, "usage", None) is not None:
+            self._reconcile_usage(chunk, estimated_tokens)
+        if not chunk.choices:
+            return None
+        return chunk.choices[0].delta.content
+
+    def _estimate_tokens(self, prompt_tokens):
+        """
+        Estimate the prompt + completion tokens of a request for the token budget: the prompt plus
+        the completion cap, reconciled with the actual usage once the response arrives.
+
+        Returns 0 when no token budget is configured, so nothing needs reconciling.
+        """
+        if self.rate_limiter is None or self.rate_limiter.tokens is None:
+            return 0
+        return prompt_tokens + self.max_completion_tokens
+
+    def _reconcile_usage(self, response, estimated_tokens):
+        """
+        Correct the token budget with the usage reported by the API, and record the usage in the metrics.
+        """
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(prompt_tokens, int) and isinstance(completion_tokens, int):
+            registry = get_registry()
+            registry.increment("openai_tokens_total", prompt_tokens, kind="prompt", model=self.model)
+            registry.increment("openai_tokens_total", completion_tokens, kind="completion", model=self.model)
+            registry.annotate(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+        if self.rate_limiter is None or not estimated_tokens:
+            return
+        total_tokens = getattr(usage, "total_tokens", None)
+        if isinstance(total_tokens, int):
+            self.rate_limiter.reconcile(estimated_tokens, total_tokens)
+
+    def _cache_key(self, messages):
+        """
+        Build the response cache key: a hash of the model, the completion cap and the full messages payload.
+        """
+        payload = json.dumps(
+            {"model": self.model, "max_tokens": self.max_completion_tokens, "messages": messages},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AsyncOpenAINode(OpenAINode):
+    """
+    Asyncio variant of the OpenAI LLM Node, backed by openai.AsyncOpenAI.
+    """
+
+    def __init__(self, model="gpt-4", client=None, cache=None, retry_policy=None, rate_limiter=None,
+                 single_flight=None, max_completion_tokens=DEFAULT_MAX_COMPLETION_TOKENS):
+        super().__init__(model=model, client=client, cache=cache, retry_policy=retry_policy,
+                         rate_limiter=rate_limiter, single_flight=single_flight,
+                         max_completion_tokens=max_completion_tokens)
+
+    @traced("generate")
+    async def generate_response(self, context, query, use_cache=True, context_tokens=None):
+        """
+        Generate a response based on the search context and query without blocking the event loop.
+
+        Args:
+        - context: str, the retrieved search results
+        - query: str, the user's search query
+        - use_cache: bool, set to False to bypass the response cache for this call
+        - context_tokens: int, token count of the context if already known
+
+        Returns:
+        -   str: The generated response from the GPT-4 model or None if an error occurred.
+        """
+        if not context.strip() or not query.strip():
+            logger.error("Context or query is empty. Cannot generate a response.")
+            return None
+
+        prepared = self.prepare_messages(context, query, context_tokens)
+        if prepared is None:
+            return None
+        messages, prompt_tokens = prepared
+        cache_key = self._cache_key(messages) if use_cache and self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving OpenAI response from cache.")
+                return cached
+
+        if self.single_flight is not None:
+            return await self.single_flight.do_async(
+                cache_key or self._cache_key(messages),
+                self._generate_upstream, messages, cache_key, prompt_tokens
+            )
+        return await self._generate_upstream(messages, cache_key, prompt_tokens)
+
+    async def _generate_upstream(self, messages, cache_key, prompt_tokens):
+        """
+        Request a completion from OpenAI and cache the answer; returns None if an error occurred.
+        """
+        try:
+            logger.info("Sending async request to OpenAI GPT-4...")
+            estimated_tokens = self._estimate_tokens(prompt_tokens)
+            response = await self.retry_policy.call_async(self._acreate_completion, messages, estimated_tokens)
+            generated_response = response.choices[0].message.content
+            if cache_key is not None and generated_response:
+                self.cache.set(cache_key, generated_response)
             return generated_response
 
-        except openai.RateLimitError as e:
-            logger.warning("Rate limit exceeded. Retrying after delay...")
-            time.sleep(5)
-            return self.generate_response(context, query)
-        except openai.AuthenticationError:
-            logger.error("Error: Invalid OpenAI API key.")
         except Exception as e:
-            logger.error(f"Error communicating with OpenAI: {e}")
+            log_openai_error(e)
 
         return None
 
+    async def generate_stream(self, context, query, use_cache=True, context_tokens=None):
+        """
+        Generate a response like generate_response, yielding content deltas as they arrive.
+
+        Args:
+        - context: str, the retrieved search results
+        - query: str, the user's search query
+        - use_cache: bool, set to False to bypass the response cache for this call
+        - context_tokens: int, token count of the context if already known
+
+        Yields:
+        -   str: Consecutive pieces of the response. A cached response is yielded in one piece;
+            nothing more is yielded once an error occurs.
+        """
+        if not context.strip() or not query.strip():
+            logger.error("Context or query is empty. Cannot generate a response.")
+            return
+
+        prepared = self.prepare_messages(context, query, context_tokens)
+        if prepared is None:
+            return
+        messages, prompt_tokens = prepared
+        cache_key = self._cache_key(messages) if use_cache and self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving OpenAI response from cache.")
+                yield cached
+                return
+
+        parts = []
+        try:
+            logger.info("Sending async streaming request to OpenAI GPT-4...")
+            estimated_tokens = self._estimate_tokens(prompt_tokens)
+            # Only opening the stream is retried; a stream that fails midway cannot be replayed
+            stream = await self.retry_policy.call_async(
+                self._acreate_completion, messages, estimated_tokens, stream=True
+            )
+            async for chunk in stream:
+                delta = self._stream_delta(chunk, estimated_tokens)
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            log_openai_error(e)
+            return
+
+        generated_response = "".join(parts)
+        if cache_key is not None and generated_response:
+            self.cache.set(cache_key, generated_response)
+
+    async def _acreate_completion(self, messages, estimated_tokens, stream=False):
+        """
+        Send a single chat completion request once the rate limiter admits it.
+        """
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(estimated_tokens)
+        response = await self._get_client().chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0,
+            max_tokens=self.max_completion_tokens,
+            **self._stream_options(stream)
+        )
+        if not stream:
+            self._reconcile_usage(response, estimated_tokens)
+        return response
+
+    def _get_client(self):
+        """
+        Return the AsyncOpenAI client, creating it on first use with this node's API key.
+        """
+        if self._client is None:
+            import openai
+
+            http_client = None
+            cassette = get_cassette()
+            if cassette is not None:
+                import httpx
+
+                http_client = openai.DefaultAsyncHttpxClient(
+                    transport=cassette.async_transport("openai", httpx.AsyncHTTPTransport())
+                )
+            # Retries are handled by this node's retry policy, not by the SDK
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, max_retries=0, http_client=http_client
+            )
+        return self._client
+
+    async def aclose(self):
+        """
+        Close the underlying OpenAI client and release its connections.
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+def normalize_query(query):
+    """
+    Normalize a query for use as a cache key: collapse whitespace and fold case.
+    """
+    return " ".join(query.split()).casefold()
+
+
+# One pass over the text: a match is a maximal run of boilerplate lines (a marker word or a
+# copyright sign up to the end of its line) and newline runs. Group 1 is set when the run has a
+# newline outside a removed line, in which case the run collapses to a single newline. The
+# lookahead on the possible first characters lets the scanner skip ordinary text quickly.
+_CLEAN_PATTERN = re.compile(
+    r"(?=[SPDAH©\n\r])"
+    r"(?:(?:\b(?:Share|Popular|Deep Dive|Advertise|About|Help|Stay connected|Subscribe)\b|©).*\n?|([\n\r]+))+"
+)
+
+
+def _replace_boilerplate_run(match):
+    return "\n" if match.group(1) is not None else ""
+
 
 def clean_content(text):
     """
     Cleans up unnecessary content like headers, footers, or repetitive words.
     """
     try:
-        # Remove repetitive or unnecessary lines
-        text = re.sub(r"\b(Share|Popular|Deep Dive|Advertise|About|Help|Stay connected|Subscribe)\b.*\n?", "", text)
-        text = re.sub(r"©.*\n?", "", text)  # Remove copyright lines
-        text = re.sub(r"[\n\r]+", "\n", text)  # Normalize newlines
-        return text.strip()
+        return _CLEAN_PATTERN.sub(_replace_boilerplate_run, text).strip()
 
     except Exception as e:
         logger.error(f"Error cleaning content: {e}")
         return text
 
+
+def clean_content_stream(chunks):
+    """
+    Incremental clean_content: consume text chunk by chunk and yield cleaned output as it is ready.
+
+    Text is cleaned a block of whole lines at a time, so memory is bounded by the chunk size and
+    the longest line; joining the output equals clean_content of the joined input.
+
+    Args:
+        chunks (iterable): Pieces of the raw text, e.g. a streamed page body.
+
+    Yields:
+        str: Cleaned pieces of the text.
+    """
+    tail = []  # Input after the last newline seen, not cleaned yet
+    ends_with_newline = False  # Whether the cleaned output so far ends with a newline
+    started = False  # Whether non-whitespace output was yielded (leading whitespace is stripped)
+    held_whitespace = ""  # Trailing whitespace, only yielded if more text follows
+
+    def blocks():
+        for chunk in chunks:
+            cut = chunk.rfind("\n") + 1
+            if not cut:
+                tail.append(chunk)
+                continue
+            tail.append(chunk[:cut])
+            block = "".join(tail)
+            tail[:] = [chunk[cut:]]
+            yield block
+        yield "".join(tail)
+
+    for block in blocks():
+        cleaned = _CLEAN_PATTERN.sub(_replace_boilerplate_run, block)
+        if ends_with_newline and cleaned.startswith("\n"):
+            cleaned = cleaned[1:]  # The newline run continues across the block boundary
+        if not cleaned:
+            continue
+        ends_with_newline = cleaned.endswith("\n")
+
+        if not started:
+            cleaned = cleaned.lstrip()
+            if not cleaned:
+                continue
+            started = True
+        body = cleaned.rstrip()
+        if body:
+            yield held_whitespace + body
+            held_whitespace = cleaned[len(body):]
+        else:
+            held_whitespace += cleaned
+
@@ -1,9 +1,22 @@
+import json
 import logging
-import tiktoken
-from langchain import requests
-from langchain.adapters import openai
-
-from src.integration_nodes import TavilyAPI, OpenAINode, clean_content
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+
+from src.integration_nodes import (
+    TavilyAPI, OpenAINode, AsyncTavilyAPI, AsyncOpenAINode, clean_content, client_error_types, DEFAULT_POOL_SIZE
+)
+from src.batch import run_batch, DEFAULT_MAX_CONCURRENCY
+from src.utils.tokenizer import count_tokens, DEFAULT_MODEL
+from src.context_packer import pack_context, dedupe_snippets
+from src.reranker import rerank_passages
+from src.search_results import parse_search_response, json_default
+from src.fanout import expand_query, merge_search_results, fan_out, fan_out_async, DEFAULT_SUB_QUERIES
+from src.utils.singleflight import SingleFlight
+from src.utils.metrics import get_registry, traced
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -11,14 +24,16 @@ logger = logging.getLogger(__name__)
 
 # Constants for Token Management
 MAX_TOKENS = 3000  # Reserve tokens for query and prompts
+CONTEXT_SEPARATOR = "\n\n"  # Joins the selected snippets
 
-def count_tokens(text):
+def _summarize_search(search_results):
     """
-    Calculates the exact number of tokens using OpenAI's tokenizer.
+    Span attributes for the fetch stage.
     """
-    tokenizer = tiktoken.encoding_for_model("gpt-4")
-    return len(tokenizer.encode(text))
+    return {"results": len(search_results.get("results") or [])}
+
 
+@traced("fetch", summarize=_summarize_search)
 def fetch_search_results(tavily_api, query):
     """
     Fetch search results from Tavily API.
@@ -39,65 +54,162 @@ def fetch_search_results(tavily_api, query):
         if not results or "results" not in results:
             return {"error": "No results found from Tavily API."}
         return results
-    except requests.exceptions.RequestException as e:
+    except client_error_types("requests.exceptions.RequestException") as e:
+        return {"error": f"Error fetching results: {str(e)}"}
+
+@traced("fetch", summarize=_summarize_search)
+async def fetch_search_results_async(tavily_api, query):
+    """
+    Fetch search results from Tavily API without blocking the event loop.
+
+    Args:
+        tavily_api (AsyncTavilyAPI): Instance of AsyncTavilyAPI.
+        query (str): The user's search query.
+
+    Returns:
+        dict: The JSON response from Tavily API or an error message.
+    """
+    if not query.strip():
+        return {"error": "Query is empty. Provide a valid search query."}
+
+    try:
+        results = await tavily_api.search(query)
+        if not results or "results" not in results:
+            return {"error": "No results found from Tavily API."}
+        return results
+    except Exception as e:
         return {"error": f"Error fetching results: {str(e)}"}
 
-def process_search_results(search_results, max_results=3):
+def _summarize_fanout(search_results):
+    """
+    Span attributes for the fan-out stage.
+    """
+    return {"results": len(search_results.get("results") or []),
+            "sub_queries": len(search_results.get("sub_queries") or [])}
+
+
+@traced("fanout", summarize=_summarize_fanout)
+def fetch_fanout_results(tavily_api, query, max_sub_queries=DEFAULT_SUB_QUERIES, executor=None):
+    """
+    Search for several rule-based reformulations of a query concurrently and merge the results.
+
+    The sub-queries (see src.fanout.expand_query) are searched at the same time, so the fetch
+    takes about one round trip however many there are, and the results are merged with
+    duplicate URLs removed. Sub-queries that fail are left out of the merge.
+
+    Args:
+        tavily_api (TavilyAPI): Instance of TavilyAPI.
+        query (str): The user's search query.
+        max_sub_queries (int): Searches to run, including the query itself.
+        executor (concurrent.futures.Executor, optional): Runs the extra searches.
+
+    Returns:
+        dict: The merged Tavily response, with the "sub_queries" that succeeded, or an error message.
+    """
+    if not query.strip():
+        return {"error": "Query is empty. Provide a valid search query."}
+
+    sub_queries = expand_query(query, max_sub_queries)
+    responses = fan_out(partial(fetch_search_results, tavily_api), sub_queries, executor)
+    return merge_search_results(sub_queries, responses)
+
+
+@traced("fanout", summarize=_summarize_fanout)
+async def fetch_fanout_results_async(tavily_api, query, max_sub_queries=DEFAULT_SUB_QUERIES):
+    """
+    Asyncio counterpart of fetch_fanout_results.
+
+    Args:
+        tavily_api (AsyncTavilyAPI): Instance of AsyncTavilyAPI.
+        query (str): The user's search query.
+        max_sub_queries (int): Searches to run, including the query itself.
+
+    Returns:
+        dict: The merged Tavily response or an error message.
+    """
+    if not query.strip():
+        return {"error": "Query is empty. Provide a valid search query."}
+
+    sub_queries = expand_query(query, max_sub_queries)
+    responses = await fan_out_async(partial(fetch_search_results_async, tavily_api), sub_queries)
+    return merge_search_results(sub_queries, responses)
+
+
+def process_search_results(search_results, max_results=3, query=None):
     """
     Process the search results and extract relevant information efficiently.
 
     Args:
         search_results (dict): The JSON response from Tavily API.
         max_results (int): The maximum number of results to process.
+        query (str, optional): The user's query; when given, passages are reranked by relevance.
 
     Returns:
         str: A concatenated string of search results' content or an error message.
     """
+    context, _ = select_context(search_results, max_results, query)
+    return context
+
+
+@traced("process", summarize=lambda selected: {"context_tokens": selected[1]})
+def select_context(search_results, max_results=3, query=None, max_tokens=MAX_TOKENS, model=DEFAULT_MODEL,
+                   max_passages=None):
+    """
+    Select the context for the prompt and report how many tokens its snippets use.
+
+    The first max_results distinct snippets are used. Without a query, they are packed in search
+    order. With a query, they are split into passages that are ranked by BM25 relevance to the
+    query and packed best-first until the token budget (or max_passages) is reached, so
+    lower-ranked passages still fill the budget when they fit.
+
+    Args:
+        search_results (dict): The JSON response from Tavily API.
+        max_results (int): The maximum number of results to process.
+        query (str, optional): The user's query, to rerank passages by relevance.
+        max_tokens (int): Token budget of the context.
+        model (str): The model whose tokenizer measures the budget.
+        max_passages (int, optional): With a query, the maximum number of passages to pack;
+            None packs as many as the budget holds.
+
+    Returns:
+        tuple: (context, tokens) where context is the concatenated content (or an error dict)
+        and tokens is its token count including the separators, used to meter OpenAI budgets.
+    """
     # Check if search_results is valid
-    if not search_results or not isinstance(search_results, dict):
-        return {"error": "Invalid search results format. Expected a dictionary."}
+    if not search_results or not isinstance(search_results, Mapping):
+        return {"error": "Invalid search results format. Expected a dictionary."}, 0
 
     results = search_results.get("results", [])
     if not results:
-        return {"error": "No valid search results found."}
+        return {"error": "No valid search results found."}, 0
 
     try:
-        context = []
-        current_tokens = 0
-
-        # Lazy processing of search results
-        def process_result(result):
-            if not isinstance(result, dict):
-                return None  # Skip invalid result formats
-            content = result.get("content", "").strip()
-            if not content:
-                return None  # Skip empty content
-            tokens = count_tokens(content)
-            return {"content": content, "tokens": tokens}
-
-        # Process results efficiently
-        for result in results:
-            processed = process_result(result)
-            if not processed:
-                continue  # Skip invalid or empty results
-
-            if current_tokens + processed["tokens"] > MAX_TOKENS:
-                break  # Stop if token limit is exceeded
-
-            context.append(processed["content"])
-            current_tokens += processed["tokens"]
-
-            if len(context) >= max_results:
-                break  # Stop if maximum results are processed
+        contents = [
+            result.get("content", "").strip()
+            for result in results
+            if isinstance(result, Mapping)  # Skip invalid result formats
+        ]
+
+        if query and query.strip():
+            # Rank the passages of the distinct snippets and pack the most relevant ones
+            context, current_tokens = rerank_passages(
+                query, dedupe_snippets(contents, limit=max_results), max_tokens, model=model,
+                max_passages=max_passages
+            )
+        else:
+            # Clean, drop near-duplicates and fill the token budget, truncating the last snippet
+            context, current_tokens = pack_context(contents, max_tokens, max_snippets=max_results, model=model)
 
         if not context:
-            return {"error": "All processed results are empty or invalid."}
+            return {"error": "All processed results are empty or invalid."}, 0
 
-        return "\n\n".join(context)
+        # The separators are not part of the packed snippets but do reach the prompt
+        current_tokens += (len(context) - 1) * count_tokens(CONTEXT_SEPARATOR, model)
+        return CONTEXT_SEPARATOR.join(context), current_tokens
 
     except Exception as e:
         logger.error(f"Error processing search results: {str(e)}")
-        return {"error": f"Unexpected error while processing search results: {str(e)}"}
+        return {"error": f"Unexpected error while processing search results: {str(e)}"}, 0
 
 
 def generate_response(openai_node, context, query):
@@ -120,63 +232,539 @@ def generate_response(openai_node, context, query):
         if not response:
             return {"error": "No response generated by OpenAI."}
         return response
-    except openai.error.OpenAIError as e:
+    except client_error_types("openai.OpenAIError") as e:
         return {"error": f"OpenAI error: {str(e)}"}
     except Exception as e:
         return {"error": f"Unexpected error generating response: {str(e)}"}
 
 
+async def generate_response_async(openai_node, context, query):
+    """
+    Generate a response based on the search context and query using OpenAI GPT-4, asynchronously.
+
+    Args:
+        openai_node (AsyncOpenAINode): Instance of AsyncOpenAINode.
+        context (str): The retrieved search results.
+        query (str): The user's search query.
+
+    Returns:
+        str: The generated response or an error message.
+    """
+    if not context.strip() or not query.strip():
+        return {"error": "Context or query is empty. Cannot generate a response."}
+
+    try:
+        response = await openai_node.generate_response(context, query)
+        if not response:
+            return {"error": "No response generated by OpenAI."}
+        return response
+    except Exception as e:
+        return {"error": f"Unexpected error generating response: {str(e)}"}
+
+
+def _relevant_links(search_results):
+    return [result.get("url") for result in search_results.get("results", []) if result.get("url")]
+
+
+class WorkflowEngine:
+    """
+    Long-lived workflow runner that owns the configured nodes and the workflow settings.
+
+    Build one engine and share it: its nodes keep their connection pools, caches, rate limiters
+    and circuit breakers across queries, API keys are read once, and every OpenAI node has a
+    client of its own. Nodes are created on first use, each with a SingleFlight of its own, so
+    concurrent calls for the same query share one search and one generation within the engine
+    but never across engines with different settings. run() and stream() can be called from
+    many threads at once; run_async() from many tasks, all on the event loop of its first call
+    (the async clients are bound to it).
+    """
+
+    def __init__(self, tavily_api=None, openai_node=None, async_tavily_api=None, async_openai_node=None,
+                 model=DEFAULT_MODEL, max_tokens=MAX_TOKENS, max_results=3, rerank=True, search_cache=None,
+                 response_cache=None, pool_size=DEFAULT_POOL_SIZE, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 hedge_policy=None, sub_queries=1, keep_raw=False, semantic_cache=None, max_passages=None):
+        """
+        Args:
+            tavily_api (TavilyAPI, optional): Node used by run() and stream().
+            openai_node (OpenAINode, optional): Node used by run() and stream().
+            async_tavily_api (AsyncTavilyAPI, optional): Node used by run_async().
+            async_openai_node (AsyncOpenAINode, optional): Node used by run_async().
+            model (str): Chat model of the OpenAI nodes the engine creates; also sizes the context.
+            max_tokens (int): Token budget of the search context.
+            max_results (int): Search results whose snippets are packed into the context.
+            rerank (bool): Rank passages by relevance to the query instead of packing in search order.
+            search_cache: Optional cache (see src.utils.cache) for the Tavily nodes the engine creates.
+            response_cache: Optional cache for the OpenAI nodes the engine creates.
+            pool_size (int): Keep-alive connections of the Tavily nodes the engine creates.
+            max_concurrency (int): Default number of queries run_many() processes at once.
+            hedge_policy (HedgePolicy, optional): Hedges slow searches of the Tavily nodes the engine
+                creates (see src.utils.hedging).
+            sub_queries (int): Searches per query; above 1, every query is fanned out into that
+                many concurrent reformulations whose results are merged (see src.fanout).
+            keep_raw (bool): Keep the raw Tavily payloads on the search results of the Tavily nodes
+                the engine creates; by default only the fields the workflow uses are kept.
+            semantic_cache (SemanticCache, optional): Answers paraphrases of past queries from their
+                stored results (see src.semantic_cache); saved to its path on close().
+            max_passages (int, optional): When rerank is True, the maximum number of passages packed
+                into the context; None fills the token budget.
+        """
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_results = max_results
+        self.max_passages = max_passages
+        self.rerank = rerank
+        self.search_cache = search_cache
+        self.response_cache = response_cache
+        self.pool_size = pool_size
+        self.max_concurrency = max_concurrency
+        self.hedge_policy = hedge_policy
+        self.sub_queries = sub_queries
+        self.keep_raw = keep_raw
+        self.semantic_cache = semantic_cache
+        self._fanout_executor = None
+        self._nodes = {
+            "tavily": tavily_api,
+            "openai": openai_node,
+            "async_tavily": async_tavily_api,
+            "async_openai": async_openai_node,
+        }
+        self._lock = threading.Lock()
+
+    def _node(self, name, factory):
+        """
+        Return the node registered under name, creating it with factory() on first use.
+        """
+        node = self._nodes[name]
+        if node is None:
+            with self._lock:
+                node = self._nodes[name]
+                if node is None:
+                    node = self._nodes[name] = factory()
+        return node
+
+    @property
+    def tavily_api(self):
+        return self._node("tavily", lambda: TavilyAPI(
+            cache=self.search_cache, pool_size=self.pool_size, single_flight=SingleFlight(),
+            hedge_policy=self.hedge_policy, keep_raw=self.keep_raw
+        ))
+
+    @property
+    def openai_node(self):
+        return self._node("openai", lambda: OpenAINode(
+            model=self.model, cache=self.response_cache, single_flight=SingleFlight()
+        ))
+
+    @property
+    def async_tavily_api(self):
+        return self._node("async_tavily", lambda: AsyncTavilyAPI(
+            cache=self.search_cache, pool_size=self.pool_size, single_flight=SingleFlight(),
+            hedge_policy=self.hedge_policy, keep_raw=self.keep_raw
+        ))
+
+    @property
+    def async_openai_node(self):
+        return self._node("async_openai", lambda: AsyncOpenAINode(
+            model=self.model, cache=self.response_cache, single_flight=SingleFlight()
+        ))
+
+    @property
+    def fanout_executor(self):
+        """
+        Thread pool running the extra searches of fanned-out queries, created on first use.
+        """
+        if self._fanout_executor is None:
+            with self._lock:
+                if self._fanout_executor is None:
+                    self._fanout_executor = ThreadPoolExecutor(
+                        max_workers=self.pool_size, thread_name_prefix="fanout"
+                    )
+        return self._fanout_executor
+
+    def fetch(self, user_query):
+        """
+        Fetch the search results for a query, fanned out if sub_queries is above 1.
+        """
+        if self.sub_queries > 1:
+            return fetch_fanout_results(self.tavily_api, user_query, self.sub_queries, self.fanout_executor)
+        return fetch_search_results(self.tavily_api, user_query)
+
+    async def afetch(self, user_query):
+        """
+        Asyncio counterpart of fetch().
+        """
+        if self.sub_queries > 1:
+            return await fetch_fanout_results_async(self.async_tavily_api, user_query, self.sub_queries)
+        return await fetch_search_results_async(self.async_tavily_api, user_query)
+
+    def cached_answer(self, user_query):
+        """
+        Return the stored result of a similar past query from the semantic cache, or None.
+
+        The result carries "semantic_cache" with the matched query and its similarity.
+        """
+        if self.semantic_cache is None:
+            return None
+        hit = self.semantic_cache.lookup(user_query)
+        get_registry().increment("semantic_cache_requests_total", outcome="miss" if hit is None else "hit")
+        if hit is None:
+            return None
+
+        answer, matched_query, similarity = hit
+        logger.info(f"Answering '{user_query}' from the semantic cache (matched '{matched_query}', {similarity:.2f}).")
+        return dict(
+            answer, search_results=parse_search_response(answer.get("search_results")),
+            semantic_cache={"query": matched_query, "similarity": round(similarity, 4)}
+        )
+
+    def remember_answer(self, user_query, result):
+        """
+        Store a successful result in the semantic cache, as plain JSON so the cache can be saved.
+        """
+        if self.semantic_cache is None or "error" in result:
+            return
+        result = {key: value for key, value in result.items() if key not in ("timings", "semantic_cache")}
+        self.semantic_cache.store(user_query, json.loads(json.dumps(result, default=json_default)))
+
+    def select_context(self, search_results, query):
+        """
+        Select the prompt context for a query with the engine's settings (see select_context).
+        """
+        return select_context(
+            search_results, self.max_results, query if self.rerank else None,
+            max_tokens=self.max_tokens, model=self.model, max_passages=self.max_passages
+        )
+
+    @traced("workflow")
+    def run(self, user_query):
+        """
+        Fetch search results for a query and generate a response.
+
+        Args:
+            user_query (str): The user's search query.
+
+        Returns:
+            dict: Contains search results and the GPT-4 response, or an error message.
+        """
+        # Validate user query
+        if not isinstance(user_query, str) or not user_query.strip():
+            logger.error("User query is empty. Please provide a valid query.")
+            return {"error": "Invalid user query. The query cannot be empty."}
+
+        cached = self.cached_answer(user_query)
+        if cached is not None:
+            return cached
+
+        # Fetch search results
+        logger.info("Fetching search results from Tavily API...")
+        search_results = self.fetch(user_query)
+
+        if not search_results or "error" in search_results:
+            return {
+                "error": search_results.get("error", "No results from Tavily API.")
+            }
+
+        # Process search results
+        logger.info("Processing search results...")
+        context, context_tokens = self.select_context(search_results, user_query)
+
+        if not context or (isinstance(context, dict) and "error" in context):
+            return {
+                "search_results": search_results,
+                "error": context.get("error", "No valid context for response generation.")
+            }
+
+        # Generate GPT-4 response
+        logger.info("Generating response with OpenAI...")
+        gpt_response = self.openai_node.generate_response(context, user_query, context_tokens=context_tokens)
+
+        if not gpt_response:
+            return {
+                "search_results": search_results,
+                "error": "Failed to generate a response using GPT-4. Please refine your query and try again."
+            }
+
+        logger.info("Workflow complete. Returning results...")
+        result = {
+            "search_results": search_results,
+            "gpt_response": gpt_response,
+            "relevant_links": _relevant_links(search_results)
+        }
+        self.remember_answer(user_query, result)
+        return result
+
+    def run_many(self, queries, max_concurrency=None):
+        """
+        Run many queries concurrently through run() (see src.batch.run_batch).
+
+        Args:
+            queries (list): The queries to run.
+            max_concurrency (int, optional): Queries processed at once; defaults to the engine's setting.
+
+        Returns:
+            dict: "entries" with one {"query", "results", "elapsed"} dict per query, in input order,
+            and the timing "summary".
+        """
+        return run_batch(queries, self.run, max_concurrency=max_concurrency or self.max_concurrency)
+
+    def stream(self, user_query):
+        """
+        Streaming variant of run() that yields events as the workflow progresses.
+
+        Events are dicts with a "type" key:
+            - "search_results": {"search_results": ...}, once the search has returned
+            - "delta": {"content": str}, for each piece of the response as it is generated
+            - "result": {"result": dict}, last; the same result/error contract as run(), plus
+              "timings" with time_to_first_token and generation_time in seconds
+
+        Args:
+            user_query (str): The user's search query.
+
+        Yields:
+            dict: Workflow events.
+        """
+        # Validate user query
+        if not isinstance(user_query, str) or not user_query.strip():
+            logger.error("User query is empty. Please provide a valid query.")
+            yield {"type": "result", "result": {"error": "Invalid user query. The query cannot be empty."}}
+            return
+
+        cached = self.cached_answer(user_query)
+        if cached is not None:
+            yield {"type": "search_results", "search_results": cached["search_results"]}
+            yield {"type": "delta", "content": cached["gpt_response"]}
+            yield {"type": "result", "result": cached}
+            return
+
+        # Fetch search results
+        logger.info("Fetching search results from Tavily API...")
+        search_results = self.fetch(user_query)
+
+        if not search_results or "error" in search_results:
+            yield {"type": "result", "result": {"error": search_results.get("error", "No results from Tavily API.")}}
+            return
+        yield {"type": "search_results", "search_results": search_results}
+
+        # Process search results
+        logger.info("Processing search results...")
+        context, context_tokens = self.select_context(search_results, user_query)
+
+        if not context or (isinstance(context, dict) and "error" in context):
+            yield {"type": "result", "result": {
+                "search_results": search_results,
+                "error": context.get("error", "No valid context for response generation.")
+            }}
+            return
+
+        # Stream GPT-4 response
+        logger.info("Streaming response from OpenAI...")
+        parts = []
+        time_to_first_token = None
+        generation_start = perf_counter()
+        for delta in self.openai_node.generate_stream(context, user_query, context_tokens=context_tokens):
+            if time_to_first_token is None:
+                time_to_first_token = perf_counter() - generation_start
+            parts.append(delta)
+            yield {"type": "delta", "content": delta}
+        timings = {"time_to_first_token": time_to_first_token, "generation_time": perf_counter() - generation_start}
+
+        gpt_response = "".join(parts)
+        get_registry().record_span(
+            "generate", timings["generation_time"], error=None if gpt_response else "EmptyResult",
+            attributes={"time_to_first_token": time_to_first_token, "stream": True}
+        )
+        if not gpt_response:
+            yield {"type": "result", "result": {
+                "search_results": search_results,
+                "error": "Failed to generate a response using GPT-4. Please refine your query and try again.",
+                "timings": timings
+            }}
+            return
+
+        logger.info(
+            f"Workflow complete (first token after {time_to_first_token:.2f}s, "
+            f"generation took {timings['generation_time']:.2f}s)."
+        )
+        result = {
+            "search_results": search_results,
+            "gpt_response": gpt_response,
+            "relevant_links": _relevant_links(search_results),
+            "timings": timings
+        }
+        self.remember_answer(user_query, result)
+        yield {"type": "result", "result": result}
+
+    @traced("workflow")
+    async def run_async(self, user_query):
+        """
+        Asyncio counterpart of run() with the same result/error contract.
+
+        Args:
+            user_query (str): The user's search query.
+
+        Returns:
+            dict: Contains search results and the GPT-4 response, or an error message.
+        """
+        # Validate user query
+        if not isinstance(user_query, str) or not user_query.strip():
+            logger.error("User query is empty. Please provide a valid query.")
+            return {"error": "Invalid user query. The query cannot be empty."}
+
+        cached = self.cached_answer(user_query)
+        if cached is not None:
+            return cached
+
+        # Fetch search results
+        logger.info("Fetching search results from Tavily API...")
+        search_results = await self.afetch(user_query)
+
+        if not search_results or "error" in search_results:
+            return {
+                "error": search_results.get("error", "No results from Tavily API.")
+            }
+
+        # Process search results
+        logger.info("Processing search results...")
+        context, context_tokens = self.select_context(search_results, user_query)
+
+        if not context or (isinstance(context, dict) and "error" in context):
+            return {
+                "search_results": search_results,
+                "error": context.get("error", "No valid context for response generation.")
+            }
+
+        # Generate GPT-4 response
+        logger.info("Generating response with OpenAI...")
+        gpt_response = await self.async_openai_node.generate_response(
+            context, user_query, context_tokens=context_tokens
+        )
+
+        if not gpt_response:
+            return {
+                "search_results": search_results,
+                "error": "Failed to generate a response using GPT-4. Please refine your query and try again."
+            }
+
+        logger.info("Workflow complete. Returning results...")
+        result = {
+            "search_results": search_results,
+            "gpt_response": gpt_response,
+            "relevant_links": _relevant_links(search_results)
+        }
+        self.remember_answer(user_query, result)
+        return result
+
+    def close(self):
+        """
+        Close the synchronous nodes' HTTP clients and the fan-out thread pool, and save the
+        semantic cache if it has a path.
+        """
+        if self.semantic_cache is not None and self.semantic_cache.path is not None:
+            self.semantic_cache.save()
+        if self._fanout_executor is not None:
+            self._fanout_executor.shutdown(wait=True)
+            self._fanout_executor = None
+        for name in ("tavily", "openai"):
+            if self._nodes[name] is not None:
+                self._nodes[name].close()
+
+    async def aclose(self):
+        """
+        Close the async nodes' HTTP clients, on the loop they were used on.
+        """
+        for name in ("async_tavily", "async_openai"):
+            if self._nodes[name] is not None:
+                await self._nodes[name].aclose()
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine():
+    """
+    Return the process-wide engine used by ai_workflow, created with the default settings on first use.
+    """
+    global _default_engine
+    if _default_engine is None:
+        with _default_engine_lock:
+            if _default_engine is None:
+                _default_engine = WorkflowEngine()
+    return _default_engine
+
+
+def set_default_engine(engine):
+    """
+    Replace the process-wide engine (e.g. to change its settings or in tests); None resets it.
+    """
+    global _default_engine
+    with _default_engine_lock:
+        _default_engine = engine
+
+
 def ai_workflow(user_query):
     """
     Main workflow that fetches search results and generates a response.
 
+    Runs on the process-wide WorkflowEngine, so the nodes are shared by every call.
+
     Args:
         user_query (str): The user's search query.
 
     Returns:
         dict: Contains search results and the GPT-4 response.
     """
-    # Validate user query
-    if not user_query.strip():
-        logger.error("User query is empty. Please provide a valid query.")
-        return {"error": "Invalid user query. The query cannot be empty."}
+    return get_default_engine().run(user_query)
 
-    # Initialize Tavily API and OpenAI node
-    tavily_api = TavilyAPI()
-    openai_node = OpenAINode()
 
-    # Fetch search results
-    logger.info("Fetching search results from Tavily API...")
-    search_results = fetch_search_results(tavily_api, user_query)
+def ai_workflow_stream(user_query, tavily_api=None, openai_node=None):
+    """
+    Streaming variant of ai_workflow that yields events as the workflow progresses (see WorkflowEngine.stream).
 
-    if not search_results or "error" in search_results:
-        return {
-            "error": search_results.get("error", "No results from Tavily API.")
-        }
+    Args:
+        user_query (str): The user's search query.
+        tavily_api (TavilyAPI, optional): Tavily node to use instead of the process-wide engine's.
+        openai_node (OpenAINode, optional): OpenAI node to use instead of the process-wide engine's.
 
-    # Process search results
-    logger.info("Processing search results...")
-    context = process_search_results(search_results)
+    Yields:
+        dict: Workflow events.
+    """
+    engine = get_default_engine()
+    if tavily_api is not None or openai_node is not None:
+        engine = WorkflowEngine(
+            tavily_api=tavily_api or engine.tavily_api, openai_node=openai_node or engine.openai_node
+        )
+    yield from engine.stream(user_query)
 
-    if not context or (isinstance(context, dict) and "error" in context):
-        return {
-            "search_results": search_results,
-            "error": context.get("error", "No valid context for response generation.")
-        }
 
-    # Generate GPT-4 response
-    logger.info("Generating response with OpenAI...")
-    gpt_response = openai_node.generate_response(context, user_query)
+async def ai_workflow_async(user_query, tavily_api=None, openai_node=None):
+    """
+    Asyncio counterpart of ai_workflow with the same result/error contract.
 
-    if not gpt_response:
-        return {
-            "search_results": search_results,
-            "error": "Failed to generate a response using GPT-4. Please refine your query and try again."
-        }
+    Many calls can run concurrently on one event loop (e.g. via asyncio.gather). Pass
+    shared AsyncTavilyAPI / AsyncOpenAINode instances to reuse their connection pools;
+    otherwise nodes are created for this call and closed when it finishes. For a long-lived
+    setup, share a WorkflowEngine and await its run_async() instead.
+
+    Args:
+        user_query (str): The user's search query.
+        tavily_api (AsyncTavilyAPI, optional): Shared async Tavily node.
+        openai_node (AsyncOpenAINode, optional): Shared async OpenAI node.
 
-    logger.info("Workflow complete. Returning results...")
-    return {
-        "search_results": search_results,
-        "gpt_response": gpt_response,
-        "relevant_links": [result.get("url") for result in search_results.get("results", []) if result.get("url")]
-    }
+    Returns:
+        dict: Contains search results and the GPT-4 response.
+    """
+    owned_nodes = []
+    if tavily_api is None:
+        tavily_api = AsyncTavilyAPI()
+        owned_nodes.append(tavily_api)
+    if openai_node is None:
+        openai_node = AsyncOpenAINode()
+        owned_nodes.append(openai_node)
+
+    try:
+        engine = WorkflowEngine(async_tavily_api=tavily_api, async_openai_node=openai_node)
+        return await engine.run_async(user_query)
+    finally:
+        for node in owned_nodes:
+            await node.aclose()
@@ -1,9 +1,11 @@
 from src.utils.logger_config import configure_logging
-from src.utils.config import get_api_keys
+from src.utils.config import get_api_keys, get_metrics_config
 from src.integration_nodes import TavilyAPI, OpenAINode, logger
 from src.langgraph_workflow import fetch_search_results, process_search_results, generate_response, logger
+from src.batch import run_batch, DEFAULT_MAX_CONCURRENCY
+from src.utils.metrics import get_registry, serve_metrics, traced
+from functools import partial
 import logging
-from time import time
 import re
 
 
@@ -23,6 +25,7 @@ def check_config():
         raise SystemExit(f"Configuration error: {e}")
 
 
+@traced("workflow")
 def run_workflow_for_query(query, tavily_api, openai_node):
     """
     Executes the workflow for a single query, including fetching, processing, and generating results.
@@ -53,7 +56,7 @@ def run_workflow_for_query(query, tavily_api, openai_node):
         return search_results
 
     # Process search results
-    context = process_search_results(search_results)
+    context = process_search_results(search_results, query=query)
     if "error" in context:
         logger.error(context["error"])
         return context
@@ -70,9 +73,12 @@ def run_workflow_for_query(query, tavily_api, openai_node):
         "gpt_response": response
     }
 
-def run_test_ai_workflow():
+def run_test_ai_workflow(max_concurrency=DEFAULT_MAX_CONCURRENCY):
     """
     Runs tests for various queries through the LangGraph workflow and Tavily/OpenAI integration.
+
+    Args:
+        max_concurrency (int): Maximum number of queries processed at the same time.
     """
     test_queries = [
         "What is LangChain?",
@@ -89,14 +95,15 @@ def run_test_ai_workflow():
     tavily_api = TavilyAPI()
     openai_node = OpenAINode()
 
-    successful_tests = 0
-    start_time = time()
+    logger.info(f"\n--- Running {len(test_queries)} Workflows (max concurrency: {max_concurrency}) ---")
+    batch = run_batch(
+        test_queries,
+        partial(run_workflow_for_query, tavily_api=tavily_api, openai_node=openai_node),
+        max_concurrency=max_concurrency
+    )
 
-    for query in test_queries:
-        logger.info(f"\n--- Running Workflow for Query: '{query}' ---")
-        workflow_start = time()
-        results = run_workflow_for_query(query, tavily_api, openai_node)
-        workflow_time = time() - workflow_start
+    for entry in batch["entries"]:
+        query, results = entry["query"], entry["results"]
 
         print("\n--- Workflow Results ---")
         # print(f"Query: {query or '[EMPTY QUERY]'}\n{'-' * 50}")
@@ -124,26 +131,32 @@ def run_test_ai_workflow():
                         formatted_response += f"{sentence.strip()}\n"
             print(formatted_response.strip())
 
-            # Increment successful tests if no error and valid results
-            if results["search_results"] and results["gpt_response"]:
-                successful_tests += 1
-
-        logger.info(f"Workflow for query '{query}' completed in {workflow_time:.2f} seconds.\n")
+        print(f"(completed in {entry['elapsed']:.2f} seconds)")
 
-    total_time = time() - start_time
+    summary = batch["summary"]
 
     print("\n--- Test Timing Summary ---")
-    print(f"Total Queries: {len(test_queries)}")
-    print(f"Successful Workflows: {successful_tests}")
-    print(f"Failed Workflows: {len(test_queries) - successful_tests}")
-    print(f"Total Execution Time: {total_time:.2f} seconds")
-    print(f"Average Time Per Workflow: {total_time / len(test_queries):.2f} seconds")
-
+    print(f"Total Queries: {summary['total_queries']}")
+    print(f"Successful Workflows: {summary['successful']}")
+    print(f"Failed Workflows: {summary['failed']}")
+    print(f"Total Execution Time: {summary['total_time']:.2f} seconds")
+    print(f"Average Time Per Workflow: {summary['average_time']:.2f} seconds")
+    print(f"Slowest Workflow: {summary['max_query_time']:.2f} seconds")
+
+    # Export the per-stage metrics, if configured
+    prometheus_path = get_metrics_config()["prometheus_path"]
+    if prometheus_path:
+        get_registry().write_prometheus(prometheus_path)
+        logger.info(f"Metrics written to {prometheus_path}")
 
 if __name__ == "__main__":
     # Validate configuration
     check_config()
 
+    metrics_port = get_metrics_config()["port"]
+    if metrics_port:
+        serve_metrics(port=metrics_port)
+
     # Run all tests
     logger.info("\n--- Starting LangGraph Workflow Tests ---")
     run_test_ai_workflow()
@@ -0,0 +1,123 @@
+import logging
+import re
+
+from src.utils.tokenizer import DEFAULT_MODEL, count_tokens_batch
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+BM25_K1 = 1.5  # Term frequency saturation
+BM25_B = 0.75  # Passage length normalization
+PASSAGE_WORDS = 80  # Target passage size in words
+
+_WORD_PATTERN = re.compile(r"\w+")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def tokenize(text):
+    """
+    Split text into lowercase word terms.
+    """
+    return _WORD_PATTERN.findall(text.casefold())
+
+
+def split_passages(text, max_words=PASSAGE_WORDS):
+    """
+    Split text into passages of whole sentences, each of at most about max_words words.
+
+    A single sentence longer than max_words becomes a passage of its own.
+    """
+    passages = []
+    current = []
+    current_words = 0
+    for sentence in _SENTENCE_PATTERN.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        words = len(sentence.split())
+        if current and current_words + words > max_words:
+            passages.append(" ".join(current))
+            current, current_words = [], 0
+        current.append(sentence)
+        current_words += words
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def bm25_scores(query, passages, k1=BM25_K1, b=BM25_B):
+    """
+    Score every passage against the query with BM25 in one vectorized pass.
+
+    Args:
+        query (str): The user's query.
+        passages (list): Passage texts.
+        k1 (float): Term frequency saturation parameter.
+        b (float): Length normalization parameter.
+
+    Returns:
+        numpy.ndarray: One score per passage.
+    """
+    import numpy as np  # Imported on first use: it is only needed once a query is reranked
+
+    query_terms = sorted(set(tokenize(query)))
+    if not passages or not query_terms:
+        return np.zeros(len(passages))
+    term_ids = {term: idx for idx, term in enumerate(query_terms)}
+
+    # Term frequency matrix (passages x query terms), built from the query-term occurrences only
+    passage_terms = [tokenize(passage) for passage in passages]
+    lengths = np.fromiter((len(terms) for terms in passage_terms), dtype=np.float64, count=len(passages))
+    rows, cols = [], []
+    for row, terms in enumerate(passage_terms):
+        for term in terms:
+            col = term_ids.get(term)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    tf = np.zeros((len(passages), len(query_terms)))
+    np.add.at(tf, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+
+    document_frequency = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((len(passages) - document_frequency + 0.5) / (document_frequency + 0.5))
+    average_length = lengths.mean() or 1.0
+    norm = k1 * (1.0 - b + b * lengths / average_length)
+    return (idf * (tf * (k1 + 1.0)) / (tf + norm[:, None])).sum(axis=1)
+
+
+def rerank_passages(query, snippets, max_tokens, model=DEFAULT_MODEL, max_words=PASSAGE_WORDS, max_passages=None):
+    """
+    Split snippets into passages, rank them by BM25 relevance to the query and greedily pack
+    the best ones into the token budget.
+
+    Args:
+        query (str): The user's query.
+        snippets (list): Cleaned snippet texts.
+        max_tokens (int): The token budget for all selected passages together.
+        model (str): The model whose tokenizer is used.
+        max_words (int): Target passage size in words.
+        max_passages (int, optional): Stop once this many passages are selected; None fills the budget.
+
+    Returns:
+        tuple: (passages, tokens) with the selected passages, most relevant first, and their total token count.
+    """
+    import numpy as np
+
+    passages = [passage for snippet in snippets for passage in split_passages(snippet, max_words)]
+    if not passages:
+        return [], 0
+
+    scores = bm25_scores(query, passages)
+    token_counts = count_tokens_batch(passages, model)
+
+    selected = []
+    used_tokens = 0
+    for idx in np.argsort(-scores, kind="stable"):  # Ties keep the original (search engine) order
+        tokens = token_counts[idx]
+        if used_tokens + tokens <= max_tokens:
+            selected.append(passages[idx])
+            used_tokens += tokens
+            if max_passages is not None and len(selected) >= max_passages:
+                break
+    return selected, used_tokens
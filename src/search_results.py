@@ -0,0 +1,146 @@
+from collections.abc import Mapping
+
+
+class _Record(Mapping):
+    """
+    Base of the compact search records: a fixed set of slots that also reads like a dict.
+
+    Fields that are None are treated as absent, so record.get("url", "") and "url" in record
+    behave as they did on the raw Tavily JSON, and a record compares equal to the dict it was
+    parsed from when that dict held only the kept fields.
+    """
+
+    __slots__ = ()
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (field for field in self._fields if getattr(self, field) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self)
+        return f"{type(self).__name__}({fields})"
+
+    def replace(self, **changes):
+        """
+        Return a copy with the given fields replaced.
+        """
+        record = type(self).__new__(type(self))
+        for field in self._fields:
+            setattr(record, field, changes.get(field, getattr(self, field)))
+        return record
+
+
+class SearchResult(_Record):
+    """
+    One Tavily search hit, keeping only the fields the workflow uses.
+    """
+
+    __slots__ = ("title", "url", "content", "score")
+    _fields = __slots__
+
+    def __init__(self, title=None, url=None, content=None, score=None):
+        self.title = title
+        self.url = url
+        self.content = content
+        self.score = score
+
+    @classmethod
+    def from_json(cls, item):
+        """
+        Build a result from one entry of the Tavily "results" list.
+        """
+        score = item.get("score")
+        return cls(
+            title=item.get("title"),
+            url=item.get("url"),
+            content=item.get("content"),
+            score=float(score) if isinstance(score, (int, float)) else None,
+        )
+
+    def to_dict(self):
+        return dict(self)
+
+
+class SearchResponse(_Record):
+    """
+    A parsed Tavily response: its results as SearchResult records and the summary fields.
+
+    The raw payload is only kept when parsing is asked to (keep_raw), since it can be several
+    times larger than the fields used downstream (raw page content, images, follow-up questions).
+    """
+
+    __slots__ = ("query", "answer", "results", "response_time", "sub_queries", "raw")
+    _fields = __slots__
+
+    def __init__(self, query=None, results=None, answer=None, response_time=None, sub_queries=None, raw=None):
+        self.query = query
+        self.results = results if results is not None else []
+        self.answer = answer
+        self.response_time = response_time
+        self.sub_queries = sub_queries
+        self.raw = raw
+
+    @classmethod
+    def from_json(cls, payload, keep_raw=False):
+        """
+        Build a response from a Tavily JSON payload (or a SearchResponse.to_dict() of one).
+        """
+        return cls(
+            query=payload.get("query"),
+            results=[
+                item if isinstance(item, SearchResult) else SearchResult.from_json(item)
+                for item in payload.get("results") or []
+                if isinstance(item, Mapping)  # Skip invalid result formats
+            ],
+            answer=payload.get("answer"),
+            response_time=payload.get("response_time"),
+            sub_queries=payload.get("sub_queries"),
+            raw=payload if keep_raw else None,
+        )
+
+    def to_dict(self):
+        """
+        Convert to plain JSON-compatible dicts, e.g. for caches and JSON responses.
+        """
+        return {field: [result.to_dict() for result in value] if field == "results" else value
+                for field, value in self.items()}
+
+
+def parse_search_response(payload, keep_raw=False):
+    """
+    Parse a Tavily JSON payload into a SearchResponse once, right after it is received.
+
+    Payloads without a "results" list (e.g. an error body) are returned unchanged, so callers
+    keep reporting them as missing results.
+
+    Args:
+        payload: The decoded JSON body.
+        keep_raw (bool): Keep the full payload on the response as .raw.
+
+    Returns:
+        SearchResponse, or the payload itself if it is not a search response.
+    """
+    if isinstance(payload, SearchResponse):
+        return payload
+    if not isinstance(payload, Mapping) or not isinstance(payload.get("results"), list):
+        return payload
+    return SearchResponse.from_json(payload, keep_raw=keep_raw)
+
+
+def json_default(obj):
+    """
+    json.dumps default hook: search records become dicts, anything else its str().
+    """
+    if isinstance(obj, _Record):
+        return obj.to_dict()
+    return str(obj)
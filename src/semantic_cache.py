@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+
+from src.integration_nodes import normalize_query
+from src.reranker import tokenize
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 256  # Hashed feature dimensions; 1 KiB of float32 per entry
+DEFAULT_THRESHOLD = 0.95  # Cosine similarity from which a past answer is reused
+SIMILARITY_TOLERANCE = 1e-6  # Similarities are float32; this close to the threshold counts as reaching it
+DEFAULT_MAX_ENTRIES = 10000
+FORMAT_VERSION = 2  # Bumped when the hashing scheme changes, so stale files are not loaded
+
+# Words that never change what a query asks. Question words, auxiliaries, modals and
+# prepositions are kept: "When did..." and "Why did...", or "Who is..." and "Who was...", are
+# different questions with different answers.
+CACHE_STOPWORDS = frozenset({"a", "an", "the", "please"})
+# Leading phrases that ask for a definition or overview and are interchangeable
+_DEFINE_PATTERN = re.compile(r"^\W*(?:what\s+(?:is|are)|explain|describe|define|tell\s+me\s+about)\b", re.IGNORECASE)
+DEFINE_FEATURE = "<define>"
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def query_features(query):
+    """
+    Return the feature counts of a query: its words, case and punctuation ignored, without
+    CACHE_STOPWORDS. A leading "what is", "explain", "describe" or "tell me about" becomes one
+    shared feature, so "What is LangChain?" and "explain langchain" have the same features.
+    Words are not stemmed ("France" and "Frances" differ). One feature per word keeps lookups
+    cheap (see SemanticCache).
+    """
+    features = {}
+    match = _DEFINE_PATTERN.match(query)
+    for word in tokenize(query[match.end():] if match else query):
+        if word not in CACHE_STOPWORDS:
+            features[word] = features.get(word, 0) + 1
+    if match and features:
+        features[DEFINE_FEATURE] = 1
+    return features
+
+
+def key_terms(query):
+    """
+    Return the words that pin down what a query is about, casefolded: numbers, and words written
+    with a capital anywhere but at the start of the query (names such as "Germany" or "FIFA").
+    """
+    words = _WORD_PATTERN.findall(query)
+    return {word.casefold() for position, word in enumerate(words)
+            if any(char.isdigit() for char in word) or (position and not word.islower())}
+
+
+def shares_key_terms(query, other):
+    """
+    Return True if the key terms of each query all appear among the words of the other, so
+    "GDP of Germany in 2023" never matches "GDP of France in 2023" or "GDP of Germany in 2022",
+    however similar the rest of the query is.
+    """
+    return key_terms(query) <= set(tokenize(other)) and key_terms(other) <= set(tokenize(query))
+
+
+def embed_query(query, dim=DEFAULT_DIM):
+    """
+    Embed a query as a sparse, L2-normalized signed hashing vector.
+
+    Features are hashed with CRC-32, which is stable across processes (unlike hash()), so a
+    persisted index stays valid after a restart.
+
+    Args:
+        query (str): The query to embed.
+        dim (int): Number of hashed dimensions.
+
+    Returns:
+        tuple: (indices, values) numpy arrays of the nonzero dimensions; both empty if the
+        query has no content words.
+    """
+    import numpy as np  # Imported on first use, like the reranker
+
+    weights = {}
+    for feature, weight in query_features(query).items():
+        hashed = zlib.crc32(feature.encode("utf-8"))
+        index = hashed % dim
+        sign = 1.0 if hashed & 0x80000000 else -1.0
+        weights[index] = weights.get(index, 0.0) + sign * weight
+
+    indices = np.fromiter(weights.keys(), dtype=np.intp, count=len(weights))
+    values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+    norm = float(np.sqrt(np.dot(values, values)))
+    if norm == 0.0:
+        return indices[:0], values[:0]
+    return indices, values / norm
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query meaning rather than exact text.
+
+    Each query is embedded locally with a hashing vectorizer (see embed_query) and stored as a
+    column of a float32 NumPy matrix of shape (dim, capacity). A lookup only reads the rows of
+    the query's nonzero dimensions, so scoring every entry costs a few vector operations over
+    the entries rather than a full matrix product; top-1 is an argmax and top-k an
+    argpartition. A stored answer is returned when the best cosine similarity reaches the
+    threshold and both queries share their key terms (numbers and names, see shares_key_terms).
+    Bag-of-words similarity cannot tell every different question apart ("Who won..." and "Who
+    lost..." only differ by one word), so the threshold should stay high. When max_entries is reached the least recently used entry is evicted. Entries can
+    expire after ttl seconds, and save()/path persist the index to a .npz file.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES, dim=DEFAULT_DIM, ttl=None,
+                 path=None):
+        """
+        Args:
+            threshold (float): Minimum cosine similarity, in (0, 1], for a past answer to be reused.
+            max_entries (int): Maximum number of entries kept before the least recently used is evicted.
+            dim (int): Hashed feature dimensions of the embeddings.
+            ttl (float): Seconds an entry stays valid, or None to keep entries until evicted.
+            path (str, optional): .npz file the index is loaded from, if it exists, and saved to by save().
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1].")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.dim = dim
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        self._vectors = None  # (dim, capacity) float32, allocated on first store
+        self._last_used = None  # Access tick of every slot, for LRU eviction
+        self._expires = None  # Wall-clock expiry of every slot (inf when there is no ttl)
+        self._queries = []  # Slot -> stored query, None for a free slot
+        self._answers = []
+        self._slots = {}  # Normalized query -> slot
+        self._free = []
+        self._size = 0  # Slots in use or freed; scores are computed over [:_size]
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def lookup(self, query):
+        """
+        Return the answer stored for the most similar past query, or None on a miss. Only the
+        most similar query is considered: if its key terms differ, the lookup misses.
+
+        Returns:
+            tuple: (answer, matched_query, similarity), or None.
+        """
+        indices, values = embed_query(query, self.dim)
+        with self._lock:
+            matches = self._top_k(indices, values, 1) if len(indices) else []
+            if (not matches or matches[0][1] + SIMILARITY_TOLERANCE < self.threshold
+                    or not shares_key_terms(query, self._queries[matches[0][0]])):
+                self.misses += 1
+                return None
+
+            slot, similarity = matches[0]
+            if self._expires[slot] <= time.time():
+                self._remove(slot)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._tick += 1
+            self._last_used[slot] = self._tick
+            self.hits += 1
+            return self._answers[slot], self._queries[slot], similarity
+
+    def search(self, query, k=5):
+        """
+        Return the k most similar stored queries, regardless of the threshold.
+
+        Returns:
+            list: (stored_query, similarity) pairs, most similar first.
+        """
+        indices, values = embed_query(query, self.dim)
+        with self._lock:
+            if not len(indices):
+                return []
+            return [(self._queries[slot], similarity) for slot, similarity in self._top_k(indices, values, k)]
+
+    def _top_k(self, indices, values, k):
+        """
+        Score every stored entry against a sparse query vector and return the k best (slot, similarity).
+        """
+        import numpy as np
+
+        if self._size == 0:
+            return []
+        # Only the rows of the query's nonzero dimensions are read, one pass each
+        rows = self._vectors[:, :self._size]
+        scores = np.multiply(rows[indices[0]], values[0])
+        term = np.empty_like(scores)
+        for index, value in zip(indices[1:], values[1:]):
+            np.multiply(rows[index], value, out=term)
+            scores += term
+
+        if k == 1:
+            best = [int(np.argmax(scores))]
+        else:
+            # Most entries share no dimension with the query; rank only those that score above 0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+            best = candidates[np.argsort(scores[candidates])[::-1]].tolist()
+        return [(slot, float(scores[slot])) for slot in best if self._queries[slot] is not None]
+
+    def store(self, query, answer):
+        """
+        Store an answer for a query, replacing the entry of an identical (normalized) query.
+
+        Queries without content words (only stopwords) are not stored.
+
+        Returns:
+            bool: True if the answer was stored.
+        """
+        if answer is None:
+            raise ValueError("None values cannot be cached.")
+        indices, values = embed_query(query, self.dim)
+        if not len(indices):
+            return False
+
+        key = normalize_query(query)
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._allocate()
+            self._vectors[:, slot] = 0.0
+            self._vectors[indices, slot] = values
+            self._tick += 1
+            self._last_used[slot] = self._tick
+            self._expires[slot] = time.time() + self.ttl if self.ttl is not None else float("inf")
+            self._queries[slot] = query
+            self._answers[slot] = answer
+            self._slots[key] = slot
+        return True
+
+    def _allocate(self):
+        """
+        Return a free slot, growing the matrix or evicting the least recently used entry.
+        """
+        import numpy as np
+
+        if self._free:
+            return self._free.pop()
+        if self._size >= self.max_entries:
+            slot = int(np.argmin(self._last_used[:self._size]))
+            self._remove(slot)
+            self.evictions += 1
+            return self._free.pop()
+
+        capacity = 0 if self._vectors is None else self._vectors.shape[1]
+        if self._size == capacity:
+            self._resize(min(self.max_entries, max(64, 2 * capacity)))
+        self._queries.append(None)
+        self._answers.append(None)
+        self._size += 1
+        return self._size - 1
+
+    def _resize(self, capacity):
+        import numpy as np
+
+        vectors = np.zeros((self.dim, capacity), dtype=np.float32)
+        last_used = np.zeros(capacity, dtype=np.int64)
+        expires = np.full(capacity, np.inf)
+        if self._vectors is not None:
+            vectors[:, :self._size] = self._vectors[:, :self._size]
+            last_used[:self._size] = self._last_used[:self._size]
+            expires[:self._size] = self._expires[:self._size]
+        self._vectors, self._last_used, self._expires = vectors, last_used, expires
+
+    def _remove(self, slot):
+        """
+        Free a slot: its vector is zeroed so it can never match again.
+        """
+        self._slots.pop(normalize_query(self._queries[slot]), None)
+        self._vectors[:, slot] = 0.0
+        self._queries[slot] = None
+        self._answers[slot] = None
+        self._free.append(slot)
+
+    def clear(self):
+        """
+        Remove all entries. Counters are kept.
+        """
+        with self._lock:
+            self._vectors = self._last_used = self._expires = None
+            self._queries, self._answers, self._slots, self._free = [], [], {}, []
+            self._size = 0
+
+    def stats(self):
+        """
+        Return the hit/miss/eviction counters and the current size.
+        """
+        with self._lock:
+            return {
+                "size": len(self._slots),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._slots)
+
+    def save(self, path=None):
+        """
+        Write the index to a .npz file, atomically replacing an existing one.
+
+        Answers are stored as JSON, so they must be JSON-serializable.
+
+        Args:
+            path (str, optional): Target file; defaults to the path given at construction.
+        """
+        import numpy as np
+
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the semantic cache to.")
+        with self._lock:
+            size = self._size
+            metadata = {
+                "version": FORMAT_VERSION,
+                "dim": self.dim,
+                "queries": self._queries[:size],
+                "answers": self._answers[:size],
+            }
+            arrays = {
+                "vectors": self._vectors[:, :size] if size else np.zeros((self.dim, 0), dtype=np.float32),
+                "last_used": self._last_used[:size] if size else np.zeros(0, dtype=np.int64),
+                "expires": self._expires[:size] if size else np.zeros(0),
+            }
+            encoded = json.dumps(metadata).encode("utf-8")
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, metadata=np.frombuffer(encoded, dtype=np.uint8), **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """
+        Replace the entries with those of a file written by save(). Files from another hashing
+        scheme or dimension are ignored with a warning; expired entries are dropped. If the file
+        holds more than max_entries entries, the most recently used are kept.
+        """
+        import numpy as np
+
+        with np.load(path) as data:
+            metadata = json.loads(data["metadata"].tobytes().decode("utf-8"))
+            if metadata.get("version") != FORMAT_VERSION or metadata.get("dim") != self.dim:
+                logger.warning(f"Ignoring semantic cache file {path}: built with a different embedding.")
+                return
+            vectors, last_used, expires = data["vectors"], data["last_used"], data["expires"]
+
+        now = time.time()
+        occupied = np.fromiter((query is not None for query in metadata["queries"]), dtype=bool,
+                               count=len(metadata["queries"]))
+        live = np.flatnonzero(occupied & (expires > now))
+        if len(live) > self.max_entries:
+            live = np.sort(live[np.argsort(last_used[live], kind="stable")][-self.max_entries:])
+        with self._lock:
+            self._vectors = None
+            self._size = 0
+            self._resize(min(self.max_entries, max(64, len(live))))
+            # Copy by slice when every column is kept; gathering columns is much slower
+            self._vectors[:, :len(live)] = vectors if len(live) == vectors.shape[1] else vectors[:, live]
+            self._last_used[:len(live)] = last_used[live]
+            self._expires[:len(live)] = expires[live]
+            self._queries = [metadata["queries"][slot] for slot in live.tolist()]
+            self._answers = [metadata["answers"][slot] for slot in live.tolist()]
+            self._slots = {normalize_query(query): slot for slot, query in enumerate(self._queries)}
+            self._free = []
+            self._size = len(live)
+            self._tick = int(last_used[live].max()) if len(live) else 0
+        logger.info(f"Loaded {len(live)} semantic cache entries from {path}.")
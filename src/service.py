@@ -0,0 +1,284 @@
+"""
+HTTP service exposing the workflow as JSON in, JSON out.
+
+Endpoints:
+    POST /query    {"query": "..."} -> the workflow result (200), or {"error": ...} with 400 for
+                   invalid input, 502 when the workflow failed and 503 when the service is at
+                   capacity or shutting down
+    GET  /health   admission state; 503 while draining, so load balancers stop routing here
+    GET  /metrics  the Prometheus text export of the process-wide metrics registry
+
+At most max_concurrency queries run at once and at most max_queue more wait for a slot; further
+requests are rejected with 503 and a Retry-After header instead of queueing without bound. On
+SIGTERM/SIGINT the service stops admitting requests and drains the in-flight ones before exiting.
+
+Run from the repository root:
+    python -m src.service --port 8000 --max-concurrency 8 --max-queue 16
+"""
+import argparse
+import json
+import logging
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from src.utils.config import get_api_keys, get_service_config
+from src.search_results import json_default
+from src.utils.logger_config import configure_logging
+from src.utils.metrics import get_registry
+from src.batch import DEFAULT_MAX_CONCURRENCY
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+DEFAULT_MAX_QUEUE = 16  # Requests waiting for a worker slot before new ones are rejected
+DEFAULT_DRAIN_TIMEOUT = 30.0  # Seconds shutdown waits for in-flight requests
+RETRY_AFTER_SECONDS = 1  # Hint sent with 503 responses
+MAX_BODY_BYTES = 64 * 1024
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that dispatches to the owning WorkflowServer.
+    """
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            health = self.server.health()
+            self._send_json(503 if health["status"] == "draining" else 200, health)
+        elif path == "/metrics":
+            data = self.server.registry.to_prometheus().encode("utf-8")
+            self._send(200, data, "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": f"Unknown path: {path}"})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        if path != "/query":
+            self._send_json(404, {"error": f"Unknown path: {path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(400, {"error": f"Request body must be at most {MAX_BODY_BYTES} bytes."})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Invalid JSON body."})
+            return
+
+        query = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            self._send_json(400, {"error": "Invalid or empty query. Provide a JSON body like {\"query\": \"...\"}."})
+            return
+
+        status, payload = self.server.handle_query(query)
+        self._send_json(status, payload)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload, default=json_default).encode("utf-8"), "application/json")
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if status == 503:
+            self.send_header("Retry-After", str(RETRY_AFTER_SECONDS))
+        if self.server.draining:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.registry.increment("service_requests_total", status=str(status))
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class WorkflowServer(ThreadingHTTPServer):
+    """
+    HTTP server running workflow queries with bounded concurrency and a bounded admission queue.
+
+    Every request is handled on its own thread, but only max_concurrency of them run a query at
+    once; up to max_queue more wait for a slot and any beyond that are rejected with 503. Use as a
+    context manager, or call start() and stop().
+    """
+
+    daemon_threads = True
+
+    def __init__(self, engine=None, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_queue=DEFAULT_MAX_QUEUE, registry=None):
+        """
+        Args:
+            engine (WorkflowEngine, optional): Engine that runs the queries; defaults to the process-wide one.
+            host (str): Interface to listen on.
+            port (int): Port to listen on; 0 picks a free one.
+            max_concurrency (int): Queries processed at the same time.
+            max_queue (int): Admitted requests allowed to wait for a slot.
+            registry (MetricsRegistry, optional): Registry served at /metrics; defaults to the process-wide one.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative.")
+        if engine is None:
+            from src.langgraph_workflow import get_default_engine
+
+            engine = get_default_engine()
+        super().__init__((host, port), _ServiceHandler)
+        self.engine = engine
+        self.registry = registry or get_registry()
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.draining = False
+        self.admitted = 0  # Requests running or waiting for a slot
+        self.running = 0
+        self._slots = threading.Semaphore(max_concurrency)
+        self._state = threading.Condition()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def health(self):
+        """
+        Return the service status and its admission counters.
+        """
+        with self._state:
+            return {
+                "status": "draining" if self.draining else "ok",
+                "running": self.running,
+                "queued": self.admitted - self.running,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+    def handle_query(self, query):
+        """
+        Admit a query, wait for a worker slot and run it.
+
+        Returns:
+            tuple: (HTTP status, JSON payload).
+        """
+        with self._state:
+            if self.draining:
+                self.registry.increment("service_rejected_total", reason="draining")
+                return 503, {"error": "The service is shutting down. Retry on another instance."}
+            if self.admitted >= self.max_concurrency + self.max_queue:
+                self.registry.increment("service_rejected_total", reason="capacity")
+                return 503, {"error": "The service is at capacity. Retry later."}
+            self.admitted += 1
+
+        try:
+            queued_at = perf_counter()
+            with self._slots:
+                self.registry.observe("service_queue_wait_seconds", perf_counter() - queued_at)
+                with self._state:
+                    self.running += 1
+                try:
+                    result = self.engine.run(query)
+                finally:
+                    with self._state:
+                        self.running -= 1
+        except Exception as e:
+            logger.error(f"Unexpected error running workflow for query '{query}': {e}")
+            return 500, {"error": f"Unexpected error running workflow: {str(e)}"}
+        finally:
+            with self._state:
+                self.admitted -= 1
+                self._state.notify_all()
+
+        if not isinstance(result, dict) or "error" in result:
+            return 502, result if isinstance(result, dict) else {"error": "The workflow returned no result."}
+        return 200, result
+
+    def drain(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """
+        Stop admitting queries and wait for the admitted ones to finish.
+
+        Returns:
+            bool: True if every admitted query finished within the timeout.
+        """
+        with self._state:
+            self.draining = True
+            return self._state.wait_for(lambda: self.admitted == 0, timeout)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Serving the workflow at {self.url}")
+        return self
+
+    def stop(self, timeout=DEFAULT_DRAIN_TIMEOUT):
+        """
+        Drain in-flight queries, then stop serving and close the listening socket.
+        """
+        if not self.drain(timeout):
+            logger.warning(f"Shutting down with queries still in flight after {timeout:.1f}s.")
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    config = get_service_config()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=config["host"] or DEFAULT_HOST, help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=config["port"] or DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("--max-concurrency", type=int, default=config["max_concurrency"] or DEFAULT_MAX_CONCURRENCY,
+                        help="Queries processed at the same time.")
+    parser.add_argument("--max-queue", type=int,
+                        default=config["max_queue"] if config["max_queue"] is not None else DEFAULT_MAX_QUEUE,
+                        help="Requests waiting for a slot before new ones are rejected with 503.")
+    parser.add_argument("--drain-timeout", type=float, default=config["drain_timeout"] or DEFAULT_DRAIN_TIMEOUT,
+                        help="Seconds to wait for in-flight requests on shutdown.")
+    args = parser.parse_args()
+
+    configure_logging(level=logging.INFO)
+    try:
+        get_api_keys()
+    except ValueError as e:
+        raise SystemExit(f"Configuration error: {e}")
+
+    from src.integration_nodes import DEFAULT_POOL_SIZE
+    from src.langgraph_workflow import WorkflowEngine
+
+    engine = WorkflowEngine(pool_size=max(args.max_concurrency, DEFAULT_POOL_SIZE))
+    server = WorkflowServer(
+        engine, host=args.host, port=args.port, max_concurrency=args.max_concurrency, max_queue=args.max_queue
+    ).start()
+
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: stopping.set())
+    stopping.wait()
+
+    logger.info("Shutting down: draining in-flight requests...")
+    server.stop(args.drain_timeout)
+    engine.close()
+    logger.info("Service stopped.")
+
+
+if __name__ == "__main__":
+    main()
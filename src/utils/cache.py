@@ -0,0 +1,232 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory cache with LRU eviction and an optional time-to-live.
+
+    Values must not be None; a None return from get() always means a miss.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=None):
+        """
+        Args:
+            max_entries (int): Maximum number of entries kept before the least recently used is evicted.
+            ttl (float): Seconds an entry stays valid, or None to keep entries until evicted.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss or an expired entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+        """
+        if value is None:
+            raise ValueError("None values cannot be cached.")
+
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Remove an entry if present.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all entries. Counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the hit/miss/eviction counters and the current size.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    On-disk cache backed by SQLite, with the same interface as LRUCache.
+
+    Values are stored as JSON, so they must be JSON-serializable. Entries survive restarts;
+    the expiry time is stored as wall-clock time for that reason.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl=None):
+        """
+        Args:
+            path (str): Path of the SQLite database file (":memory:" for a private in-memory database).
+            max_entries (int): Maximum number of entries kept before the least recently used is evicted.
+            ttl (float): Seconds an entry stays valid, or None to keep entries until evicted.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(value)
+
+    def set(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+        """
+        if value is None:
+            raise ValueError("None values cannot be cached.")
+
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        serialized = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, serialized, expires_at, now)
+            )
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+            overflow = size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def delete(self, key):
+        """
+        Remove an entry if present.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Remove all entries. Counters are kept.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Return the hit/miss/eviction counters and the current size.
+        """
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+            return size
+
+
+def make_cache(path=None, max_entries=DEFAULT_MAX_ENTRIES, ttl=None):
+    """
+    Create an on-disk SQLiteCache when a path is given, otherwise an in-memory LRUCache.
+    """
+    if path:
+        return SQLiteCache(path, max_entries=max_entries, ttl=ttl)
+    return LRUCache(max_entries=max_entries, ttl=ttl)
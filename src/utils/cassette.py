@@ -0,0 +1,536 @@
+"""
+Record/replay of upstream HTTP calls for offline profiling.
+
+In record mode every request the nodes send to Tavily and OpenAI, and its response, is appended to
+a cassette: a JSON lines file (gzip-compressed when the path ends in .gz) with one interaction per
+line. Each line holds the service, method, path, the request body, the status, the content type,
+the response body, and the timing: seconds from the first request ("started"), to the complete
+response ("elapsed"), and of every chunk of a streamed response. API keys, tokens and request
+headers are never written.
+
+In replay mode the same calls are answered from the cassette without touching the network,
+either with the recorded latency or with none, so the CPU-side work of the workflow can be
+profiled deterministically. Requests are matched on their body (minus secrets); a request that was
+not recorded raises CassetteMissError. A lenient cassette (strict=False) instead serves the next
+unserved interaction of the same endpoint, e.g. when a change to context selection altered the
+prompt, and logs a warning for each such fallback since the answer belongs to another request.
+
+The nodes pick up the process-wide cassette (see get_cassette) when they create their HTTP
+clients, configured from UPSTREAM_CASSETTE / UPSTREAM_CASSETTE_MODE / UPSTREAM_CASSETTE_LATENCY.
+"""
+import codecs
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from src.utils.config import get_cassette_config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay")
+LATENCIES = ("original", "none")
+
+# Request and response fields that are never written to a cassette nor used for matching
+SECRET_FIELDS = frozenset({"api_key", "apikey", "key", "token", "access_token", "authorization", "password", "secret"})
+# Response headers kept; everything else (cookies, request ids, rate limit details) is dropped
+KEPT_HEADERS = ("content-type", "retry-after")
+
+
+class CassetteMissError(LookupError):
+    """
+    Raised in replay mode when a request has no recorded response.
+    """
+
+
+def strip_secrets(value):
+    """
+    Return a copy of a decoded JSON value without the fields named in SECRET_FIELDS, at any depth.
+    """
+    if isinstance(value, dict):
+        return {key: strip_secrets(item) for key, item in value.items() if key.lower() not in SECRET_FIELDS}
+    if isinstance(value, list):
+        return [strip_secrets(item) for item in value]
+    return value
+
+
+def _decode(content, content_type=""):
+    """
+    Decode a body: JSON when it parses as such, text otherwise, None when empty.
+    """
+    if not content:
+        return None
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    if "json" in content_type or content_type == "":
+        try:
+            return json.loads(content)
+        except ValueError:
+            pass
+    return content
+
+
+def _encode(body):
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    return json.dumps(body).encode("utf-8")
+
+
+def request_key(service, method, path, body):
+    """
+    Return the key requests are matched on: a digest of the endpoint and the body without secrets.
+    """
+    encoded = json.dumps([service, method, path, body], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:20]
+
+
+class Cassette:
+    """
+    A recording of upstream interactions, in record or replay mode (see the module docstring).
+
+    Thread-safe: the nodes' worker threads and event loops can record and replay concurrently.
+    """
+
+    def __init__(self, path, mode="replay", latency="original", strict=True):
+        """
+        Args:
+            path (str): The cassette file; .gz paths are gzip-compressed.
+            mode (str): "record" appends the live interactions, "replay" serves recorded ones.
+            latency (str): In replay, "original" waits as long as the recorded call took and
+                "none" answers at once.
+            strict (bool): In replay, raise CassetteMissError when a request body was not recorded.
+                False serves another recorded interaction of the same endpoint instead, with a
+                warning.
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got '{mode}'.")
+        if latency not in LATENCIES:
+            raise ValueError(f"latency must be one of {LATENCIES}, got '{latency}'.")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._file = None
+        self._origin = None  # perf_counter() of the first recorded request
+        self.interactions = []
+        self._by_key = defaultdict(list)  # Request key -> interaction indexes, in recorded order
+        self._by_endpoint = defaultdict(list)  # (service, method, path) -> interaction indexes
+        self._served = []
+        self._cursors = defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        self.fallbacks = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+
+    def _open(self, mode):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        with self._open("r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    interaction = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping an unreadable line in cassette {self.path}.")  # e.g. cut off by a crash
+                    continue
+                index = len(self.interactions)
+                self.interactions.append(interaction)
+                self._by_key[interaction["key"]].append(index)
+                self._by_endpoint[(interaction["service"], interaction["method"], interaction["path"])].append(index)
+                self._served.append(False)
+        logger.info(f"Loaded {len(self.interactions)} interactions from cassette {self.path}.")
+
+    def stats(self):
+        """
+        Return the recorded/replayed counters.
+        """
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "interactions": len(self.interactions) if self.mode == "replay" else self.recorded,
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "fallbacks": self.fallbacks,
+                "misses": self.misses,
+            }
+
+    def started(self):
+        """
+        Return the seconds since the first recorded request (0 for the first one).
+        """
+        with self._lock:
+            now = perf_counter()
+            if self._origin is None:
+                self._origin = now
+            return now - self._origin
+
+    def record(self, interaction):
+        """
+        Append an interaction to the cassette file.
+        """
+        line = json.dumps(interaction, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = self._open("a")
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def match(self, service, method, path, body):
+        """
+        Return the recorded interaction for a request (see the module docstring for the rules).
+
+        Raises:
+            CassetteMissError: If the endpoint was never recorded, or the body was not and the
+                cassette is strict.
+        """
+        key = request_key(service, method, path, body)
+        with self._lock:
+            index = self._next(key, self._by_key.get(key))
+            if index is None and not self.strict:
+                index = self._next((service, method, path), self._by_endpoint.get((service, method, path)))
+                if index is not None:
+                    self.fallbacks += 1
+                    logger.warning(
+                        f"No recorded {service} response for this {method} {path} body in {self.path}; "
+                        f"serving the one recorded for another request."
+                    )
+            if index is None:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded {service} response for {method} {path} in {self.path}.")
+            self._served[index] = True
+            self.replayed += 1
+            return self.interactions[index]
+
+    def _next(self, cursor, indexes):
+        """
+        Return the first unserved interaction of a list, or its last one once all were served.
+        """
+        if not indexes:
+            return None
+        position = self._cursors[cursor]
+        while position < len(indexes) and self._served[indexes[position]]:
+            position += 1
+        self._cursors[cursor] = position
+        return indexes[min(position, len(indexes) - 1)]
+
+    def delay(self, seconds):
+        """
+        Seconds to wait in replay for a recorded duration.
+        """
+        return seconds if self.latency == "original" and seconds > 0 else 0.0
+
+    def close(self):
+        """
+        Close the cassette file of a recording.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def requests_adapter(self, service, adapter):
+        """
+        Wrap a requests transport adapter (mount the result on a Session).
+        """
+        return _RequestsCassetteAdapter(self, service, adapter)
+
+    def transport(self, service, transport):
+        """
+        Wrap an httpx transport (pass the result to httpx.Client(transport=...)).
+        """
+        return _HttpxCassetteTransport(self, service, transport)
+
+    def async_transport(self, service, transport):
+        """
+        Wrap an httpx async transport (pass the result to httpx.AsyncClient(transport=...)).
+        """
+        return _AsyncHttpxCassetteTransport(self, service, transport)
+
+
+def _interaction(service, method, path, body, started, status, headers, elapsed, response_body=None, chunks=None):
+    interaction = {
+        "key": request_key(service, method, path, body),
+        "service": service,
+        "method": method,
+        "path": path,
+        "request": body,
+        "started": round(started, 6),
+        "status": status,
+        "headers": {name: headers[name] for name in KEPT_HEADERS if name in headers},
+        "elapsed": round(elapsed, 6),
+    }
+    if chunks is not None:
+        interaction["chunks"] = chunks
+    else:
+        interaction["body"] = strip_secrets(response_body)
+    return interaction
+
+
+def _is_stream(headers):
+    return headers.get("content-type", "").startswith("text/event-stream")
+
+
+class _ChunkRecorder:
+    """
+    Collects the chunks of a streamed response as (offset, text) pairs, decoding UTF-8 across chunk boundaries.
+    """
+
+    def __init__(self, start):
+        self.start = start
+        self.chunks = []
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def add(self, chunk):
+        self.chunks.append([round(perf_counter() - self.start, 6), self._decoder.decode(chunk)])
+
+    def finish(self):
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self.chunks.append([round(perf_counter() - self.start, 6), tail])
+        return self.chunks
+
+
+class _RequestsCassetteAdapter:
+    """
+    requests transport adapter that records through, or replays instead of, a real adapter.
+    """
+
+    def __init__(self, cassette, service, adapter):
+        self.cassette = cassette
+        self.service = service
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        path = urlsplit(request.url).path
+        body = strip_secrets(_decode(request.body))
+        if self.cassette.mode == "replay":
+            interaction = self.cassette.match(self.service, request.method, path, body)
+            time.sleep(self.cassette.delay(interaction["elapsed"]))
+            return self._build_response(request, interaction)
+
+        started = self.cassette.started()
+        request.headers["Accept-Encoding"] = "identity"  # Record plain bodies
+        start = perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        content = response.content
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        self.cassette.record(_interaction(
+            self.service, request.method, path, body, started, response.status_code, headers,
+            perf_counter() - start, _decode(content, headers.get("content-type", ""))
+        ))
+        return response
+
+    @staticmethod
+    def _build_response(request, interaction):
+        import datetime
+        import http.client
+        import requests
+
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = http.client.responses.get(interaction["status"], "")
+        response.headers = requests.structures.CaseInsensitiveDict(interaction["headers"])
+        response._content = _encode(interaction.get("body"))
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=interaction["elapsed"])
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class _HttpxCassetteTransport:
+    """
+    httpx transport that records through, or replays instead of, a real transport.
+    """
+
+    def __init__(self, cassette, service, transport):
+        self.cassette = cassette
+        self.service = service
+        self.transport = transport
+
+    def handle_request(self, request):
+        import httpx
+
+        body = strip_secrets(_decode(request.read()))
+        if self.cassette.mode == "replay":
+            interaction = self.cassette.match(self.service, request.method, request.url.path, body)
+            if "chunks" in interaction:
+                content = self._replay_chunks(interaction)
+            else:
+                time.sleep(self.cassette.delay(interaction["elapsed"]))
+                content = _encode(interaction.get("body"))
+            return httpx.Response(
+                interaction["status"], headers=interaction["headers"], content=content, request=request
+            )
+
+        started = self.cassette.started()
+        request.headers["Accept-Encoding"] = "identity"
+        start = perf_counter()
+        response = self.transport.handle_request(request)
+        return httpx.Response(
+            response.status_code, headers=response.headers, request=request, extensions=response.extensions,
+            content=self._record(request, body, started, start, response)
+        )
+
+    def _record(self, request, body, started, start, response):
+        """
+        Pass the response body through as it streams in, then record the interaction.
+        """
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        recorder = _ChunkRecorder(start) if _is_stream(headers) else None
+        parts = []
+        try:
+            for chunk in response.stream:
+                if recorder is not None:
+                    recorder.add(chunk)
+                else:
+                    parts.append(chunk)
+                yield chunk
+        finally:
+            response.close()
+        self.cassette.record(_interaction(
+            self.service, request.method, request.url.path, body, started, response.status_code, headers,
+            perf_counter() - start,
+            response_body=None if recorder else _decode(b"".join(parts), headers.get("content-type", "")),
+            chunks=recorder.finish() if recorder else None
+        ))
+
+    def _replay_chunks(self, interaction):
+        start = perf_counter()
+        for offset, text in interaction["chunks"]:
+            time.sleep(max(0.0, self.cassette.delay(offset) - (perf_counter() - start)))
+            yield text.encode("utf-8")
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    def __enter__(self):
+        if self.transport is not None:
+            self.transport.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _AsyncHttpxCassetteTransport(_HttpxCassetteTransport):
+    """
+    Asyncio variant of the httpx cassette transport.
+    """
+
+    async def handle_async_request(self, request):
+        import asyncio
+        import httpx
+
+        body = strip_secrets(_decode(await request.aread()))
+        if self.cassette.mode == "replay":
+            interaction = self.cassette.match(self.service, request.method, request.url.path, body)
+            if "chunks" in interaction:
+                content = self._areplay_chunks(interaction)
+            else:
+                await asyncio.sleep(self.cassette.delay(interaction["elapsed"]))
+                content = _encode(interaction.get("body"))
+            return httpx.Response(
+                interaction["status"], headers=interaction["headers"], content=content, request=request
+            )
+
+        started = self.cassette.started()
+        request.headers["Accept-Encoding"] = "identity"
+        start = perf_counter()
+        response = await self.transport.handle_async_request(request)
+        return httpx.Response(
+            response.status_code, headers=response.headers, request=request, extensions=response.extensions,
+            content=self._arecord(request, body, started, start, response)
+        )
+
+    async def _arecord(self, request, body, started, start, response):
+        headers = {name.lower(): value for name, value in response.headers.items()}
+        recorder = _ChunkRecorder(start) if _is_stream(headers) else None
+        parts = []
+        try:
+            async for chunk in response.stream:
+                if recorder is not None:
+                    recorder.add(chunk)
+                else:
+                    parts.append(chunk)
+                yield chunk
+        finally:
+            await response.aclose()
+        self.cassette.record(_interaction(
+            self.service, request.method, request.url.path, body, started, response.status_code, headers,
+            perf_counter() - start,
+            response_body=None if recorder else _decode(b"".join(parts), headers.get("content-type", "")),
+            chunks=recorder.finish() if recorder else None
+        ))
+
+    async def _areplay_chunks(self, interaction):
+        import asyncio
+
+        start = perf_counter()
+        for offset, text in interaction["chunks"]:
+            await asyncio.sleep(max(0.0, self.cassette.delay(offset) - (perf_counter() - start)))
+            yield text.encode("utf-8")
+
+    async def aclose(self):
+        if self.transport is not None:
+            await self.transport.aclose()
+
+    async def __aenter__(self):
+        if self.transport is not None:
+            await self.transport.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+_cassette = None
+_cassette_configured = False
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """
+    Return the process-wide cassette, configured from UPSTREAM_CASSETTE on first use, or None when
+    recording and replay are off. Nodes read it when they create their HTTP clients.
+    """
+    global _cassette, _cassette_configured
+    if not _cassette_configured:
+        with _cassette_lock:
+            if not _cassette_configured:
+                config = get_cassette_config()
+                if config["path"] is not None:
+                    _cassette = Cassette(config["path"], mode=config["mode"], latency=config["latency"])
+                    logger.info(f"Upstream calls are in {config['mode']} mode with cassette {config['path']}.")
+                _cassette_configured = True
+    return _cassette
+
+
+def set_cassette(cassette):
+    """
+    Replace the process-wide cassette (e.g. in tests or benchmarks); None turns recording and replay off.
+    """
+    global _cassette, _cassette_configured
+    with _cassette_lock:
+        _cassette = cassette
+        _cassette_configured = True
@@ -1,14 +1,33 @@
-from dotenv import load_dotenv
 import os
+import threading
 
-# Load API keys
-load_dotenv()
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def load_env():
+    """
+    Load the .env file into the environment once, on first use of any setting.
+
+    Deferred from import time so that importing the workflow does not touch the filesystem;
+    python-dotenv is imported only here.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            _env_loaded = True
 
 
 def get_api_keys():
     """
     Load API keys for Tavily and OpenAI from environment variables.
     """
+    load_env()
     tavily_key = os.getenv("TAVILY_API_KEY")
     openai_key = os.getenv("OPENAI_API_KEY")
 
@@ -20,3 +39,122 @@ def get_api_keys():
 
     return tavily_key, openai_key
 
+
+def _get_float_env(name):
+    """
+    Read an optional numeric environment variable.
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got '{value}'. Check your .env file.")
+
+
+def _get_int_env(name):
+    """
+    Read an optional integer environment variable.
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got '{value}'. Check your .env file.")
+
+
+def get_rate_limits():
+    """
+    Load the client-side rate limit budgets for Tavily and OpenAI from environment variables.
+
+    Unset variables mean no limit. Budgets are per minute:
+    TAVILY_RPM, OPENAI_RPM (requests) and OPENAI_TPM (prompt + completion tokens).
+    """
+    load_env()
+    return {
+        "tavily": {
+            "requests_per_minute": _get_float_env("TAVILY_RPM"),
+        },
+        "openai": {
+            "requests_per_minute": _get_float_env("OPENAI_RPM"),
+            "tokens_per_minute": _get_float_env("OPENAI_TPM"),
+        },
+    }
+
+
+def get_base_urls():
+    """
+    Load optional upstream endpoint overrides from environment variables, e.g. to point the
+    nodes at local stand-in servers.
+
+    TAVILY_BASE_URL replaces https://api.tavily.com and OPENAI_BASE_URL replaces
+    https://api.openai.com/v1. Unset variables mean the public endpoints (None).
+    """
+    load_env()
+    return {
+        "tavily": os.getenv("TAVILY_BASE_URL", "").strip() or None,
+        "openai": os.getenv("OPENAI_BASE_URL", "").strip() or None,
+    }
+
+
+def get_metrics_config():
+    """
+    Load the metrics export settings from environment variables.
+
+    METRICS_ENABLED turns recording on (1/true/yes); METRICS_JSONL_PATH appends every stage span to a
+    JSON lines file; METRICS_PROMETHEUS_PATH is a file the Prometheus text export is written to and
+    METRICS_PORT a port serving it at /metrics.
+    """
+    load_env()
+    return {
+        "enabled": os.getenv("METRICS_ENABLED", "").strip().lower() in ("1", "true", "yes"),
+        "jsonl_path": os.getenv("METRICS_JSONL_PATH", "").strip() or None,
+        "prometheus_path": os.getenv("METRICS_PROMETHEUS_PATH", "").strip() or None,
+        "port": _get_int_env("METRICS_PORT"),
+    }
+
+
+def get_cassette_config():
+    """
+    Load the upstream record/replay settings from environment variables.
+
+    UPSTREAM_CASSETTE is the cassette file (unset turns recording and replay off);
+    UPSTREAM_CASSETTE_MODE is "record" or "replay" (default); UPSTREAM_CASSETTE_LATENCY is
+    "original" (default) to replay with the recorded latency or "none" to answer at once.
+    """
+    load_env()
+    mode = os.getenv("UPSTREAM_CASSETTE_MODE", "").strip().lower() or "replay"
+    if mode not in ("record", "replay"):
+        raise ValueError(f"UPSTREAM_CASSETTE_MODE must be 'record' or 'replay', got '{mode}'. Check your .env file.")
+    latency = os.getenv("UPSTREAM_CASSETTE_LATENCY", "").strip().lower() or "original"
+    if latency not in ("original", "none"):
+        raise ValueError(
+            f"UPSTREAM_CASSETTE_LATENCY must be 'original' or 'none', got '{latency}'. Check your .env file."
+        )
+    return {
+        "path": os.getenv("UPSTREAM_CASSETTE", "").strip() or None,
+        "mode": mode,
+        "latency": latency,
+    }
+
+
+def get_service_config():
+    """
+    Load the HTTP service settings from environment variables.
+
+    SERVICE_HOST and SERVICE_PORT set the listening address; SERVICE_MAX_CONCURRENCY bounds the
+    queries processed at once and SERVICE_MAX_QUEUE the requests waiting for a slot, beyond which
+    requests are rejected; SERVICE_DRAIN_TIMEOUT is how many seconds shutdown waits for in-flight
+    requests. Unset variables mean the service defaults (None).
+    """
+    load_env()
+    return {
+        "host": os.getenv("SERVICE_HOST", "").strip() or None,
+        "port": _get_int_env("SERVICE_PORT"),
+        "max_concurrency": _get_int_env("SERVICE_MAX_CONCURRENCY"),
+        "max_queue": _get_int_env("SERVICE_MAX_QUEUE"),
+        "drain_timeout": _get_float_env("SERVICE_DRAIN_TIMEOUT"),
+    }
@@ -0,0 +1,214 @@
+import concurrent.futures
+import logging
+import threading
+from collections import deque
+from time import perf_counter
+
+from src.utils.metrics import get_registry
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class HedgePolicy:
+    """
+    Decides when a slow request is hedged with a second identical one, and how often.
+
+    The hedge delay adapts to the observed latency: once min_samples requests have completed it
+    is the given percentile of the last `window` latencies, clamped to [min_delay, max_delay];
+    before that it is initial_delay. Hedges are throttled by a token bucket: every request earns
+    max_hedge_rate tokens (up to burst) and every hedge spends one, so at most about that fraction
+    of requests is hedged even when the whole upstream slows down. Counters are exposed through
+    metrics() and as hedged_requests_total{service, outcome} in the metrics registry.
+    """
+
+    def __init__(self, percentile=95, initial_delay=1.0, min_delay=0.05, max_delay=10.0, max_hedge_rate=0.1,
+                 burst=10.0, window=256, min_samples=20, service="tavily"):
+        """
+        Args:
+            percentile (float): Latency percentile after which a request is hedged.
+            initial_delay (float): Hedge delay in seconds until min_samples latencies are known.
+            min_delay (float): Lower bound of the adaptive delay, so fast upstreams are not hedged on noise.
+            max_delay (float): Upper bound of the adaptive delay.
+            max_hedge_rate (float): Long-run fraction of requests that may be hedged.
+            burst (float): Hedges that may be issued back to back before the rate cap applies.
+            window (int): Recent latencies the percentile is computed over.
+            min_samples (int): Latencies needed before the delay adapts.
+            service (str): Label of the upstream in the metrics registry.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100.")
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.burst = burst
+        self.min_samples = min_samples
+        self.service = service
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._delay = None  # Cached percentile, recomputed after new samples arrive
+        self._tokens = burst
+        self._metrics = {"requests": 0, "hedges": 0, "hedges_won": 0, "throttled": 0}
+
+    def metrics(self):
+        """
+        Return a snapshot of the hedging counters and the current hedge delay.
+        """
+        with self._lock:
+            return dict(self._metrics, delay=self._current_delay())
+
+    def _count(self, name, outcome=None):
+        with self._lock:
+            self._metrics[name] += 1
+        if outcome is not None:
+            get_registry().increment("hedged_requests_total", service=self.service, outcome=outcome)
+
+    def record_latency(self, seconds):
+        """
+        Record the latency of a completed request.
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+            self._delay = None
+
+    def hedge_delay(self):
+        """
+        Return how long to wait for a request before hedging it, in seconds.
+        """
+        with self._lock:
+            return self._current_delay()
+
+    def _current_delay(self):
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        if self._delay is None:
+            ordered = sorted(self._latencies)
+            rank = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._delay = min(self.max_delay, max(self.min_delay, ordered[rank]))
+        return self._delay
+
+    def start_request(self):
+        """
+        Count a request and credit the hedge budget with max_hedge_rate tokens.
+        """
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._tokens = min(self.burst, self._tokens + self.max_hedge_rate)
+
+    def try_hedge(self):
+        """
+        Spend a hedge token; returns False when the hedge rate cap is reached.
+        """
+        with self._lock:
+            allowed = self._tokens >= 1
+            if allowed:
+                self._tokens -= 1
+        self._count("hedges" if allowed else "throttled", "issued" if allowed else "throttled")
+        return allowed
+
+
+def _timed(policy, func, args, started=None):
+    if started is not None:
+        started.set()
+    start = perf_counter()
+    result = func(*args)
+    policy.record_latency(perf_counter() - start)
+    return result
+
+
+def hedged_call(policy, executor, func, *args, on_discard=None):
+    """
+    Call func(*args) on an executor and hedge it with a second identical call if it is slow.
+
+    If the first call has not finished policy.hedge_delay() seconds after it started running (time
+    spent queued on a busy executor is not upstream latency) and the hedge budget allows, the call
+    is issued again and the first one to succeed wins. A losing call that has not started is
+    cancelled; one already in flight cannot be interrupted, so its result is passed to on_discard
+    (e.g. to close an HTTP response and release its connection) when it arrives. If both calls
+    fail, the first call's exception is raised.
+
+    Args:
+        policy (HedgePolicy): Decides the hedge delay and the hedge rate.
+        executor (concurrent.futures.Executor): Runs the calls; needs two free workers per caller.
+        func (callable): The request to make.
+        on_discard (callable, optional): Called with the result of a losing call.
+
+    Returns:
+        The result of the winning call.
+    """
+    policy.start_request()
+    started = threading.Event()
+    primary = executor.submit(_timed, policy, func, args, started)
+    started.wait()
+    try:
+        return primary.result(timeout=policy.hedge_delay())
+    except concurrent.futures.TimeoutError:
+        pass
+    if not policy.try_hedge():
+        return primary.result()
+
+    logger.debug("Request exceeded the hedge delay; sending a hedged request.")
+    hedge = executor.submit(_timed, policy, func, args)
+    winner = None
+    pending = {primary, hedge}
+    while pending and winner is None:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        winner = next((future for future in (primary, hedge) if future in done and future.exception() is None), None)
+    if winner is None:
+        raise primary.exception()
+
+    if winner is hedge:
+        policy._count("hedges_won", "won")
+    loser = primary if winner is hedge else hedge
+    if not loser.cancel() and on_discard is not None:
+        def discard(future):
+            if future.exception() is None:
+                on_discard(future.result())
+
+        loser.add_done_callback(discard)
+    return winner.result()
+
+
+async def _timed_async(policy, func, args):
+    start = perf_counter()
+    result = await func(*args)
+    policy.record_latency(perf_counter() - start)
+    return result
+
+
+async def hedged_call_async(policy, func, *args):
+    """
+    Asyncio counterpart of hedged_call: await func(*args) and hedge it if it is slow.
+
+    The losing request is cancelled, which closes its connection.
+
+    Returns:
+        The result of the winning call.
+    """
+    import asyncio
+
+    policy.start_request()
+    primary = asyncio.ensure_future(_timed_async(policy, func, args))
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=policy.hedge_delay())
+        if done or not policy.try_hedge():
+            return await primary
+
+        logger.debug("Request exceeded the hedge delay; sending a hedged request.")
+        hedge = asyncio.ensure_future(_timed_async(policy, func, args))
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in (primary, hedge):
+                if task in done and task.exception() is None:
+                    if task is hedge:
+                        policy._count("hedges_won", "won")
+                    return task.result()
+        raise primary.exception()
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,395 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from src.utils.config import get_metrics_config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Histogram buckets for stage durations, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    A timed workflow stage. Use as a context manager, via MetricsRegistry.span().
+
+    Spans opened inside another span (in the same thread or asyncio task) share its trace id, so
+    the stages of one query can be grouped in the JSON lines export.
+    """
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.attributes = {}
+        self.error = None
+        self._start = None
+        self._token = None
+
+    def set(self, **attributes):
+        """
+        Attach attributes to the span; integer attributes are also summed into per-stage counters.
+        """
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        """
+        Mark the span as failed with an error type, without raising.
+        """
+        self.error = error
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        self.registry.record_span(
+            self.name, duration, error=self.error, attributes=self.attributes,
+            trace_id=self.trace_id, span_id=self.span_id, parent_id=self.parent_id
+        )
+        return False
+
+
+class _NoopSpan:
+    """
+    Span returned by a disabled registry: every operation does nothing.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class MetricsRegistry:
+    """
+    Collects per-stage timings and counters for the workflow.
+
+    Every finished span updates the workflow_stage_duration_seconds histogram, the
+    workflow_stage_errors_total counter when it failed, and a workflow_stage_<attribute>_total
+    counter for each integer attribute (e.g. results, prompt_tokens). With a jsonl_path each span
+    is also appended to that file as one JSON object per line. A disabled registry records nothing
+    and its spans are no-ops.
+    """
+
+    def __init__(self, enabled=True, jsonl_path=None, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            enabled (bool): Record metrics; False makes every call a cheap no-op.
+            jsonl_path (str, optional): File that spans are appended to as JSON lines.
+            buckets (tuple): Upper bounds of the duration histogram buckets, in seconds.
+        """
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters = {}  # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: [bucket counts, sum, count]}
+        self._jsonl_file = None
+
+    def span(self, name):
+        """
+        Return a context manager timing a workflow stage.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name)
+
+    def annotate(self, **attributes):
+        """
+        Attach attributes to the span currently open in this thread or task, if any.
+        """
+        if not self.enabled:
+            return
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def increment(self, name, value=1, **labels):
+        """
+        Add value to a counter.
+        """
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Record a value in a histogram.
+        """
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][idx] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def record_span(self, name, duration, error=None, attributes=None, trace_id=None, span_id=None,
+                    parent_id=None):
+        """
+        Record a finished stage; Span calls this on exit, and it can be called directly for stages
+        that cannot be wrapped in a context manager (e.g. streamed generation).
+        """
+        if not self.enabled:
+            return
+        attributes = attributes or {}
+        self.observe("workflow_stage_duration_seconds", duration, stage=name)
+        if error is not None:
+            self.increment("workflow_stage_errors_total", stage=name, error=error)
+        for key, value in attributes.items():
+            if isinstance(value, int) and not isinstance(value, bool):
+                self.increment(f"workflow_stage_{key}_total", value, stage=name)
+
+        if self.jsonl_path:
+            self._write_jsonl({
+                "timestamp": time.time(),
+                "trace_id": trace_id,
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "stage": name,
+                "duration": duration,
+                "error": error,
+                "attributes": attributes,
+            })
+
+    def _write_jsonl(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                if self._jsonl_file is None:
+                    self._jsonl_file = open(self.jsonl_path, "a", encoding="utf-8")
+                self._jsonl_file.write(line + "\n")
+                self._jsonl_file.flush()
+            except OSError as e:
+                logger.error(f"Error writing metrics to {self.jsonl_path}: {e}")
+
+    def snapshot(self):
+        """
+        Return a copy of all counters and histograms.
+
+        Returns:
+            dict: {"counters": {name: {labels: value}}, "histograms": {name: {labels: {"buckets",
+            "sum", "count"}}}} where labels is a tuple of (label, value) pairs.
+        """
+        with self._lock:
+            return {
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "histograms": {
+                    name: {
+                        labels: {"buckets": dict(zip(self.buckets, counts)), "sum": total, "count": count}
+                        for labels, (counts, total, count) in series.items()
+                    }
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def to_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for name in sorted(snapshot["counters"]):
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(snapshot["counters"][name].items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name in sorted(snapshot["histograms"]):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(snapshot["histograms"][name].items()):
+                for bound, count in histogram["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_prometheus(self, path):
+        """
+        Write the Prometheus text export to a file, replacing it atomically (e.g. for the
+        node_exporter textfile collector).
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def reset(self):
+        """
+        Drop all recorded metrics.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def close(self):
+        """
+        Close the JSON lines file, if open.
+        """
+        with self._lock:
+            if self._jsonl_file is not None:
+                self._jsonl_file.close()
+                self._jsonl_file = None
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Return the process-wide registry, configured from METRICS_ENABLED / METRICS_JSONL_PATH on first use.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = get_metrics_config()
+                _registry = MetricsRegistry(enabled=config["enabled"], jsonl_path=config["jsonl_path"])
+    return _registry
+
+
+def set_registry(registry):
+    """
+    Replace the process-wide registry (e.g. to enable metrics programmatically or in tests).
+    """
+    global _registry
+    with _registry_lock:
+        _registry = registry
+
+
+def _result_error(result):
+    """
+    Return the error type of a stage's return value: None and error dicts count as failures.
+    """
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if result is None:
+        return "EmptyResult"
+    if isinstance(result, dict) and "error" in result:
+        return "ErrorResult"
+    return None
+
+
+def traced(stage, summarize=None):
+    """
+    Decorator that runs a function (or coroutine function) inside a span of the process-wide registry.
+
+    A return value of None or an error dict marks the span as failed, exceptions are recorded with
+    their type, and summarize(result), if given, returns attributes to attach to the span.
+    """
+    def decorator(func):
+        def finish(span, result):
+            error = _result_error(result)
+            if error is not None:
+                span.fail(error)
+            elif summarize is not None:
+                span.set(**summarize(result))
+            return result
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                registry = get_registry()
+                if not registry.enabled:
+                    return await func(*args, **kwargs)
+                with registry.span(stage) as span:
+                    return finish(span, await func(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            registry = get_registry()
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            with registry.span(stage) as span:
+                return finish(span, func(*args, **kwargs))
+        return wrapper
+
+    return decorator
+
+
+def serve_metrics(registry=None, host="127.0.0.1", port=9100):
+    """
+    Serve the Prometheus text export at http://host:port/metrics from a background thread.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or get_registry()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            data = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+
+from src.utils.config import get_rate_limits
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a per-minute rate.
+
+    Callers reserve tokens up front and then wait out any deficit, so concurrent callers are
+    paced in arrival order instead of all retrying at once. A request larger than the bucket
+    capacity is still admitted; it simply waits until the bucket has paid off its cost.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        """
+        Args:
+            rate_per_minute (float): Sustained rate at which tokens are added.
+            capacity (float): Maximum burst size; defaults to the whole per-minute budget, the
+                window the upstream limits are enforced over, so an idle bucket admits any request
+                that fits the budget at once.
+            clock (callable): Monotonic clock.
+        """
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive.")
+        self.rate = rate_per_minute / 60.0  # Tokens per second
+        self.capacity = capacity if capacity is not None else float(rate_per_minute)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def reserve(self, amount=1):
+        """
+        Reserve tokens and return the number of seconds the caller must wait before proceeding.
+        """
+        with self._lock:
+            self._refill()
+            wait = 0.0 if self._tokens >= amount else (amount - self._tokens) / self.rate
+            self._tokens -= amount
+            return wait
+
+    def adjust(self, delta):
+        """
+        Charge (positive) or refund (negative) tokens after the fact, e.g. once the actual usage is known.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    @property
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class RateLimiter:
+    """
+    Client-side limiter metering requests per minute and, optionally, tokens per minute.
+
+    acquire() blocks (acquire_async() awaits) until both budgets allow the call. Requests are
+    spread evenly over the minute (a burst of one second's worth), while the token budget can be
+    spent in one burst: a single completion may cost thousands of tokens.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, sleep=time.sleep, clock=time.monotonic):
+        self.requests = (
+            TokenBucket(requests_per_minute, capacity=max(1.0, requests_per_minute / 60.0), clock=clock)
+            if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._metrics = {"acquired": 0, "throttled": 0, "wait_seconds": 0.0}
+
+    def _reserve(self, tokens):
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+
+        with self._lock:
+            self._metrics["acquired"] += 1
+            if wait > 0:
+                self._metrics["throttled"] += 1
+                self._metrics["wait_seconds"] += wait
+        if wait > 0:
+            logger.info(f"Client-side rate limit reached; pacing request by {wait:.2f} seconds.")
+        return wait
+
+    def acquire(self, tokens=0):
+        """
+        Block until one request and the given number of tokens fit in the budget.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            self._sleep(wait)
+
+    async def acquire_async(self, tokens=0):
+        """
+        Wait without blocking the event loop until one request and the given tokens fit in the budget.
+        """
+        import asyncio  # Imported here so synchronous callers do not pay for it at import time
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token budget once the actual usage of a request is known.
+        """
+        if self.tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def metrics(self):
+        """
+        Return a snapshot of the limiter counters.
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+
+_shared_limiters = {}
+_shared_limiters_lock = threading.Lock()
+
+
+def shared_rate_limiter(service):
+    """
+    Return the process-wide limiter for a service ("tavily" or "openai"), built from the
+    budgets in get_rate_limits(), or None if no budget is configured for it.
+
+    Sharing one limiter per service keeps the budget global even when nodes are recreated.
+    """
+    with _shared_limiters_lock:
+        if service not in _shared_limiters:
+            limits = get_rate_limits().get(service, {})
+            if any(limits.values()):
+                _shared_limiters[service] = RateLimiter(**limits)
+            else:
+                _shared_limiters[service] = None
+        return _shared_limiters[service]
@@ -0,0 +1,266 @@
+import logging
+import random
+import threading
+import time
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit breaker is open.
+    """
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value (delay in seconds or an HTTP date) into seconds.
+
+    Returns:
+        float: Seconds to wait, or None if the value is missing or invalid.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    import email.utils  # Only HTTP-date values need it; most hints are plain seconds
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Fails fast once an upstream keeps failing.
+
+    After failure_threshold consecutive failures the circuit opens and calls are rejected
+    for recovery_timeout seconds. Then a single trial call is let through (half-open): its
+    success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """
+        Return True if a call may go through now.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Circuit breaker opened after repeated upstream failures.")
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+
+
+def retry_all(exc):
+    """
+    Default classifier: every exception is retryable and carries no Retry-After hint.
+    """
+    return True, None
+
+
+class RetryPolicy:
+    """
+    Retries a call with exponential backoff and full jitter.
+
+    Attempts are bounded both by max_attempts and by a total time budget, Retry-After hints
+    from the upstream are honored, and an optional CircuitBreaker fails fast when the
+    upstream keeps failing. Counters are exposed through metrics().
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, total_timeout=60.0,
+                 jitter=True, circuit_breaker=None, classify=retry_all,
+                 sleep=time.sleep, clock=time.monotonic):
+        """
+        Args:
+            max_attempts (int): Maximum number of attempts, including the first one.
+            base_delay (float): Backoff before the first retry, doubled on every retry.
+            max_delay (float): Upper bound for a single backoff delay.
+            total_timeout (float): Time budget in seconds for all attempts and backoffs; None for no budget.
+            jitter (bool): Randomize each delay in [0, backoff] so workers do not retry in lockstep.
+            circuit_breaker (CircuitBreaker): Optional breaker shared by all calls through this policy.
+            classify (callable): Maps an exception to (retryable, retry_after_seconds).
+            sleep (callable): Blocking sleep used between attempts.
+            clock (callable): Monotonic clock used for the time budget.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_timeout = total_timeout
+        self.jitter = jitter
+        self.circuit_breaker = circuit_breaker
+        self.classify = classify
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "successes": 0,
+            "failures": 0,
+            "circuit_rejections": 0,
+            "backoff_seconds": 0.0,
+        }
+
+    def metrics(self):
+        """
+        Return a snapshot of the retry counters.
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+
+    def compute_delay(self, retry_number, retry_after=None):
+        """
+        Compute the delay before a retry (retry_number starts at 1).
+
+        A Retry-After hint from the upstream takes precedence over the computed backoff.
+        """
+        if retry_after is not None:
+            return retry_after
+        backoff = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+    def _before_attempt(self):
+        if self.circuit_breaker is not None and not self.circuit_breaker.allow_request():
+            self._count("circuit_rejections")
+            raise CircuitOpenError("Circuit breaker is open; upstream is failing. Try again later.")
+        self._count("attempts")
+
+    def _next_delay(self, exc, attempt, deadline):
+        """
+        Record a failed attempt and return the delay before the next one, or None to give up.
+        """
+        retryable, retry_after = self.classify(exc)
+        if not retryable:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()  # The upstream answered; the request itself was bad
+            return None
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = self.compute_delay(attempt, retry_after)
+        if deadline is not None and self._clock() + delay > deadline:
+            logger.warning("Retry budget exhausted; giving up.")
+            return None
+
+        logger.warning(f"Attempt {attempt} failed ({type(exc).__name__}); retrying in {delay:.2f} seconds...")
+        self._count("retries")
+        self._count("backoff_seconds", delay)
+        return delay
+
+    def _on_success(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+        self._count("successes")
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs), retrying retryable failures according to this policy.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the call.
+            Exception: The last error once retries are exhausted or the error is not retryable.
+        """
+        self._count("calls")
+        deadline = self._clock() + self.total_timeout if self.total_timeout is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(e, attempt, deadline)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                self._sleep(delay)
+                continue
+            self._on_success()
+            return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """
+        Await func(*args, **kwargs), retrying retryable failures according to this policy.
+
+        Backoff uses asyncio.sleep, so waiting retries do not block the event loop.
+        """
+        import asyncio  # Imported here so synchronous callers do not pay for it at import time
+
+        self._count("calls")
+        deadline = self._clock() + self.total_timeout if self.total_timeout is not None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(e, attempt, deadline)
+                if delay is None:
+                    self._count("failures")
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._on_success()
+            return result
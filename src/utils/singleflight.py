@@ -0,0 +1,98 @@
+import threading
+
+
+class _Call:
+    """
+    An in-flight call shared by every caller with the same key.
+    """
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller for a key runs the function; callers arriving while it is in flight wait
+    for it and receive the same result, or the same exception. Once the call finishes the key
+    is released, so later calls run again (pair with a cache to reuse finished results).
+    Shared results are the same object for every caller and must not be mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self._metrics = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Call func(*args, **kwargs), or wait for the identical call already in flight for key.
+        """
+        with self._lock:
+            self._metrics["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._metrics["executions"] += 1
+            else:
+                self._metrics["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, func, *args, **kwargs):
+        """
+        Await func(*args, **kwargs), or join the identical call already in flight for key.
+
+        The upstream call runs as its own task, so a cancelled caller does not cancel it for
+        the others. All callers must share one event loop.
+        """
+        import asyncio  # Imported here so synchronous callers do not pay for it at import time
+
+        with self._lock:
+            self._metrics["calls"] += 1
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                self._tasks[key] = task
+                self._metrics["executions"] += 1
+                task.add_done_callback(lambda finished: self._release_task(key, finished))
+            else:
+                self._metrics["coalesced"] += 1
+
+        return await asyncio.shield(task)
+
+    def _release_task(self, key, task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # Mark the exception as retrieved when every caller was cancelled
+
+    def metrics(self):
+        """
+        Return the call counters and the number of calls currently in flight.
+        """
+        with self._lock:
+            return dict(self._metrics, in_flight=len(self._calls) + len(self._tasks))
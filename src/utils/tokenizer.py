@@ -0,0 +1,176 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+DEFAULT_MODEL = "gpt-4"
+TOKEN_MEMO_SIZE = 50000  # Maximum number of memoized token counts kept across queries
+
+# Context windows (prompt + completion tokens) by model name prefix; the longest matching prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-instruct": 4096,
+}
+DEFAULT_CONTEXT_WINDOW = 8192  # Assumed for unknown models
+
+# Chat formatting tokens the API adds around the message contents
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_PRIMING_TOKENS = 3  # Every reply is primed with <|start|>assistant<|message|>
+
+_token_memo = OrderedDict()
+_token_memo_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model=DEFAULT_MODEL):
+    """
+    Return the tiktoken encoding for a model, loading it only once per model.
+
+    tiktoken and its BPE files are loaded on the first call, not when this module is imported.
+    """
+    import tiktoken
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown (e.g. newly released or fine-tuned) models: use the encoding of current chat models
+        return tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "gpt-4.1")) else "cl100k_base")
+
+
+def context_window(model=DEFAULT_MODEL):
+    """
+    Return the context window of a model in tokens, shared by the prompt and the completion.
+
+    Dated and fine-tuned variants (e.g. "gpt-4o-2024-08-06", "ft:gpt-4o-mini:org::id") resolve to
+    their base model; unknown models get DEFAULT_CONTEXT_WINDOW.
+    """
+    name = model.split(":", 2)[1] if model.startswith("ft:") else model
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if name.startswith(prefix)]
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_WINDOW
+
+
+def _memo_key(text, model):
+    """
+    Build a compact memo key from the model name and a hash of the text.
+    """
+    return model, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """
+    Calculates the exact number of tokens using OpenAI's tokenizer.
+
+    Args:
+        text (str): The text to measure.
+        model (str): The model whose tokenizer is used.
+
+    Returns:
+        int: The number of tokens in the text.
+    """
+    return count_tokens_batch([text], model)[0]
+
+
+def count_tokens_batch(texts, model=DEFAULT_MODEL):
+    """
+    Count the tokens of several texts, encoding only the ones not seen before in a single batch.
+
+    Counts are memoized by content hash, so the same snippet is never re-tokenized across queries.
+
+    Args:
+        texts (list): The texts to measure.
+        model (str): The model whose tokenizer is used.
+
+    Returns:
+        list: The token count of each text, in input order.
+    """
+    keys = [_memo_key(text, model) for text in texts]
+    counts = [None] * len(texts)
+    missing = {}  # memo key -> index of the first text with that key
+
+    with _token_memo_lock:
+        for idx, key in enumerate(keys):
+            cached = _token_memo.get(key)
+            if cached is not None:
+                _token_memo.move_to_end(key)
+                counts[idx] = cached
+            elif key not in missing:
+                missing[key] = idx
+
+    if missing:
+        encoded = get_encoding(model).encode_batch([texts[idx] for idx in missing.values()])
+        new_counts = {key: len(tokens) for key, tokens in zip(missing, encoded)}
+
+        with _token_memo_lock:
+            for key, count in new_counts.items():
+                _token_memo[key] = count
+                _token_memo.move_to_end(key)
+            while len(_token_memo) > TOKEN_MEMO_SIZE:
+                _token_memo.popitem(last=False)
+
+        for idx, key in enumerate(keys):
+            if counts[idx] is None:
+                counts[idx] = new_counts[key]
+
+    return counts
+
+
+def count_message_tokens(messages, model=DEFAULT_MODEL):
+    """
+    Count the prompt tokens of a chat messages payload, including the chat formatting tokens.
+
+    Args:
+        messages (list): Chat messages, as sent to the chat completions API.
+        model (str): The model whose tokenizer is used.
+
+    Returns:
+        int: The number of prompt tokens the API bills for the messages.
+    """
+    values = [str(value) for message in messages for value in message.values()]
+    names = sum(1 for message in messages if "name" in message)
+    return (
+        sum(count_tokens_batch(values, model)) + TOKENS_PER_MESSAGE * len(messages)
+        + TOKENS_PER_NAME * names + REPLY_PRIMING_TOKENS
+    )
+
+
+def clear_token_memo():
+    """
+    Drop all memoized token counts.
+    """
+    with _token_memo_lock:
+        _token_memo.clear()
+
+
+def truncate_to_tokens(text, max_tokens, model=DEFAULT_MODEL):
+    """
+    Truncate text to at most max_tokens tokens, cutting at a token boundary.
+
+    Args:
+        text (str): The text to truncate.
+        max_tokens (int): The token budget.
+        model (str): The model whose tokenizer is used.
+
+    Returns:
+        tuple: (truncated_text, token_count).
+    """
+    if max_tokens <= 0:
+        return "", 0
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    tokens = tokens[:max_tokens]
+    truncated = encoding.decode(tokens)
+    # A cut inside a multi-byte character decodes to a replacement character; drop it
+    while truncated.endswith("�") and tokens:
+        tokens = tokens[:-1]
+        truncated = encoding.decode(tokens)
+    return truncated, len(tokens)
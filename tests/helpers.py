@@ -0,0 +1,28 @@
+"""
+Helpers shared by the test modules.
+"""
+from unittest.mock import patch, MagicMock
+from src.utils.tokenizer import clear_token_memo
+
+
+def make_fake_encoding():
+    """
+    Build a fake tiktoken encoding with one token per whitespace-separated word.
+    """
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text: text.split()
+    encoding.encode_batch.side_effect = lambda texts: [text.split() for text in texts]
+    encoding.decode.side_effect = lambda tokens: " ".join(tokens)
+    return encoding
+
+
+def use_fake_encoding(test_case):
+    """
+    Count one token per word with make_fake_encoding() for the rest of a test, starting from an
+    empty token memo.
+    """
+    clear_token_memo()
+    patcher = patch("src.utils.tokenizer.get_encoding", return_value=make_fake_encoding())
+    patcher.start()
+    test_case.addCleanup(patcher.stop)
+    test_case.addCleanup(clear_token_memo)
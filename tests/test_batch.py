@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+from src.batch import run_batch, iter_batch, summarize_batch
+
+
+class TestBatchRunner(unittest.TestCase):
+    def test_results_keep_input_order(self):
+        """
+        Test that results come back in input order even when later queries finish first.
+        """
+        delays = {"slow": 0.05, "medium": 0.02, "fast": 0.0}
+
+        def workflow(query):
+            time.sleep(delays[query])
+            return {"search_results": {"results": [query]}, "gpt_response": f"Answer to {query}"}
+
+        batch = run_batch(["slow", "medium", "fast"], workflow, max_concurrency=3)
+
+        self.assertEqual([entry["query"] for entry in batch["entries"]], ["slow", "medium", "fast"])
+        self.assertEqual(batch["entries"][0]["results"]["gpt_response"], "Answer to slow")
+        self.assertGreaterEqual(batch["entries"][0]["elapsed"], 0.05, "Per-query timing should be recorded")
+
+    def test_concurrency_is_bounded(self):
+        """
+        Test that no more than max_concurrency workflows run at the same time.
+        """
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def workflow(query):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return {"error": "not needed"}
+
+        run_batch(range(10), workflow, max_concurrency=2)
+
+        self.assertLessEqual(state["peak"], 2, "Concurrency should never exceed the limit")
+
+    def test_iter_batch_reads_input_lazily(self):
+        """
+        Test that iter_batch holds at most max_pending queries and yields entries as they complete.
+        """
+        state = {"read": 0}
+
+        def queries():
+            for idx in range(20):
+                state["read"] += 1
+                yield idx
+
+        stream = iter_batch(queries(), lambda query: {"error": "not needed"}, max_concurrency=2, max_pending=4)
+        first = next(stream)
+        self.assertLessEqual(state["read"], 4, "Queries should be read only as slots free up")
+
+        entries = [first] + list(stream)
+        self.assertEqual(sorted(entry["index"] for entry in entries), list(range(20)))
+        self.assertTrue(all(entry["query"] == entry["index"] for entry in entries))
+
+    def test_summary_counts_and_exceptions(self):
+        """
+        Test success/failure counting, including workflows that raise.
+        """
+        def workflow(query):
+            if query is None:
+                raise RuntimeError("boom")
+            if not query:
+                return {"error": "Query is empty."}
+            return {"search_results": {"results": []}, "gpt_response": "ok"}
+
+        batch = run_batch(["What is LangChain?", "", None], workflow, max_concurrency=2)
+        summary = batch["summary"]
+
+        self.assertEqual(summary["total_queries"], 3)
+        self.assertEqual(summary["successful"], 1)
+        self.assertEqual(summary["failed"], 2)
+        self.assertIn("boom", batch["entries"][2]["results"]["error"], "Exceptions should become error dicts")
+
+    def test_empty_batch(self):
+        """
+        Test the summary of an empty batch.
+        """
+        self.assertEqual(summarize_batch([], 0.0)["average_time"], 0.0)
+        self.assertEqual(run_batch([], lambda query: {})["entries"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from src.batch_cli import read_queries, load_checkpoint, run_jobs
+
+
+def workflow(query):
+    if query is None or query == "fail":
+        return {"error": "Invalid or empty query."}
+    return {"search_results": {"results": [query]}, "gpt_response": f"Answer to {query}"}
+
+
+def load_checkpoint_from_lines(lines):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.jsonl")
+        with open(path, "w") as f:
+            f.writelines(lines)
+        return load_checkpoint(path)
+
+
+class TestBatchCli(unittest.TestCase):
+    """
+    Tests for the streaming JSONL batch runner and its checkpoints.
+    """
+
+    def test_read_queries_formats_and_ids(self):
+        lines = ['{"id": "a", "query": "What is LangChain?"}\n', "\n", '"AI trends"\n', "not json\n"]
+
+        self.assertEqual(list(read_queries(lines)), [("a", "What is LangChain?"), (3, "AI trends"), (4, None)])
+        self.assertEqual(list(read_queries(lines, skip_ids={"a", 4})), [(3, "AI trends")])
+
+    def test_unhashable_ids_are_reported_per_line(self):
+        lines = ['{"id": ["a"], "query": "What is LangChain?"}\n', '{"id": {"b": 1}, "query": "AI trends"}\n']
+        output = io.StringIO()
+
+        summary = run_jobs(lines, output, workflow, skip_ids={"a"}, fsync_every=0)
+
+        records = sorted(map(json.loads, output.getvalue().splitlines()), key=lambda record: record["id"])
+        self.assertEqual([(record["id"], record["ok"]) for record in records], [(1, False), (2, False)])
+        self.assertEqual((summary["failed"], summary["skipped"]), (2, 0))
+        self.assertEqual(load_checkpoint_from_lines(['{"id": ["a"], "ok": true}\n', '{"id": 3, "ok": true}\n']), {3})
+
+    def test_null_ids_fall_back_to_the_line_number(self):
+        lines = ['{"id": null, "query": "What is LangChain?"}\n', '{"id": null, "query": "AI trends"}\n']
+        output = io.StringIO()
+
+        self.assertEqual(list(read_queries(lines)), [(1, "What is LangChain?"), (2, "AI trends")])
+        run_jobs(lines[:1], output, workflow, fsync_every=0)
+        completed = load_checkpoint_from_lines(output.getvalue().splitlines(keepends=True))
+
+        self.assertEqual(completed, {1})
+        self.assertEqual(list(read_queries(lines, skip_ids=completed)), [(2, "AI trends")],
+                         "The other null-id record must not be skipped on resume")
+        self.assertEqual(load_checkpoint_from_lines(['{"id": null, "ok": true}\n']), set())
+
+    def test_run_jobs_writes_one_line_per_query(self):
+        lines = [json.dumps({"id": idx, "query": "fail" if idx == 2 else f"query {idx}"}) for idx in range(5)]
+        output = io.StringIO()
+
+        summary = run_jobs(lines, output, workflow, max_concurrency=2, fsync_every=0)
+
+        records = {record["id"]: record for record in map(json.loads, output.getvalue().splitlines())}
+        self.assertEqual(sorted(records), [0, 1, 2, 3, 4])
+        self.assertEqual(records[1]["results"]["gpt_response"], "Answer to query 1")
+        self.assertFalse(records[2]["ok"])
+        self.assertEqual((summary["total_queries"], summary["successful"], summary["failed"]), (5, 4, 1))
+
+    def test_resume_skips_completed_queries(self):
+        lines = [json.dumps({"id": idx, "query": "fail" if idx == 1 else f"query {idx}"}) for idx in range(4)]
+        calls = []
+
+        def counting_workflow(query):
+            calls.append(query)
+            return workflow(query)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.jsonl")
+            with open(path, "w") as output:
+                run_jobs(lines[:2], output, counting_workflow, fsync_every=1)
+                output.write('{"id": 2, "query": "que')  # Killed mid-write
+
+            completed = load_checkpoint(path)
+            with open(path, "a") as output:
+                summary = run_jobs(lines, output, counting_workflow, skip_ids=completed)
+            retry = load_checkpoint(path, retry_failed=True)
+
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+
+        self.assertEqual(completed, {0, 1})
+        self.assertEqual(sorted(calls), ["fail", "query 0", "query 2", "query 3"], "Completed queries should not re-run")
+        self.assertEqual(sorted(record["id"] for record in records), [0, 1, 2, 3])
+        self.assertEqual((summary["total_queries"], summary["skipped"]), (2, 2))
+        self.assertEqual(run_jobs(lines[:1], io.StringIO(), workflow, skip_ids={0, 1, 7}, fsync_every=0)["skipped"], 1,
+                         "Only input lines actually skipped are counted")
+        self.assertEqual(retry, {0, 2, 3}, "Failed queries should be retried with retry_failed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.utils.cache import LRUCache, SQLiteCache, make_cache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used entry is evicted first.
+        """
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now the least recently used entry
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"), "Least recently used entry should be evicted")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    @patch("src.utils.cache.time.monotonic")
+    def test_ttl_expiry(self, mock_monotonic):
+        """
+        Test that entries expire after their TTL.
+        """
+        mock_monotonic.return_value = 100.0
+        cache = LRUCache(ttl=10)
+        cache.set("a", 1)
+
+        mock_monotonic.return_value = 105.0
+        self.assertEqual(cache.get("a"), 1)
+
+        mock_monotonic.return_value = 111.0
+        self.assertIsNone(cache.get("a"), "Entry should expire after the TTL")
+        self.assertEqual(cache.stats(), {"size": 0, "hits": 1, "misses": 1, "evictions": 0, "expirations": 1})
+
+    def test_none_values_rejected(self):
+        with self.assertRaises(ValueError):
+            LRUCache().set("a", None)
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_persists_across_instances(self):
+        """
+        Test that entries survive reopening the database.
+        """
+        cache = SQLiteCache(self.path)
+        cache.set("what is langchain?", {"results": [{"title": "LangChain"}]})
+        cache.close()
+
+        reopened = SQLiteCache(self.path)
+        self.assertEqual(reopened.get("what is langchain?"), {"results": [{"title": "LangChain"}]})
+        self.assertEqual(reopened.stats()["hits"], 1)
+        reopened.close()
+
+    def test_lru_eviction_and_ttl(self):
+        """
+        Test size-bounded eviction and expiry on disk.
+        """
+        with patch("src.utils.cache.time.time") as mock_time:
+            mock_time.return_value = 100.0
+            cache = SQLiteCache(self.path, max_entries=2, ttl=10)
+            cache.set("a", 1)
+            mock_time.return_value = 101.0
+            cache.set("b", 2)
+            mock_time.return_value = 102.0
+            cache.get("a")
+            mock_time.return_value = 103.0
+            cache.set("c", 3)
+
+            self.assertIsNone(cache.get("b"), "Least recently used entry should be evicted")
+            self.assertEqual(cache.stats()["evictions"], 1)
+
+            mock_time.return_value = 200.0
+            self.assertIsNone(cache.get("a"), "Entry should expire after the TTL")
+            cache.close()
+
+    def test_make_cache(self):
+        self.assertIsInstance(make_cache(), LRUCache)
+        disk_cache = make_cache(self.path)
+        self.assertIsInstance(disk_cache, SQLiteCache)
+        disk_cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from src.integration_nodes import TavilyAPI, OpenAINode, AsyncTavilyAPI, AsyncOpenAINode
+from src.langgraph_workflow import WorkflowEngine
+from src.utils.cassette import Cassette, CassetteMissError, set_cassette, strip_secrets
+from src.utils.config import get_cassette_config
+from benchmarks.stub_servers import tavily_stub, openai_stub
+from tests.helpers import use_fake_encoding
+
+SECRETS = {"TAVILY_API_KEY": "tvly-secret-key", "OPENAI_API_KEY": "sk-secret-key"}
+
+
+def read_cassette(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+class TestCassette(unittest.TestCase):
+    """
+    Tests for recording and replaying upstream calls.
+    """
+
+    def setUp(self):
+        use_fake_encoding(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "upstream.jsonl.gz")
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(set_cassette, None)
+
+    def run_workflow(self, environ, query="AI advancements"):
+        with patch.dict(os.environ, dict(SECRETS, **environ)):
+            engine = WorkflowEngine(tavily_api=TavilyAPI(), openai_node=OpenAINode())
+        try:
+            return engine.run(query)
+        finally:
+            engine.close()
+
+    def test_record_then_replay_without_the_servers(self):
+        recording = Cassette(self.path, mode="record")
+        set_cassette(recording)
+        with tavily_stub(latency=0.2) as tavily_server, openai_stub() as openai_server:
+            environ = {"TAVILY_BASE_URL": tavily_server.url, "OPENAI_BASE_URL": f"{openai_server.url}/v1"}
+            recorded = self.run_workflow(environ)
+        recording.close()
+
+        content = read_cassette(self.path)
+        interactions = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([item["service"] for item in interactions], ["tavily", "openai"])
+        self.assertEqual(interactions[0]["request"]["query"], "AI advancements")
+        self.assertGreaterEqual(interactions[0]["elapsed"], 0.2)
+        self.assertNotIn("tvly-secret-key", content)
+        self.assertNotIn("sk-secret-key", content)
+
+        # The servers are gone: every call must be answered from the cassette
+        replay = Cassette(self.path, mode="replay", latency="none")
+        set_cassette(replay)
+        start = time.perf_counter()
+        replayed = self.run_workflow(environ)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(replayed["gpt_response"], recorded["gpt_response"])
+        self.assertEqual(replayed["relevant_links"], recorded["relevant_links"])
+        self.assertLess(elapsed, 0.2, "The recorded search latency should not be replayed")
+        self.assertEqual(replay.stats()["replayed"], 2)
+        self.assertEqual(replay.stats()["fallbacks"], 0)
+
+    def test_replay_with_original_latency(self):
+        recording = Cassette(self.path, mode="record")
+        set_cassette(recording)
+        with tavily_stub(latency=0.1) as tavily_server:
+            tavily_api = TavilyAPI()
+            tavily_api.base_url = f"{tavily_server.url}/search"
+            tavily_api.search("quantum computing")
+            tavily_api.close()
+        recording.close()
+
+        timings = {}
+        for latency in ("original", "none"):
+            set_cassette(Cassette(self.path, mode="replay", latency=latency))
+            tavily_api = TavilyAPI()
+            tavily_api.base_url = f"{tavily_server.url}/search"
+            start = time.perf_counter()
+            response = tavily_api.search("quantum computing")
+            timings[latency] = time.perf_counter() - start
+            tavily_api.close()
+            self.assertEqual(response["results"][0]["url"], "http://example.com/1")
+
+        self.assertGreaterEqual(timings["original"], 0.1)
+        self.assertLess(timings["none"], 0.05)
+
+    def test_unrecorded_requests(self):
+        recording = Cassette(self.path, mode="record")
+        set_cassette(recording)
+        with tavily_stub() as tavily_server:
+            tavily_api = TavilyAPI()
+            tavily_api.base_url = f"{tavily_server.url}/search"
+            tavily_api.search("fusion energy")
+            tavily_api.close()
+        recording.close()
+
+        lenient = Cassette(self.path, strict=False)
+        strict = Cassette(self.path)
+        body = {"query": "protein folding", "max_results": 5}
+
+        with self.assertLogs("src.utils.cassette", level="WARNING"):
+            served = lenient.match("tavily", "POST", "/search", body)
+        self.assertEqual(served["request"]["query"], "fusion energy")
+        self.assertEqual(lenient.stats()["fallbacks"], 1)
+        with self.assertRaises(CassetteMissError):
+            strict.match("tavily", "POST", "/search", body)
+        with self.assertRaises(CassetteMissError):
+            lenient.match("openai", "POST", "/v1/chat/completions", {})
+        self.assertEqual(lenient.stats()["misses"], 1)
+
+    def test_replay_misses_fail_fast_on_both_services(self):
+        recording = Cassette(self.path, mode="record")
+        set_cassette(recording)
+        with tavily_stub() as tavily_server, openai_stub() as openai_server:
+            environ = {"TAVILY_BASE_URL": tavily_server.url, "OPENAI_BASE_URL": f"{openai_server.url}/v1"}
+            self.run_workflow(environ)
+        recording.close()
+
+        replay = Cassette(self.path, latency="none")
+        set_cassette(replay)
+        with patch.dict(os.environ, dict(SECRETS, **environ)):
+            tavily_api, openai_node = TavilyAPI(), OpenAINode()
+        with patch("src.utils.retry.time.sleep") as sleep:
+            self.assertIsNone(tavily_api.search("protein folding"))
+            self.assertIsNone(openai_node.generate_response("Unrecorded context.", "What is protein folding?"))
+        tavily_api.close()
+
+        sleep.assert_not_called()
+        self.assertEqual(replay.stats()["misses"], 2)
+        for policy in (tavily_api.retry_policy, openai_node.retry_policy):
+            self.assertEqual((policy.metrics()["attempts"], policy.metrics()["retries"]), (1, 0))
+            self.assertEqual(policy.circuit_breaker.state, "closed")
+
+        results = self.run_workflow(environ, query="protein folding")
+        self.assertIn("error", results, "A miss should be reported like any failed search")
+
+    def test_streamed_responses_keep_their_chunk_timing(self):
+        import httpx
+
+        def handler(request):
+            def chunks():
+                for word in ["Hello", " wörld"]:
+                    time.sleep(0.05)
+                    yield f"data: {json.dumps({'delta': word})}\n\n".encode("utf-8")[:-1]
+                    yield b"\n"
+            return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=chunks())
+
+        recording = Cassette(self.path, mode="record")
+        with httpx.Client(transport=recording.transport("openai", httpx.MockTransport(handler))) as client:
+            with client.stream("POST", "http://upstream.test/v1/chat/completions", json={"stream": True}) as response:
+                recorded = b"".join(response.iter_bytes())
+        recording.close()
+
+        interaction = json.loads(read_cassette(self.path))
+        self.assertEqual(len(interaction["chunks"]), 4)
+        self.assertGreaterEqual(interaction["chunks"][-1][0], 0.1)
+
+        for latency, bounds in [("original", (0.1, 1.0)), ("none", (0.0, 0.05))]:
+            replay = Cassette(self.path, latency=latency)
+            with httpx.Client(transport=replay.transport("openai", None)) as client:
+                start = time.perf_counter()
+                with client.stream("POST", "http://upstream.test/v1/chat/completions", json={"stream": True}) as response:
+                    replayed = b"".join(response.iter_bytes())
+                elapsed = time.perf_counter() - start
+            self.assertEqual(replayed, recorded)
+            self.assertTrue(bounds[0] <= elapsed < bounds[1], f"{latency}: {elapsed:.3f}s")
+
+    def test_secrets_are_stripped_and_config_is_validated(self):
+        self.assertEqual(
+            strip_secrets({"api_key": "k", "query": "q", "nested": [{"token": "t", "x": 1}]}),
+            {"query": "q", "nested": [{"x": 1}]}
+        )
+        with patch.dict(os.environ, {"UPSTREAM_CASSETTE": self.path, "UPSTREAM_CASSETTE_MODE": "record"}):
+            self.assertEqual(get_cassette_config(), {"path": self.path, "mode": "record", "latency": "original"})
+        with patch.dict(os.environ, {"UPSTREAM_CASSETTE_LATENCY": "fast"}):
+            with self.assertRaises(ValueError):
+                get_cassette_config()
+
+
+class TestCassetteAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    async def test_async_nodes_record_and_replay(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "upstream.jsonl")
+            self.addCleanup(set_cassette, None)
+
+            async def run(environ):
+                with patch.dict(os.environ, dict(SECRETS, **environ)):
+                    engine = WorkflowEngine(async_tavily_api=AsyncTavilyAPI(), async_openai_node=AsyncOpenAINode())
+                try:
+                    return await engine.run_async("AI in healthcare")
+                finally:
+                    await engine.aclose()
+
+            recording = Cassette(path, mode="record")
+            set_cassette(recording)
+            with tavily_stub() as tavily_server, openai_stub() as openai_server:
+                environ = {"TAVILY_BASE_URL": tavily_server.url, "OPENAI_BASE_URL": f"{openai_server.url}/v1"}
+                recorded = await run(environ)
+            recording.close()
+
+            replay = Cassette(path, latency="none")
+            set_cassette(replay)
+            replayed = await run(environ)
+
+        self.assertEqual(replayed["gpt_response"], recorded["gpt_response"])
+        self.assertEqual(replay.stats()["replayed"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
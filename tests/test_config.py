@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch
-from src.utils.config import get_api_keys
+from src.utils.config import get_api_keys, get_rate_limits, get_base_urls, get_service_config, get_metrics_config
 
 
 class TestConfig(unittest.TestCase):
@@ -70,6 +70,65 @@ class TestConfig(unittest.TestCase):
         self.assertIn("Tavily API Key is missing", str(context.exception), "Error message should indicate missing Tavily API key")
         # The first missing key should raise the error, so no need to assert for OpenAI here
 
+    @patch("os.getenv")
+    def test_get_rate_limits(self, mock_getenv):
+        """
+        Test loading rate limit budgets, with unset variables meaning no limit.
+        """
+        mock_getenv.side_effect = lambda key: {
+            "OPENAI_RPM": "500",
+            "OPENAI_TPM": "30000",
+        }.get(key, None)
+
+        limits = get_rate_limits()
+
+        self.assertEqual(limits["openai"], {"requests_per_minute": 500.0, "tokens_per_minute": 30000.0})
+        self.assertEqual(limits["tavily"], {"requests_per_minute": None})
+
+    @patch("os.getenv")
+    def test_get_rate_limits_invalid_value(self, mock_getenv):
+        """
+        Test that a non-numeric budget raises a clear error.
+        """
+        mock_getenv.side_effect = lambda key: {"TAVILY_RPM": "fast"}.get(key, None)
+
+        with self.assertRaises(ValueError) as context:
+            get_rate_limits()
+
+        self.assertIn("TAVILY_RPM must be a number", str(context.exception))
+
+    @patch.dict("os.environ", {"TAVILY_BASE_URL": " http://127.0.0.1:8080 ", "OPENAI_BASE_URL": ""})
+    def test_get_base_urls(self):
+        """
+        Test loading endpoint overrides, with unset or empty variables meaning the public endpoints.
+        """
+        self.assertEqual(get_base_urls(), {"tavily": "http://127.0.0.1:8080", "openai": None})
+
+    @patch.dict("os.environ", {"SERVICE_PORT": "9000", "SERVICE_MAX_QUEUE": "0", "SERVICE_MAX_CONCURRENCY": "eight"})
+    def test_get_service_config_validates_integers(self):
+        """
+        Test that service settings are parsed as integers and invalid values raise a clear error.
+        """
+        with self.assertRaises(ValueError) as context:
+            get_service_config()
+        self.assertIn("SERVICE_MAX_CONCURRENCY must be an integer", str(context.exception))
+
+        with patch.dict("os.environ", {"SERVICE_MAX_CONCURRENCY": "8"}):
+            config = get_service_config()
+        self.assertEqual((config["port"], config["max_concurrency"], config["max_queue"]), (9000, 8, 0))
+
+    @patch.dict("os.environ", {"METRICS_PORT": "metrics"})
+    def test_get_metrics_config_validates_the_port(self):
+        """
+        Test that METRICS_PORT is parsed like the other integer settings.
+        """
+        with self.assertRaises(ValueError) as context:
+            get_metrics_config()
+        self.assertEqual(str(context.exception), "METRICS_PORT must be an integer, got 'metrics'. Check your .env file.")
+
+        with patch.dict("os.environ", {"METRICS_PORT": " 9100 "}):
+            self.assertEqual(get_metrics_config()["port"], 9100)
+
 
 if __name__ == "__main__":
     unittest.main()
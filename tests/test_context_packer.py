@@ -0,0 +1,74 @@
+import unittest
+from src.context_packer import pack_context, minhash_signature, estimate_similarity
+from tests.helpers import use_fake_encoding
+
+
+ARTICLE = (
+    "OpenAI released a new multimodal model today that can reason over images, audio and text, "
+    "with lower latency and a larger context window than its predecessor."
+)
+
+
+class TestContextPacker(unittest.TestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    def test_minhash_similarity(self):
+        """
+        Test that syndicated copies score as similar and unrelated snippets do not.
+        """
+        original = minhash_signature(ARTICLE)
+        syndicated = minhash_signature(ARTICLE.replace("today", "on Monday"))
+        unrelated = minhash_signature("Hospitals are adopting AI to triage patients and read scans faster.")
+
+        self.assertGreaterEqual(estimate_similarity(original, syndicated), 0.6)
+        self.assertLess(estimate_similarity(original, unrelated), 0.2)
+
+    def test_near_duplicates_are_dropped(self):
+        """
+        Test that a near-duplicate snippet is dropped and the next distinct one takes its place.
+        """
+        contents = [ARTICLE, ARTICLE + " Read more.", "Hospitals are adopting AI to triage patients."]
+
+        packed, tokens = pack_context(contents, max_tokens=1000, max_snippets=2, threshold=0.7)
+
+        self.assertEqual(packed, [ARTICLE, "Hospitals are adopting AI to triage patients."])
+        self.assertEqual(tokens, len(ARTICLE.split()) + 7)
+
+    def test_snippets_are_cleaned(self):
+        """
+        Test that boilerplate is removed with clean_content and empty snippets are skipped.
+        """
+        contents = ["Subscribe to our newsletter", "AI is transforming industries.\n© 2024 Company"]
+
+        packed, _ = pack_context(contents, max_tokens=1000)
+
+        self.assertEqual(packed, ["AI is transforming industries."])
+
+    def test_last_snippet_truncated_to_fill_budget(self):
+        """
+        Test that the snippet overflowing the budget is truncated at a token boundary.
+        """
+        first = " ".join(f"alpha{idx}" for idx in range(30))
+        second = " ".join(f"beta{idx}" for idx in range(40))
+
+        packed, tokens = pack_context([first, second], max_tokens=50)
+
+        self.assertEqual(tokens, 50, "The budget should be filled exactly")
+        self.assertEqual(packed[1], " ".join(f"beta{idx}" for idx in range(20)))
+
+    def test_small_remainder_not_truncated(self):
+        """
+        Test that a tiny leftover budget does not produce a uselessly short fragment.
+        """
+        first = " ".join(f"alpha{idx}" for idx in range(45))
+        second = " ".join(f"beta{idx}" for idx in range(40))
+
+        packed, tokens = pack_context([first, second], max_tokens=50)
+
+        self.assertEqual(packed, [first])
+        self.assertEqual(tokens, 45)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+from src.fanout import expand_query, split_compound, canonical_url, merge_search_results, fan_out
+from src.integration_nodes import TavilyAPI, OpenAINode, AsyncTavilyAPI, AsyncOpenAINode
+from src.langgraph_workflow import fetch_fanout_results, WorkflowEngine
+from benchmarks.stub_servers import tavily_stub, openai_stub
+from tests.helpers import use_fake_encoding
+
+
+def search_response(query, urls):
+    return {
+        "query": query,
+        "results": [{"url": url, "content": f"{query} result from {url}", "score": 0.5} for url in urls],
+    }
+
+
+class TestQueryExpansion(unittest.TestCase):
+    """
+    Unit tests for the rule-based sub-queries.
+    """
+
+    def test_compound_queries_are_split_with_shared_context(self):
+        self.assertEqual(split_compound("AI in healthcare and finance"), ["AI in healthcare", "AI in finance"])
+        self.assertEqual(split_compound("Python vs Rust performance"), ["Python performance", "Rust performance"])
+        self.assertEqual(split_compound("Transformer model efficiency"), [])
+
+    def test_expand_query_starts_with_the_query_and_drops_duplicates(self):
+        sub_queries = expand_query("  What are the latest   trends in machine learning? ", max_queries=3)
+
+        self.assertEqual(sub_queries[0], "What are the latest trends in machine learning?")
+        self.assertEqual(sub_queries[1], "latest trends machine learning")
+        self.assertEqual(len(sub_queries), 3)
+        self.assertEqual(expand_query("AI in healthcare and finance", max_queries=3),
+                         ["AI in healthcare and finance", "AI in healthcare", "AI in finance"])
+        self.assertEqual(expand_query("AI trends", max_queries=1), ["AI trends"])
+
+    def test_canonical_url(self):
+        self.assertEqual(canonical_url("HTTPS://Example.com/a/?utm_source=feed&id=2#top"), "https://example.com/a?id=2")
+        self.assertEqual(canonical_url("https://example.com/a"), canonical_url("https://EXAMPLE.com/a/"))
+
+
+class TestMergeSearchResults(unittest.TestCase):
+    """
+    Tests for merging sub-query responses.
+    """
+
+    def test_results_are_interleaved_and_deduplicated_by_url(self):
+        responses = [
+            search_response("q", ["http://a.com/1", "http://a.com/2"]),
+            search_response("q1", ["http://b.com/1", "http://a.com/1/"]),
+            {"error": "No results found from Tavily API."},
+        ]
+        responses[1]["results"][1]["score"] = 0.9
+
+        merged = merge_search_results(["q", "q1", "q2"], responses)
+
+        self.assertEqual([result["url"] for result in merged["results"]],
+                         ["http://a.com/1", "http://b.com/1", "http://a.com/2"])
+        self.assertEqual(merged["results"][0]["score"], 0.9, "A duplicate keeps the higher score")
+        self.assertEqual(merged["results"][0]["content"], "q result from http://a.com/1")
+        self.assertEqual((merged["query"], merged["sub_queries"]), ("q", ["q", "q1"]))
+
+    def test_all_failed_returns_the_first_error(self):
+        merged = merge_search_results(["q", "q1"], [{"error": "Error fetching results: timeout"}, None])
+        self.assertEqual(merged, {"error": "Error fetching results: timeout"})
+
+
+class TestFanOut(unittest.TestCase):
+    """
+    Tests for running sub-queries concurrently.
+    """
+
+    def setUp(self):
+        use_fake_encoding(self)
+
+    def test_sub_queries_run_concurrently(self):
+        def slow_search(query):
+            time.sleep(0.2)
+            if query == "broken":
+                raise RuntimeError("upstream down")
+            return search_response(query, [])
+
+        start = time.monotonic()
+        responses = fan_out(slow_search, ["a", "b", "broken", "d"])
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.35, "Four searches should take about one round trip")
+        self.assertEqual([response.get("query") for response in responses], ["a", "b", None, "d"])
+        self.assertEqual(responses[2], {"error": "Error fetching results: upstream down"})
+
+    def test_fetch_fanout_results_against_stand_in(self):
+        def response_factory(query):
+            return search_response(query, ["http://example.com/shared", f"http://example.com/{len(query)}"])
+
+        with tavily_stub(latency=0.1, response_factory=response_factory) as server:
+            tavily_api = TavilyAPI()
+            tavily_api.base_url = f"{server.url}/search"
+            start = time.monotonic()
+            results = fetch_fanout_results(tavily_api, "AI in healthcare and finance", max_sub_queries=3)
+            elapsed = time.monotonic() - start
+            tavily_api.close()
+
+        self.assertEqual(server.request_count, 3)
+        self.assertLess(elapsed, 0.25, "The sub-queries should be searched concurrently")
+        self.assertEqual(results["sub_queries"], ["AI in healthcare and finance", "AI in healthcare", "AI in finance"])
+        urls = [result["url"] for result in results["results"]]
+        self.assertEqual(urls.count("http://example.com/shared"), 1)
+        self.assertEqual(len(urls), 4)
+
+    def test_engine_fans_out_queries(self):
+        with tavily_stub() as tavily_server, openai_stub() as openai_server:
+            environ = {"TAVILY_BASE_URL": tavily_server.url, "OPENAI_BASE_URL": f"{openai_server.url}/v1"}
+            with patch.dict(os.environ, environ):
+                engine = WorkflowEngine(tavily_api=TavilyAPI(), openai_node=OpenAINode(), sub_queries=3)
+            results = engine.run("Transformer model efficiency")
+            engine.close()
+
+        self.assertEqual(results["gpt_response"], "Synthetic answer about Transformer model efficiency.")
+        self.assertEqual(tavily_server.request_count, 3)
+        self.assertEqual(len(results["search_results"]["sub_queries"]), 3)
+        self.assertEqual(len(results["relevant_links"]), 3, "Identical URLs should be merged")
+
+
+class TestFanOutAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    async def test_engine_run_async_fans_out(self, mock_select_context):
+        async def search(query):
+            await asyncio.sleep(0.1)
+            return search_response(query, [f"http://example.com/{query}"])
+
+        tavily_api = AsyncTavilyAPI(client=MagicMock())
+        tavily_api.search = AsyncMock(side_effect=search)
+        openai_node = AsyncOpenAINode(client=MagicMock())
+        openai_node.generate_response = AsyncMock(return_value="Multimodal models.")
+        engine = WorkflowEngine(async_tavily_api=tavily_api, async_openai_node=openai_node, sub_queries=2)
+
+        start = time.monotonic()
+        results = await engine.run_async("AI trends")
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.18)
+        self.assertEqual(tavily_api.search.await_count, 2)
+        self.assertEqual(len(results["relevant_links"]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.hedging import HedgePolicy, hedged_call, hedged_call_async
+from benchmarks.stub_servers import tavily_stub
+from src.integration_nodes import TavilyAPI
+
+
+def first_call_slow(delay, result="ok"):
+    """
+    Build a function whose first call sleeps for delay seconds and later calls return at once.
+    """
+    lock = threading.Lock()
+    calls = []
+
+    def func():
+        with lock:
+            calls.append(time.monotonic())
+            first = len(calls) == 1
+        if first:
+            time.sleep(delay)
+            return f"slow {result}"
+        return f"fast {result}"
+
+    return func, calls
+
+
+class TestHedgePolicy(unittest.TestCase):
+    """
+    Unit tests for the hedge delay and the hedge rate cap.
+    """
+
+    def test_delay_adapts_to_observed_percentile(self):
+        policy = HedgePolicy(percentile=90, initial_delay=2.0, min_delay=0.01, min_samples=10)
+        self.assertEqual(policy.hedge_delay(), 2.0, "The initial delay applies until enough samples arrive")
+
+        for latency in [0.1] * 9 + [1.0]:
+            policy.record_latency(latency)
+        self.assertEqual(policy.hedge_delay(), 1.0)
+
+        for latency in [0.1] * 20:
+            policy.record_latency(latency)
+        self.assertEqual(policy.hedge_delay(), 0.1)
+
+    def test_hedge_rate_is_capped(self):
+        policy = HedgePolicy(max_hedge_rate=0.25, burst=1.0)
+        allowed = []
+        for _ in range(12):
+            policy.start_request()
+            allowed.append(policy.try_hedge())
+
+        self.assertEqual(sum(allowed), 3, "One hedge per four requests once the burst is spent")
+        metrics = policy.metrics()
+        self.assertEqual((metrics["requests"], metrics["hedges"], metrics["throttled"]), (12, 3, 9))
+
+
+class TestHedgedCall(unittest.TestCase):
+    """
+    Tests for hedged calls on a thread pool.
+    """
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_fast_call_is_not_hedged(self):
+        policy = HedgePolicy(initial_delay=1.0)
+        func, calls = first_call_slow(0.0)
+
+        self.assertEqual(hedged_call(policy, self.executor, func), "slow ok")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.metrics()["hedges"], 0)
+
+    def test_slow_call_is_hedged_and_hedge_wins(self):
+        policy = HedgePolicy(initial_delay=0.05)
+        func, calls = first_call_slow(0.5)
+        discarded = []
+
+        start = time.monotonic()
+        result = hedged_call(policy, self.executor, func, on_discard=discarded.append)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(result, "fast ok")
+        self.assertLess(elapsed, 0.4, "The hedge should answer before the slow request")
+        self.assertEqual(len(calls), 2)
+        metrics = policy.metrics()
+        self.assertEqual((metrics["hedges"], metrics["hedges_won"]), (1, 1))
+        self.executor.shutdown(wait=True)
+        self.assertEqual(discarded, ["slow ok"], "The losing result should be handed to on_discard")
+
+    def test_queue_time_does_not_count_towards_the_hedge_delay(self):
+        policy = HedgePolicy(initial_delay=0.1)
+        func, calls = first_call_slow(0.02)
+        release = threading.Event()
+        for _ in range(4):
+            self.executor.submit(release.wait, 1)  # Saturate the pool
+        threading.Timer(0.2, release.set).start()
+
+        self.assertEqual(hedged_call(policy, self.executor, func), "slow ok")
+        self.assertEqual(len(calls), 1, "A request waiting for a worker should not be hedged")
+        self.assertEqual(policy.metrics()["hedges"], 0)
+
+    def test_throttled_call_waits_for_the_first_request(self):
+        policy = HedgePolicy(initial_delay=0.01, max_hedge_rate=0.0, burst=0.0)
+        func, calls = first_call_slow(0.05)
+
+        self.assertEqual(hedged_call(policy, self.executor, func), "slow ok")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.metrics()["throttled"], 1)
+
+    def test_error_is_raised_when_both_requests_fail(self):
+        policy = HedgePolicy(initial_delay=0.01)
+
+        def failing():
+            time.sleep(0.05)
+            raise ValueError("upstream down")
+
+        with self.assertRaises(ValueError):
+            hedged_call(policy, self.executor, failing)
+        self.assertEqual(policy.metrics()["hedges"], 1)
+
+    def test_tavily_search_is_hedged(self):
+        latencies = iter([0.5])
+        policy = HedgePolicy(initial_delay=0.05)
+
+        with tavily_stub(latency=lambda: next(latencies, 0.0)) as server:
+            tavily_api = TavilyAPI(hedge_policy=policy)
+            tavily_api.base_url = f"{server.url}/search"
+            start = time.monotonic()
+            results = tavily_api.search("AI trends")
+            elapsed = time.monotonic() - start
+            tavily_api.close()
+
+        self.assertEqual(results["query"], "AI trends")
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(server.request_count, 2)
+        self.assertEqual(policy.metrics()["hedges_won"], 1)
+
+
+class TestHedgedCallAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_losing_request_is_cancelled(self):
+        policy = HedgePolicy(initial_delay=0.02)
+        cancelled = []
+        calls = []
+
+        async def request():
+            calls.append(len(calls))
+            try:
+                await asyncio.sleep(0.5 if len(calls) == 1 else 0.0)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return len(calls)
+
+        result = await hedged_call_async(policy, request)
+        await asyncio.sleep(0)
+
+        self.assertEqual(result, 2)
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(policy.metrics()["hedges_won"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,22 @@
 import unittest
-from unittest.mock import patch, MagicMock
-from src.integration_nodes import TavilyAPI, OpenAINode, clean_content
+import requests
+from unittest.mock import patch, MagicMock, AsyncMock
+from src.integration_nodes import (
+    TavilyAPI, OpenAINode, AsyncTavilyAPI, AsyncOpenAINode, clean_content, clean_content_stream, normalize_query,
+    classify_upstream_error
+)
+from src.utils.cache import LRUCache
+from src.utils.tokenizer import count_message_tokens, get_encoding, clear_token_memo
+from benchmarks.stub_servers import tavily_stub, openai_stub
+from src.utils.retry import RetryPolicy
+from tests.helpers import make_fake_encoding, use_fake_encoding
 
 
 class TestIntegrationNodes(unittest.TestCase):
-    @patch("src.integration_nodes.requests.post")
+    def setUp(self):
+        use_fake_encoding(self)
+
+    @patch("requests.Session.post")
     def test_tavily_api_search(self, mock_post):
         # Mock response for Tavily API
         mock_post.return_value.status_code = 200
@@ -26,7 +38,159 @@ class TestIntegrationNodes(unittest.TestCase):
         self.assertEqual(response["results"][0]["title"], "AI Trends", "First result title should match")
         self.assertEqual(response["results"][1]["title"], "AI Predictions", "Second result title should match")
 
-    @patch("src.integration_nodes.openai.chat.completions.create")
+    @patch("requests.Session.post")
+    def test_tavily_api_search_cache(self, mock_post):
+        # Repeated queries that differ only in case/whitespace should hit the cache
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {"results": [{"title": "AI Trends"}]}
+
+        cache = LRUCache()
+        tavily_api = TavilyAPI(cache=cache)
+        first = tavily_api.search("AI  advancements")
+        second = tavily_api.search(" ai advancements ")
+
+        self.assertEqual(first, second, "Cached response should match the original")
+        self.assertEqual(mock_post.call_count, 1, "Second query should be served from cache")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @patch("requests.Session.post")
+    def test_tavily_api_search_errors_not_cached(self, mock_post):
+        # Failed searches return None and must not be cached
+        mock_post.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("500 Server Error")
+
+        cache = LRUCache()
+        tavily_api = TavilyAPI(cache=cache)
+        self.assertIsNone(tavily_api.search("AI advancements"))
+        self.assertIsNone(tavily_api.search("AI advancements"))
+
+        self.assertEqual(mock_post.call_count, 2, "Errors should never be served from cache")
+        self.assertEqual(len(cache), 0)
+
+    def test_tavily_api_reuses_pooled_connections(self):
+        # Sequential searches against a local stub should share one keep-alive connection
+        with tavily_stub() as server:
+            tavily_api = TavilyAPI()
+            tavily_api.base_url = f"{server.url}/search"
+            for _ in range(3):
+                self.assertIsNotNone(tavily_api.search("AI advancements"))
+            tavily_api.close()
+
+        self.assertEqual(server.request_count, 3)
+        self.assertEqual(server.connection_count, 1, "Requests should reuse a pooled connection")
+
+    def test_tavily_api_timeout(self):
+        # A stalled upstream should fail fast instead of hanging the worker
+        with tavily_stub(latency=0.5) as server:
+            tavily_api = TavilyAPI(timeout=(1, 0.05), retry_policy=RetryPolicy(max_attempts=1))
+            tavily_api.base_url = f"{server.url}/search"
+            self.assertIsNone(tavily_api.search("AI advancements"), "Timed out request should return None")
+            tavily_api.close()
+
+    def test_tavily_api_base_url_from_environment(self):
+        # TAVILY_BASE_URL points the node at a stand-in server
+        with tavily_stub() as server, patch.dict("os.environ", {"TAVILY_BASE_URL": f"{server.url}/"}):
+            tavily_api = TavilyAPI()
+            self.assertEqual(tavily_api.base_url, f"{server.url}/search")
+            self.assertIsNotNone(tavily_api.search("AI advancements"))
+            tavily_api.close()
+
+    def test_tavily_api_simulated_upstream_errors(self):
+        # A stub with error_rate=1 fails every request; each attempt reaches the server
+        with tavily_stub(error_rate=1.0, error_status=503) as server:
+            tavily_api = TavilyAPI(retry_policy=RetryPolicy(max_attempts=2, base_delay=0, jitter=False))
+            tavily_api.base_url = f"{server.url}/search"
+            self.assertIsNone(tavily_api.search("AI advancements"))
+            tavily_api.close()
+
+        self.assertEqual(server.request_count, 2)
+
+    @patch("requests.Session.post")
+    def test_tavily_api_retries_transient_errors(self, mock_post):
+        # A 503 with Retry-After should be retried after the hinted delay
+        unavailable = MagicMock(status_code=503, headers=requests.structures.CaseInsensitiveDict({"Retry-After": "2"}))
+        unavailable.raise_for_status.side_effect = requests.exceptions.HTTPError("503", response=unavailable)
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"results": [{"title": "AI Trends"}]}
+        mock_post.side_effect = [unavailable, ok]
+
+        sleeps = []
+        tavily_api = TavilyAPI(retry_policy=RetryPolicy(classify=classify_upstream_error, sleep=sleeps.append))
+        response = tavily_api.search("AI advancements")
+
+        self.assertEqual(response["results"][0]["title"], "AI Trends")
+        self.assertEqual(sleeps, [2.0], "Retry-After header should be honored")
+        self.assertEqual(tavily_api.retry_policy.metrics()["retries"], 1)
+
+    def test_openai_node_owns_its_client(self):
+        """
+        Test that each OpenAI node has its own client instead of configuring the openai module.
+        """
+        import openai
+
+        module_key = openai.api_key
+        with patch("src.integration_nodes.get_api_keys", return_value=("tavily-key", "key-a")):
+            node_a = OpenAINode()
+        with patch("src.integration_nodes.get_api_keys", return_value=("tavily-key", "key-b")):
+            node_b = OpenAINode()
+
+        self.assertEqual(node_a._get_client().api_key, "key-a")
+        self.assertEqual(node_b._get_client().api_key, "key-b")
+        self.assertIs(node_a._get_client(), node_a._get_client())
+        self.assertEqual(node_a._get_client().max_retries, 0, "Retries belong to the node's retry policy")
+        self.assertEqual(openai.api_key, module_key, "The module-level client should be left untouched")
+        node_a.close()
+        node_b.close()
+
+    @patch("openai.resources.chat.completions.Completions.create")
+    def test_openai_node_fits_prompt_to_context_window(self, mock_openai_create):
+        """
+        Test that oversized contexts are truncated to fit the window and the completion is capped.
+        """
+        mock_openai_create.return_value = MagicMock(choices=[MagicMock(message=MagicMock(content="Summary."))])
+        get_encoding.cache_clear()
+        clear_token_memo()
+
+        with patch("tiktoken.encoding_for_model", return_value=make_fake_encoding()):
+            openai_node = OpenAINode(model="gpt-4", max_completion_tokens=8000)
+            response = openai_node.generate_response("word " * 1000, "What is LangChain?")
+            oversized = openai_node.generate_response("word", "query " * 200)
+            kwargs = mock_openai_create.call_args.kwargs
+            prompt_tokens = count_message_tokens(kwargs["messages"])
+        get_encoding.cache_clear()
+        clear_token_memo()
+
+        self.assertEqual(response, "Summary.")
+        self.assertIsNone(oversized, "A query that cannot fit should fail without a request")
+        mock_openai_create.assert_called_once()
+        self.assertEqual(kwargs["max_tokens"], 8000)
+        self.assertLessEqual(prompt_tokens + 8000, 8192, "Prompt and completion should fit the window")
+        self.assertGreater(prompt_tokens, 8192 - 8000 - 40, "The context should fill the remaining room")
+
+    def test_openai_node_measures_context_counts_close_to_the_limit(self):
+        """
+        Test that a caller's context count without margin to spare is measured instead of trusted.
+        """
+        get_encoding.cache_clear()
+        clear_token_memo()
+        with patch("tiktoken.encoding_for_model", return_value=make_fake_encoding()):
+            openai_node = OpenAINode(model="gpt-4", max_completion_tokens=8000)
+            roomy = openai_node.prepare_messages("word " * 10, "What is LangChain?", context_tokens=10)
+            template_tokens = count_message_tokens(openai_node.build_messages("", "What is LangChain?"))
+            # Claims to fit exactly, but the context is larger than counted (e.g. uncounted separators)
+            claimed = 8192 - 8000 - template_tokens - 16
+            messages, prompt_tokens = openai_node.prepare_messages("word " * 500, "What is LangChain?", claimed)
+            measured_tokens = count_message_tokens(messages)
+        get_encoding.cache_clear()
+        clear_token_memo()
+
+        self.assertEqual(roomy[1], template_tokens + 10)
+        self.assertEqual(prompt_tokens, measured_tokens)
+        self.assertLessEqual(measured_tokens + 8000, 8192, "The truncated prompt should fit the window")
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  What IS\tLangChain? "), "what is langchain?")
+
+    @patch("openai.resources.chat.completions.Completions.create")
     def test_openai_node_generate_response(self, mock_openai_create):
         # Mock response for OpenAI API
         mock_openai_create.return_value = MagicMock(
@@ -47,6 +211,53 @@ class TestIntegrationNodes(unittest.TestCase):
             "Response should match the mocked value"
         )
 
+    @patch("openai.resources.chat.completions.Completions.create")
+    def test_openai_node_response_cache(self, mock_openai_create):
+        # Identical prompts should be answered from cache unless the caller bypasses it
+        mock_openai_create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="LangChain is a framework."))]
+        )
+
+        openai_node = OpenAINode(cache=LRUCache(max_entries=8))
+        first = openai_node.generate_response("LangChain docs.", "What is LangChain?")
+        second = openai_node.generate_response("LangChain docs.", "What is LangChain?")
+        self.assertEqual(first, second, "Cached response should match the original")
+        self.assertEqual(mock_openai_create.call_count, 1, "Second call should be served from cache")
+
+        openai_node.generate_response("LangChain docs.", "What is LangChain?", use_cache=False)
+        self.assertEqual(mock_openai_create.call_count, 2, "use_cache=False should bypass the cache")
+
+        openai_node.generate_response("Other docs.", "What is LangChain?")
+        self.assertEqual(mock_openai_create.call_count, 3, "A different prompt should miss the cache")
+
+    @patch("openai.resources.chat.completions.Completions.create")
+    def test_openai_node_generate_stream(self, mock_openai_create):
+        # Deltas should be yielded in order and the joined response cached
+        def chunk(content):
+            return MagicMock(choices=[MagicMock(delta=MagicMock(content=content))], usage=None)
+
+        usage_chunk = MagicMock(choices=[], usage=MagicMock(total_tokens=42))
+        mock_openai_create.return_value = iter([chunk("LangChain "), chunk(None), chunk("is a framework."), usage_chunk])
+
+        openai_node = OpenAINode(cache=LRUCache())
+        deltas = list(openai_node.generate_stream("LangChain docs.", "What is LangChain?"))
+
+        self.assertEqual(deltas, ["LangChain ", "is a framework."])
+        self.assertTrue(mock_openai_create.call_args.kwargs["stream"], "Request should ask for a stream")
+        self.assertEqual(
+            openai_node.generate_response("LangChain docs.", "What is LangChain?"), "LangChain is a framework.",
+            "Streamed response should be cached for later calls"
+        )
+        self.assertEqual(mock_openai_create.call_count, 1)
+
+    def test_openai_node_cache_key_includes_model(self):
+        messages = OpenAINode.build_messages("LangChain docs.", "What is LangChain?")
+        self.assertNotEqual(
+            OpenAINode(model="gpt-4")._cache_key(messages),
+            OpenAINode(model="gpt-4o")._cache_key(messages),
+            "Cache key should depend on the model"
+        )
+
     def test_clean_content(self):
         # Input text with unnecessary content
         input_text = (
@@ -62,6 +273,86 @@ class TestIntegrationNodes(unittest.TestCase):
         # Assertions
         self.assertEqual(cleaned_text, expected_output, "Cleaned text should match the expected output")
 
+    def test_clean_content_merges_newlines_around_removed_lines(self):
+        input_text = "\n\nIntro\r\n\nAbout us\n\nBody text\n© 2024\nSubscribe now  \n"
+        self.assertEqual(clean_content(input_text), "Intro\nBody text")
+
+    def test_clean_content_keeps_line_after_copyright_line(self):
+        # A copyright line that also contains a marker word removes only itself
+        self.assertEqual(clean_content("Intro\n© 2024 About us\nBody text"), "Intro\nBody text")
+
+    def test_clean_content_stream_matches_clean_content(self):
+        input_text = (
+            "  Share this article\nAI is transforming industries.\r\n\n© 2024 Company\n"
+            "Stay connected\n\nAI predictions  \n\n Deep Dive\n"
+        )
+        expected = clean_content(input_text)
+        for size in (1, 2, 3, 7, 16, len(input_text)):
+            chunks = [input_text[idx:idx + size] for idx in range(0, len(input_text), size)]
+            self.assertEqual("".join(clean_content_stream(chunks)), expected, f"chunk size {size}")
+
+    def test_clean_content_stream_yields_incrementally(self):
+        def chunks():
+            yield "First line\nSecond"
+            yield " line\nThird"
+
+        stream = clean_content_stream(chunks())
+        self.assertEqual(next(stream), "First line")
+        self.assertEqual("".join(stream), "\nSecond line\nThird")
+        self.assertEqual(list(clean_content_stream(["", "\n\n", "Share\n"])), [])
+
+
+class TestAsyncIntegrationNodes(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    async def test_async_tavily_api_search(self):
+        # Mock AsyncClient returning a Tavily response
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "results": [{"title": "AI Trends", "content": "AI is transforming industries.", "url": "http://example.com/ai-trends"}]
+        }
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+
+        tavily_api = AsyncTavilyAPI(client=mock_client)
+        response = await tavily_api.search("AI advancements")
+
+        self.assertEqual(response["results"][0]["title"], "AI Trends", "Result title should match")
+        self.assertEqual(mock_client.post.call_args.kwargs["json"]["query"], "AI advancements")
+
+    async def test_async_tavily_api_empty_query(self):
+        mock_client = MagicMock()
+        mock_client.post = AsyncMock()
+
+        response = await AsyncTavilyAPI(client=mock_client).search("   ")
+
+        self.assertIsNone(response, "Empty query should return None")
+        mock_client.post.assert_not_called()
+
+    async def test_async_openai_node_generate_response(self):
+        mock_client = MagicMock()
+        mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(
+            choices=[MagicMock(message=MagicMock(content="AI is advancing."))]
+        ))
+
+        openai_node = AsyncOpenAINode(client=mock_client)
+        response = await openai_node.generate_response("AI is transforming industries.", "Latest AI?")
+
+        self.assertEqual(response, "AI is advancing.", "Response should match the mocked value")
+        messages = mock_client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertEqual(messages, OpenAINode.build_messages("AI is transforming industries.", "Latest AI?"))
+
+    async def test_async_openai_node_against_stub_server(self):
+        # OPENAI_BASE_URL points the node at a local chat completions stand-in
+        with openai_stub() as server, patch.dict("os.environ", {"OPENAI_BASE_URL": f"{server.url}/v1"}):
+            openai_node = AsyncOpenAINode()
+            response = await openai_node.generate_response("AI is transforming industries.", "Latest AI?")
+            await openai_node.aclose()
+
+        self.assertEqual(response, "Synthetic answer about Latest AI?.")
+        self.assertEqual(server.request_count, 1)
+
 
 if __name__ == "__main__":
     unittest.main()
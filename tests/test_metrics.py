@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from unittest.mock import patch, MagicMock
+from src.utils.metrics import MetricsRegistry, get_registry, set_registry, traced, serve_metrics
+from src.langgraph_workflow import ai_workflow
+from tests.helpers import use_fake_encoding
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """
+    Unit tests for the metrics registry and its exports.
+    """
+
+    def test_span_records_duration_errors_and_counters(self):
+        registry = MetricsRegistry()
+        with registry.span("fetch") as span:
+            span.set(results=3, query="AI")
+        with self.assertRaises(ValueError):
+            with registry.span("fetch"):
+                raise ValueError("boom")
+
+        snapshot = registry.snapshot()
+        histogram = snapshot["histograms"]["workflow_stage_duration_seconds"][(("stage", "fetch"),)]
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(snapshot["counters"]["workflow_stage_results_total"], {(("stage", "fetch"),): 3})
+        self.assertEqual(
+            snapshot["counters"]["workflow_stage_errors_total"],
+            {(("error", "ValueError"), ("stage", "fetch")): 1}
+        )
+
+    def test_disabled_registry_records_nothing(self):
+        registry = MetricsRegistry(enabled=False)
+        with registry.span("fetch") as span:
+            span.set(results=3)
+            registry.annotate(prompt_tokens=10)
+        registry.increment("upstream_errors_total", service="tavily", error="Timeout")
+
+        self.assertEqual(registry.snapshot(), {"counters": {}, "histograms": {}})
+        self.assertEqual(registry.to_prometheus(), "")
+
+    def test_nested_spans_share_trace_and_write_json_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            registry = MetricsRegistry(jsonl_path=path)
+            with registry.span("workflow"):
+                with registry.span("generate"):
+                    registry.annotate(prompt_tokens=120, completion_tokens=30)
+            registry.close()
+
+            with open(path) as f:
+                generate, workflow = [json.loads(line) for line in f]
+
+        self.assertEqual(generate["stage"], "generate")
+        self.assertEqual(generate["attributes"], {"prompt_tokens": 120, "completion_tokens": 30})
+        self.assertEqual(generate["trace_id"], workflow["trace_id"])
+        self.assertEqual(generate["parent_id"], workflow["span_id"])
+        self.assertIsNone(workflow["parent_id"])
+
+    def test_prometheus_text_format(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.increment("upstream_errors_total", service="tavily", error='Bad "quote"')
+        registry.record_span("fetch", 0.5)
+
+        text = registry.to_prometheus()
+
+        self.assertIn("# TYPE upstream_errors_total counter\n", text)
+        self.assertIn('upstream_errors_total{error="Bad \\"quote\\"",service="tavily"} 1\n', text)
+        self.assertIn("# TYPE workflow_stage_duration_seconds histogram\n", text)
+        self.assertIn('workflow_stage_duration_seconds_bucket{stage="fetch",le="0.1"} 0\n', text)
+        self.assertIn('workflow_stage_duration_seconds_bucket{stage="fetch",le="1.0"} 1\n', text)
+        self.assertIn('workflow_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 1\n', text)
+        self.assertIn('workflow_stage_duration_seconds_count{stage="fetch"} 1\n', text)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics.prom")
+            registry.write_prometheus(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), text)
+
+    def test_serve_metrics_endpoint(self):
+        registry = MetricsRegistry()
+        registry.increment("upstream_errors_total", service="openai", error="RateLimitError")
+        server = serve_metrics(registry, port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(body, registry.to_prometheus())
+
+
+class TestTraced(unittest.TestCase):
+    """
+    Tests for the traced decorator and the workflow instrumentation.
+    """
+
+    def setUp(self):
+        use_fake_encoding(self)
+        self.registry = MetricsRegistry()
+        set_registry(self.registry)
+
+    def tearDown(self):
+        set_registry(None)
+
+    def test_traced_marks_error_results(self):
+        @traced("fetch", summarize=lambda result: {"results": len(result["results"])})
+        def fetch(ok):
+            return {"results": [1, 2]} if ok else {"error": "No results."}
+
+        @traced("generate")
+        async def generate():
+            return None
+
+        fetch(True)
+        fetch(False)
+        asyncio.run(generate())
+
+        counters = self.registry.snapshot()["counters"]
+        self.assertEqual(counters["workflow_stage_results_total"], {(("stage", "fetch"),): 2})
+        self.assertEqual(counters["workflow_stage_errors_total"], {
+            (("error", "ErrorResult"), ("stage", "fetch")): 1,
+            (("error", "EmptyResult"), ("stage", "generate")): 1,
+        })
+
+    def test_disabled_traced_calls_through(self):
+        set_registry(MetricsRegistry(enabled=False))
+
+        @traced("fetch")
+        def fetch():
+            return {"results": []}
+
+        self.assertEqual(fetch(), {"results": []})
+        self.assertEqual(get_registry().snapshot()["counters"], {})
+
+    @patch("openai.resources.chat.completions.Completions.create")
+    @patch("src.integration_nodes.TavilyAPI.search")
+    def test_ai_workflow_records_each_stage(self, mock_search, mock_create):
+        mock_search.return_value = {"results": [
+            {"content": "AI is transforming industries.", "url": "http://example.com/1"},
+            {"content": "Predictions for AI in 2024.", "url": "http://example.com/2"},
+        ]}
+        mock_create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="AI is advancing."))],
+            usage=MagicMock(prompt_tokens=120, completion_tokens=30, total_tokens=150)
+        )
+
+        results = ai_workflow("AI advancements in metrics")
+
+        self.assertEqual(results["gpt_response"], "AI is advancing.")
+        snapshot = self.registry.snapshot()
+        stages = {labels[0][1] for labels in snapshot["histograms"]["workflow_stage_duration_seconds"]}
+        self.assertEqual(stages, {"workflow", "fetch", "process", "generate"})
+        counters = snapshot["counters"]
+        self.assertEqual(counters["workflow_stage_results_total"], {(("stage", "fetch"),): 2})
+        self.assertEqual(counters["workflow_stage_prompt_tokens_total"], {(("stage", "generate"),): 120})
+        self.assertEqual(counters["workflow_stage_completion_tokens_total"], {(("stage", "generate"),): 30})
+        self.assertEqual(counters["openai_tokens_total"][(("kind", "prompt"), ("model", "gpt-4"))], 120)
+        self.assertIn((("stage", "process"),), counters["workflow_stage_context_tokens_total"])
+        self.assertNotIn("workflow_stage_errors_total", counters)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from src.utils import rate_limit
+from src.utils.rate_limit import TokenBucket, RateLimiter, shared_rate_limiter
+
+
+class FakeClock:
+    """
+    Manually advanced monotonic clock; sleeping advances it.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_paces_requests_evenly(self):
+        """
+        Test that requests beyond the burst are spaced at the sustained rate.
+        """
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, sleep=clock.sleep, clock=clock)
+
+        timestamps = []
+        for _ in range(5):
+            limiter.acquire()
+            timestamps.append(clock.now)
+
+        self.assertEqual(timestamps, [0.0, 1.0, 2.0, 3.0, 4.0], "60 RPM should admit one request per second")
+        self.assertEqual(limiter.metrics()["throttled"], 4)
+
+    def test_concurrent_reservations_queue_up(self):
+        """
+        Test that concurrent reservations wait progressively longer instead of bursting.
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_minute=120, capacity=2, clock=clock)  # 2 per second, burst of 2
+
+        waits = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(waits, [0.0, 0.0, 0.5, 1.0, 1.5])
+
+    def test_large_requests_are_admitted(self):
+        """
+        Test that a request larger than the bucket waits until its cost is paid off.
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_minute=6000, capacity=100, clock=clock)  # 100 tokens/second
+
+        self.assertEqual(bucket.reserve(100), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1000), 10.0)
+
+    def test_idle_limiter_admits_a_max_size_request_at_once(self):
+        """
+        Test that the token budget is not capped at one second: an idle limiter admits a full
+        completion without sleeping.
+        """
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=30000, sleep=clock.sleep, clock=clock)
+
+        limiter.acquire(tokens=3700)
+        self.assertEqual(clock.now, 0.0)
+        self.assertEqual(limiter.metrics()["throttled"], 0)
+
+        limiter.acquire(tokens=30000)  # The budget is spent: wait until the minute has refilled it
+        self.assertAlmostEqual(clock.now, 3700 / 500)
+
+    def test_reconcile_refunds_unused_tokens(self):
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=6000, clock=clock)
+        limiter.acquire(tokens=6000)
+        limiter.reconcile(estimated_tokens=6000, actual_tokens=5940)
+        self.assertAlmostEqual(limiter.tokens.available, 60.0)
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        rate_limit._shared_limiters.clear()
+
+    def tearDown(self):
+        rate_limit._shared_limiters.clear()
+
+    @patch("src.utils.rate_limit.get_rate_limits")
+    def test_shared_limiter_from_config(self, mock_get_rate_limits):
+        mock_get_rate_limits.return_value = {
+            "tavily": {"requests_per_minute": None},
+            "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+        }
+
+        self.assertIsNone(shared_rate_limiter("tavily"), "No budget configured means no limiter")
+        limiter = shared_rate_limiter("openai")
+        self.assertIsNotNone(limiter.tokens)
+        self.assertIs(shared_rate_limiter("openai"), limiter, "Limiter should be shared process-wide")
+
+
+class TestOpenAINodeRateLimit(unittest.TestCase):
+    @patch("openai.resources.chat.completions.Completions.create")
+    def test_generate_response_meters_tokens(self, mock_openai_create):
+        """
+        Test that OpenAINode reserves the estimated tokens before dispatch and reconciles after.
+        """
+        from src.integration_nodes import OpenAINode, DEFAULT_MAX_COMPLETION_TOKENS
+
+        mock_openai_create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="LangChain is a framework."))],
+            usage=MagicMock(total_tokens=400)
+        )
+        limiter = MagicMock(tokens=MagicMock())
+
+        with patch("src.integration_nodes.count_message_tokens", return_value=30):
+            openai_node = OpenAINode(rate_limiter=limiter)
+            openai_node.generate_response("LangChain docs.", "What is LangChain?", context_tokens=120)
+
+        estimated = 120 + 30 + DEFAULT_MAX_COMPLETION_TOKENS
+        limiter.acquire.assert_called_once_with(estimated)
+        limiter.reconcile.assert_called_once_with(estimated, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
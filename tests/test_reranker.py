@@ -0,0 +1,91 @@
+import unittest
+import numpy as np
+from src.langgraph_workflow import select_context
+from src.reranker import bm25_scores, split_passages, rerank_passages
+from tests.helpers import use_fake_encoding
+
+
+class TestReranker(unittest.TestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    def test_split_passages(self):
+        """
+        Test that passages keep whole sentences and respect the size target.
+        """
+        text = "One two three. Four five six. Seven eight nine.\nTen eleven."
+        self.assertEqual(split_passages(text, max_words=6), ["One two three. Four five six.", "Seven eight nine. Ten eleven."])
+
+    def test_bm25_prefers_relevant_passages(self):
+        """
+        Test that passages mentioning the query terms score higher, rarer terms weighing more.
+        """
+        passages = [
+            "The weather today was sunny with light winds.",
+            "LangChain is a framework for building applications with language models.",
+            "Language models are used in many applications.",
+        ]
+
+        scores = bm25_scores("What is LangChain framework?", passages)
+
+        self.assertEqual(scores.shape, (3,))
+        self.assertEqual(int(np.argmax(scores)), 1)
+        self.assertEqual(scores[0], 0.0, "Passages without query terms should score zero")
+
+    def test_bm25_empty_query(self):
+        self.assertTrue(np.array_equal(bm25_scores("???", ["Some passage."]), np.zeros(1)))
+
+    def test_rerank_packs_best_passages_into_budget(self):
+        """
+        Test that the most relevant passages are packed first and the budget is respected.
+        """
+        snippets = [
+            "Stock markets closed higher on Friday. Investors cheered earnings.",
+            "AI in healthcare helps doctors read scans. Hospitals use AI to triage patients.",
+        ]
+
+        passages, tokens = rerank_passages("AI in healthcare", snippets, max_tokens=16, max_words=8)
+
+        self.assertEqual(passages[0], "AI in healthcare helps doctors read scans.")
+        self.assertLessEqual(tokens, 16)
+        self.assertNotIn("Stock markets closed higher on Friday.", passages[:2])
+
+    def test_rerank_respects_the_passage_cap(self):
+        """
+        Test that max_passages stops packing before the budget is full, also through select_context.
+        """
+        snippets = [f"AI in healthcare fact number {idx}. Hospitals use AI tool {idx}." for idx in range(10)]
+
+        passages, _ = rerank_passages("AI in healthcare", snippets, max_tokens=3000, max_passages=3)
+        context, _ = select_context(
+            {"results": [{"content": snippet} for snippet in snippets]}, max_results=10, query="AI in healthcare",
+            max_passages=4
+        )
+
+        self.assertEqual(len(passages), 3)
+        self.assertEqual(context.count("\n\n"), 3, "select_context keeps max_passages passages")
+
+    def test_lower_ranked_passages_fill_the_budget(self):
+        """
+        Test that passages beyond the best few are still packed when the budget allows, while
+        only the first max_results results are used.
+        """
+        sentences = [f"Hospitals use AI tool number {idx} to read scans and triage patients." for idx in range(40)]
+        results = [
+            {"content": " ".join(sentences[:20])},
+            {"content": " ".join(sentences[20:])},
+            {"content": "AI in healthcare is covered by a third result that max_results leaves out."},
+        ]
+
+        context, tokens = select_context({"results": results}, max_results=2, query="AI in healthcare")
+        expected = sum(len(split_passages(result["content"])) for result in results[:2])
+
+        self.assertGreater(expected, 3)
+        self.assertEqual(len(context.split("\n\n")), expected, "Every passage of the two results fits 3000 tokens")
+        self.assertIn("AI tool number 39", context)
+        self.assertNotIn("third result", context)
+        self.assertLessEqual(tokens, 3000)
+
+
+if __name__ == "__main__":
+    unittest.main()
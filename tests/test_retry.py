@@ -0,0 +1,145 @@
+import unittest
+from src.utils.retry import RetryPolicy, CircuitBreaker, CircuitOpenError, parse_retry_after
+
+
+class FakeClock:
+    """
+    Manually advanced monotonic clock; sleeping advances it.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TransientError(Exception):
+    pass
+
+
+class FatalError(Exception):
+    pass
+
+
+def classify(exc):
+    return isinstance(exc, TransientError), getattr(exc, "retry_after", None)
+
+
+def flaky(failures, result="ok"):
+    """
+    Build a callable that raises TransientError for the first `failures` calls.
+    """
+    state = {"calls": 0}
+
+    def func():
+        state["calls"] += 1
+        if state["calls"] <= failures:
+            raise TransientError("temporarily unavailable")
+        return result
+
+    func.state = state
+    return func
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def make_policy(self, **kwargs):
+        kwargs.setdefault("classify", classify)
+        return RetryPolicy(sleep=self.clock.sleep, clock=self.clock, **kwargs)
+
+    def test_retries_until_success_with_exponential_backoff(self):
+        policy = self.make_policy(max_attempts=4, base_delay=1.0, jitter=False)
+
+        self.assertEqual(policy.call(flaky(2)), "ok")
+        self.assertEqual(self.clock.sleeps, [1.0, 2.0], "Backoff should double on every retry")
+        metrics = policy.metrics()
+        self.assertEqual((metrics["attempts"], metrics["retries"], metrics["successes"]), (3, 2, 1))
+
+    def test_jitter_stays_within_backoff(self):
+        policy = self.make_policy(base_delay=1.0, max_delay=4.0)
+        for retry_number in range(1, 6):
+            delay = policy.compute_delay(retry_number)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(4.0, 2 ** (retry_number - 1)))
+
+    def test_bounded_attempts(self):
+        policy = self.make_policy(max_attempts=3, jitter=False)
+        func = flaky(10)
+
+        with self.assertRaises(TransientError):
+            policy.call(func)
+        self.assertEqual(func.state["calls"], 3, "No more than max_attempts calls should be made")
+        self.assertEqual(policy.metrics()["failures"], 1)
+
+    def test_non_retryable_errors_are_raised_immediately(self):
+        policy = self.make_policy()
+
+        def func():
+            raise FatalError("bad request")
+
+        with self.assertRaises(FatalError):
+            policy.call(func)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_retry_after_and_time_budget(self):
+        policy = self.make_policy(max_attempts=10, total_timeout=10.0)
+
+        def func():
+            error = TransientError("rate limited")
+            error.retry_after = 4.0
+            raise error
+
+        with self.assertRaises(TransientError):
+            policy.call(func)
+        self.assertEqual(self.clock.sleeps, [4.0, 4.0], "Retry-After should be honored until the budget runs out")
+
+    def test_circuit_breaker_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30.0, clock=self.clock)
+        policy = self.make_policy(max_attempts=1, circuit_breaker=breaker)
+        func = flaky(2)
+
+        for _ in range(2):
+            with self.assertRaises(TransientError):
+                policy.call(func)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            policy.call(func)
+        self.assertEqual(func.state["calls"], 2, "Open circuit should not call the upstream")
+
+        self.clock.now += 30.0
+        self.assertEqual(policy.call(func), "ok", "Half-open trial call should go through")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(policy.metrics()["circuit_rejections"], 1)
+
+
+class TestAsyncRetryPolicy(unittest.IsolatedAsyncioTestCase):
+    async def test_call_async(self):
+        policy = RetryPolicy(classify=classify, base_delay=0.001, jitter=False)
+        sync_func = flaky(1)
+
+        async def func():
+            return sync_func()
+
+        self.assertEqual(await policy.call_async(func), "ok")
+        self.assertEqual(policy.metrics()["retries"], 1)
+
+
+class TestParseRetryAfter(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0, "Past dates mean no wait")
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
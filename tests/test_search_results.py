@@ -0,0 +1,90 @@
+import json
+import sys
+import unittest
+from unittest.mock import patch
+from src.integration_nodes import TavilyAPI
+from src.search_results import SearchResult, SearchResponse, parse_search_response, json_default
+from src.utils.cache import SQLiteCache
+
+RAW_PAYLOAD = {
+    "query": "AI advancements",
+    "answer": "AI is advancing quickly.",
+    "follow_up_questions": ["What is next?"],
+    "images": ["https://images.example.com/1.jpg"],
+    "results": [
+        {"title": "AI Trends", "url": "http://example.com/ai", "content": "AI is transforming industries.",
+         "score": 0.9, "raw_content": "Full page text " * 100, "published_date": "2024-05-01"},
+        {"title": "AI Predictions"},
+        "not a result",
+    ],
+    "response_time": 1.2,
+}
+
+
+class TestSearchResults(unittest.TestCase):
+    """
+    Tests for the compact search records.
+    """
+
+    def test_parse_keeps_only_the_used_fields(self):
+        response = parse_search_response(RAW_PAYLOAD)
+
+        self.assertIsInstance(response, SearchResponse)
+        self.assertIsNone(response.raw)
+        self.assertEqual(len(response.results), 2, "Invalid result entries are dropped")
+        first = response.results[0]
+        self.assertEqual((first.title, first.url, first.score), ("AI Trends", "http://example.com/ai", 0.9))
+        self.assertFalse(hasattr(first, "__dict__"), "Records should not carry a per-instance dict")
+        self.assertLess(sys.getsizeof(first), sys.getsizeof(RAW_PAYLOAD["results"][0]))
+
+    def test_records_read_like_the_json_dicts(self):
+        response = parse_search_response(RAW_PAYLOAD)
+        second = response["results"][1]
+
+        self.assertEqual(response["query"], "AI advancements")
+        self.assertIn("results", response)
+        self.assertNotIn("images", response)
+        self.assertNotIn("url", second)
+        self.assertEqual(second.get("content", ""), "")
+        self.assertEqual(second, {"title": "AI Predictions"})
+        self.assertEqual(response.results[0].replace(score=0.1)["score"], 0.1)
+        with self.assertRaises(KeyError):
+            second["url"]
+
+    def test_json_round_trip(self):
+        response = parse_search_response(RAW_PAYLOAD)
+        encoded = json.dumps({"search_results": response}, default=json_default)
+
+        decoded = json.loads(encoded)["search_results"]
+        self.assertEqual(decoded["results"][1], {"title": "AI Predictions"})
+        self.assertNotIn("raw_content", decoded["results"][0])
+        self.assertEqual(parse_search_response(decoded), response)
+
+    def test_keep_raw_and_non_search_payloads(self):
+        response = parse_search_response(RAW_PAYLOAD, keep_raw=True)
+        self.assertIs(response.raw, RAW_PAYLOAD)
+
+        error_body = {"detail": "Unauthorized"}
+        self.assertIs(parse_search_response(error_body), error_body)
+        self.assertIsNone(parse_search_response(None))
+        self.assertIs(parse_search_response(response), response)
+        self.assertEqual(SearchResult(url="http://example.com").to_dict(), {"url": "http://example.com"})
+
+    @patch("requests.Session.post")
+    def test_tavily_api_caches_compact_results(self, mock_post):
+        mock_post.return_value.json.return_value = RAW_PAYLOAD
+        cache = SQLiteCache(":memory:")
+
+        first = TavilyAPI(cache=cache).search("AI advancements")
+        second = TavilyAPI(cache=cache).search("AI advancements")
+        raw = TavilyAPI(keep_raw=True).search("AI advancements other")
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertIsInstance(second, SearchResponse)
+        self.assertEqual(first, second)
+        self.assertNotIn("images", cache.get("ai advancements"))
+        self.assertIs(raw.raw, RAW_PAYLOAD)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from src.langgraph_workflow import WorkflowEngine
+from src.search_results import SearchResponse
+from src.semantic_cache import SemanticCache, embed_query, DEFAULT_THRESHOLD
+from tests.helpers import use_fake_encoding
+
+
+class TestSemanticCache(unittest.TestCase):
+    """
+    Tests for the semantic answer cache.
+    """
+
+    def test_paraphrases_hit_and_unrelated_queries_miss(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.store("What is LangChain?", "LangChain answer")
+        cache.store("latest trends in machine learning", "ML answer")
+
+        answer, matched_query, similarity = cache.lookup("explain langchain")
+        self.assertEqual((answer, matched_query), ("LangChain answer", "What is LangChain?"))
+        self.assertAlmostEqual(similarity, 1.0, places=5)
+        self.assertEqual(cache.lookup("Latest trends in machine-learning!")[0], "ML answer")
+        self.assertIsNone(cache.lookup("LangChain vs LlamaIndex"))
+        self.assertIsNone(cache.lookup("Explain the"), "Queries without content words never match")
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_embedding_is_stable_and_normalized(self):
+        indices, values = embed_query("Machine learning trends")
+        self.assertAlmostEqual(float((values ** 2).sum()), 1.0, places=5)
+        self.assertEqual(sorted(indices.tolist()), sorted(embed_query("trends: machine LEARNING")[0].tolist()))
+
+    def test_questions_with_different_meanings_miss(self):
+        cache = SemanticCache()
+        self.assertEqual(cache.threshold, DEFAULT_THRESHOLD)
+        cache.store("Why did the stock market crash in 2008?", "Causes")
+        cache.store("Who is the CEO of OpenAI?", "Current CEO")
+        cache.store("capital of France", "Paris")
+
+        for query in [
+            "When did the stock market crash in 2008?",
+            "How did the stock market crash in 2008?",
+            "Who was the CEO of OpenAI?",
+            "Who should be the CEO of OpenAI?",
+            "capital of Frances",
+        ]:
+            self.assertIsNone(cache.lookup(query), query)
+        self.assertEqual(cache.lookup("why did the stock market crash in 2008")[0], "Causes")
+
+    def test_different_numbers_names_or_verbs_miss(self):
+        cache = SemanticCache()
+        cache.store("What was the nominal GDP of Germany in 2023 according to the IMF?", "Germany 2023")
+        cache.store("Who won the 2022 FIFA World Cup final between Argentina and France in Qatar?", "Argentina")
+        lenient = SemanticCache(threshold=0.8)
+        lenient.store("What was the nominal GDP of Germany in 2023 according to the IMF?", "Germany 2023")
+
+        for query in [
+            "What was the nominal GDP of Germany in 2022 according to the IMF?",
+            "What was the nominal GDP of France in 2023 according to the IMF?",
+            "Who lost the 2022 FIFA World Cup final between Argentina and France in Qatar?",
+        ]:
+            self.assertIsNone(cache.lookup(query), query)
+        for query in [
+            "What was the nominal GDP of Germany in 2022 according to the IMF?",
+            "What was the nominal GDP of France in 2023 according to the IMF?",
+        ]:
+            self.assertIsNone(lenient.lookup(query), f"Numbers and names must match at any threshold: {query}")
+        self.assertEqual(
+            cache.lookup("who won the 2022 fifa world cup final between argentina and france in qatar")[0], "Argentina"
+        )
+
+    def test_similarity_at_the_threshold_is_a_hit(self):
+        cache = SemanticCache(threshold=0.9)
+        cache.store("alpha beta gamma delta epsilon zeta eta theta iota kappa", "stored")
+        _, _, similarity = cache.lookup("alpha beta gamma delta epsilon zeta eta theta iota lambda") or (None, None, None)
+
+        self.assertIsNotNone(similarity, "Float32 rounding must not decide a similarity of exactly 0.9")
+        self.assertAlmostEqual(similarity, 0.9, places=5)
+
+    def test_search_returns_top_k(self):
+        cache = SemanticCache()
+        for query in ["AI in healthcare", "AI in finance", "transformer model efficiency"]:
+            cache.store(query, query.upper())
+
+        results = cache.search("AI healthcare", k=2)
+
+        self.assertEqual([query for query, _ in results], ["AI in healthcare", "AI in finance"])
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SemanticCache(max_entries=2)
+        cache.store("quantum computing", 1)
+        cache.store("protein folding", 2)
+        cache.lookup("quantum computing")
+        cache.store("quantum computing", 10)  # Replaces, does not grow
+        cache.store("fusion energy", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertIsNone(cache.lookup("protein folding"))
+        self.assertEqual(cache.lookup("quantum computing")[0], 10)
+        self.assertEqual(cache.lookup("fusion energy")[0], 3)
+
+    def test_entries_expire(self):
+        cache = SemanticCache(ttl=60)
+        with patch("src.semantic_cache.time.time", return_value=1000.0):
+            cache.store("quantum computing", 1)
+        with patch("src.semantic_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.lookup("quantum computing"))
+
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "semantic.npz")
+            cache = SemanticCache(path=path)
+            for idx, query in enumerate(["quantum computing", "protein folding", "fusion energy"]):
+                cache.store(query, {"gpt_response": f"answer {idx}"})
+            cache.lookup("quantum computing")
+            cache.save()
+
+            reloaded = SemanticCache(path=path)
+            smaller = SemanticCache(max_entries=2, path=path)
+            other_dim = SemanticCache(dim=64, path=path)
+
+        self.assertEqual(reloaded.lookup("quantum computing")[0], {"gpt_response": "answer 0"})
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(len(smaller), 2, "Only the most recently used entries are loaded")
+        self.assertIsNone(smaller.lookup("protein folding"))
+        self.assertEqual(len(other_dim), 0, "Files from another embedding are ignored")
+
+
+class TestEngineSemanticCache(unittest.TestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    def test_engine_answers_paraphrases_from_the_cache(self):
+        tavily_api = MagicMock()
+        tavily_api.search.return_value = {
+            "results": [{"content": "LangChain is a framework for LLM apps.", "url": "http://example.com/lc"}]
+        }
+        openai_node = MagicMock()
+        openai_node.generate_response.return_value = "A framework for LLM applications."
+        engine = WorkflowEngine(tavily_api=tavily_api, openai_node=openai_node, semantic_cache=SemanticCache())
+
+        first = engine.run("What is LangChain?")
+        second = engine.run("explain langchain")
+        events = list(engine.stream("Explain LangChain"))
+
+        self.assertNotIn("semantic_cache", first)
+        self.assertEqual(second["gpt_response"], "A framework for LLM applications.")
+        self.assertEqual(second["semantic_cache"]["query"], "What is LangChain?")
+        self.assertEqual(second["relevant_links"], ["http://example.com/lc"])
+        self.assertIsInstance(second["search_results"], SearchResponse)
+        self.assertEqual([event["type"] for event in events], ["search_results", "delta", "result"])
+        self.assertEqual(tavily_api.search.call_count, 1)
+        self.assertEqual(openai_node.generate_response.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
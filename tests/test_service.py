@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch, MagicMock
+from src.service import WorkflowServer
+from src.integration_nodes import TavilyAPI, OpenAINode
+from src.langgraph_workflow import WorkflowEngine
+from src.utils.metrics import MetricsRegistry
+from benchmarks.stub_servers import tavily_stub, openai_stub
+from tests.helpers import use_fake_encoding
+
+
+def request(url, payload=None):
+    """
+    Send a GET (or a POST with a JSON payload) and return (status, headers, parsed body).
+    """
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as response:
+            status, headers, body = response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        status, headers, body = e.code, e.headers, e.read()
+    if headers.get("Content-Type") == "application/json":
+        body = json.loads(body)
+    return status, headers, body
+
+
+class BlockingEngine:
+    """
+    Engine stand-in whose queries wait until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def run(self, query):
+        self.release.wait(5)
+        return {"search_results": {"results": []}, "gpt_response": f"Answer to {query}"}
+
+
+class TestWorkflowServer(unittest.TestCase):
+    """
+    Tests for the HTTP service: JSON contract, backpressure, draining and health/metrics.
+    """
+
+    def setUp(self):
+        use_fake_encoding(self)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "Timed out waiting for the server")
+            time.sleep(0.005)
+
+    def start_in_background(self, func, *args):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(func(*args)))
+        thread.start()
+        return thread, results
+
+    def test_query_against_upstream_stand_ins(self):
+        with tavily_stub() as tavily_server, openai_stub() as openai_server:
+            environ = {"TAVILY_BASE_URL": tavily_server.url, "OPENAI_BASE_URL": f"{openai_server.url}/v1"}
+            with patch.dict(os.environ, environ):
+                engine = WorkflowEngine(tavily_api=TavilyAPI(), openai_node=OpenAINode())
+            with WorkflowServer(engine, port=0, registry=MetricsRegistry()) as server:
+                status, _, body = request(f"{server.url}/query", {"query": "AI trends"})
+                bad_status, _, bad_body = request(f"{server.url}/query", {"query": "  "})
+            engine.close()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["gpt_response"], "Synthetic answer about AI trends.")
+        self.assertEqual(len(body["relevant_links"]), 3)
+        self.assertEqual(bad_status, 400)
+        self.assertIn("error", bad_body)
+
+    def test_workflow_errors_return_502(self):
+        engine = MagicMock()
+        engine.run.return_value = {"error": "No results found from Tavily API."}
+
+        with WorkflowServer(engine, port=0, registry=MetricsRegistry()) as server:
+            status, _, body = request(f"{server.url}/query", {"query": "AI trends"})
+
+        self.assertEqual(status, 502)
+        self.assertEqual(body, {"error": "No results found from Tavily API."})
+
+    def test_rejects_requests_beyond_the_queue(self):
+        engine = BlockingEngine()
+        registry = MetricsRegistry()
+        with WorkflowServer(engine, port=0, max_concurrency=1, max_queue=1, registry=registry) as server:
+            admitted = [self.start_in_background(request, f"{server.url}/query", {"query": f"q{idx}"})
+                        for idx in range(2)]
+            self.wait_for(lambda: server.health()["running"] == 1 and server.health()["queued"] == 1)
+
+            status, headers, body = request(f"{server.url}/query", {"query": "one too many"})
+            engine.release.set()
+            for thread, _ in admitted:
+                thread.join()
+            _, _, metrics = request(f"{server.url}/metrics")
+
+        self.assertEqual(status, 503)
+        self.assertEqual(headers.get("Retry-After"), "1")
+        self.assertIn("capacity", body["error"])
+        self.assertEqual(sorted(results[0][0] for _, results in admitted), [200, 200])
+        self.assertIn('service_rejected_total{reason="capacity"} 1\n', metrics.decode("utf-8"))
+        self.assertIn('service_requests_total{status="200"} 2\n', metrics.decode("utf-8"))
+
+    def test_drain_finishes_in_flight_requests(self):
+        engine = BlockingEngine()
+        server = WorkflowServer(engine, port=0, max_concurrency=2, registry=MetricsRegistry()).start()
+        in_flight, in_flight_results = self.start_in_background(request, f"{server.url}/query", {"query": "AI"})
+        self.wait_for(lambda: server.health()["running"] == 1)
+
+        stopping, _ = self.start_in_background(server.stop, 5)
+        self.wait_for(lambda: server.draining)
+        health_status, _, health = request(f"{server.url}/health")
+        rejected_status, _, _ = request(f"{server.url}/query", {"query": "late"})
+        engine.release.set()
+        in_flight.join()
+        stopping.join()
+
+        self.assertEqual((health_status, health["status"]), (503, "draining"))
+        self.assertEqual(rejected_status, 503)
+        self.assertEqual(in_flight_results[0][0], 200, "Admitted requests should complete during the drain")
+        self.assertEqual(in_flight_results[0][2]["gpt_response"], "Answer to AI")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.singleflight import SingleFlight
+from benchmarks.stub_servers import tavily_stub
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        """
+        Test that concurrent calls with the same key run the function once and share its result.
+        """
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def upstream():
+            calls.append(1)
+            started.set()
+            release.wait(1)
+            return {"results": ["shared"]}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(single_flight.do, "what is langchain?", upstream)
+            started.wait(1)
+            followers = [executor.submit(single_flight.do, "what is langchain?", upstream) for _ in range(4)]
+            while single_flight.metrics()["coalesced"] < 4:
+                time.sleep(0.001)
+            release.set()
+            results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(len(calls), 1, "Upstream should be called once")
+        self.assertTrue(all(result is results[0] for result in results), "All callers should share the result")
+        self.assertEqual(single_flight.metrics(), {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0})
+
+    def test_errors_propagate_to_all_callers(self):
+        """
+        Test that an exception in the shared call reaches every waiting caller, and the key is released.
+        """
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def upstream():
+            started.set()
+            release.wait(1)
+            raise RuntimeError("upstream failed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, "key", upstream)
+            started.wait(1)
+            follower = executor.submit(single_flight.do, "key", upstream)
+            while single_flight.metrics()["coalesced"] < 1:
+                time.sleep(0.001)
+            release.set()
+            for future in (leader, follower):
+                with self.assertRaises(RuntimeError):
+                    future.result()
+
+        self.assertEqual(single_flight.do("key", lambda: "recovered"), "recovered", "Key should be released")
+
+    def test_tavily_searches_coalesce(self):
+        """
+        Test that identical concurrent Tavily searches send a single upstream request.
+        """
+        from src.integration_nodes import TavilyAPI
+
+        with tavily_stub(latency=0.2) as server:
+            tavily_api = TavilyAPI(single_flight=SingleFlight())
+            tavily_api.base_url = f"{server.url}/search"
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(tavily_api.search, ["AI trends", "ai trends", " AI  trends", "AI trends"]))
+            tavily_api.close()
+
+        self.assertTrue(all(result is not None for result in results))
+        self.assertEqual(server.request_count, 1, "Identical in-flight searches should be coalesced")
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_do_async(self):
+        """
+        Test coalescing and error propagation on an event loop.
+        """
+        single_flight = SingleFlight()
+        calls = []
+
+        async def upstream(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            if value == "bad":
+                raise ValueError("bad query")
+            return value.upper()
+
+        results = await asyncio.gather(*(single_flight.do_async("ok", upstream, "ok") for _ in range(3)))
+        self.assertEqual(results, ["OK"] * 3)
+
+        errors = await asyncio.gather(*(single_flight.do_async("bad", upstream, "bad") for _ in range(2)),
+                                      return_exceptions=True)
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+        self.assertEqual(calls, ["ok", "bad"])
+        self.assertEqual(single_flight.metrics()["coalesced"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("openai", "requests", "httpx", "tiktoken", "numpy", "dotenv", "langchain", "asyncio")
+
+
+def modules_loaded_by_import(module):
+    """
+    Import a module in a fresh isolated interpreter and return the heavy modules it loaded.
+    """
+    code = (
+        f"import sys; sys.path.insert(0, {ROOT!r}); import {module}; "
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    completed = subprocess.run([sys.executable, "-I", "-c", code], capture_output=True, text=True, check=True)
+    return [name for name in completed.stdout.strip().split(",") if name]
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Guards cold start: heavy libraries must be imported on first use, not at import time.
+    """
+
+    def test_workflow_import_is_lazy(self):
+        self.assertEqual(modules_loaded_by_import("src.langgraph_workflow"), [])
+
+    def test_main_import_is_lazy(self):
+        self.assertEqual(modules_loaded_by_import("src.main"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
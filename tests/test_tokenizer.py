@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch
+from src.utils import tokenizer
+from src.utils.tokenizer import (
+    count_tokens, count_tokens_batch, count_message_tokens, context_window, get_encoding, clear_token_memo
+)
+from tests.helpers import make_fake_encoding
+
+
+class TestTokenizer(unittest.TestCase):
+    def setUp(self):
+        get_encoding.cache_clear()
+        clear_token_memo()
+
+    def tearDown(self):
+        get_encoding.cache_clear()
+        clear_token_memo()
+
+    @patch("tiktoken.encoding_for_model")
+    def test_encoding_loaded_once_per_model(self, mock_encoding_for_model):
+        """
+        Test that the encoding lookup is cached per model.
+        """
+        mock_encoding_for_model.side_effect = lambda model: make_fake_encoding()
+
+        count_tokens("AI is transforming industries.")
+        count_tokens("Predictions for AI in 2024.")
+        count_tokens("Predictions for AI in 2024.", model="gpt-3.5-turbo")
+
+        self.assertEqual(mock_encoding_for_model.call_count, 2, "Encoding should be loaded once per model")
+
+    @patch("tiktoken.encoding_for_model")
+    def test_batch_counts_only_unseen_texts(self, mock_encoding_for_model):
+        """
+        Test that the batch path encodes unseen texts in one call and memoizes counts.
+        """
+        encoding = make_fake_encoding()
+        mock_encoding_for_model.return_value = encoding
+
+        self.assertEqual(count_tokens("AI is transforming industries."), 4)
+        counts = count_tokens_batch(["AI is transforming industries.", "Generative AI", "Generative AI"])
+
+        self.assertEqual(counts, [4, 2, 2], "Counts should be returned in input order")
+        self.assertEqual(encoding.encode_batch.call_args_list[-1].args[0], ["Generative AI"],
+                         "Only the unseen text should be encoded, once")
+
+        count_tokens_batch(["Generative AI"])
+        self.assertEqual(encoding.encode_batch.call_count, 2, "Memoized texts should not be re-tokenized")
+
+    @patch("tiktoken.encoding_for_model")
+    def test_memo_is_bounded(self, mock_encoding_for_model):
+        """
+        Test that the memo evicts the oldest entries once it reaches its size limit.
+        """
+        mock_encoding_for_model.return_value = make_fake_encoding()
+
+        with patch.object(tokenizer, "TOKEN_MEMO_SIZE", 2):
+            count_tokens_batch(["one", "two words", "three more words"])
+            self.assertEqual(len(tokenizer._token_memo), 2, "Memo should not grow past its limit")
+
+    def test_context_window_lookup(self):
+        """
+        Test that dated and fine-tuned model names resolve to their base model's window.
+        """
+        self.assertEqual(context_window("gpt-4"), 8192)
+        self.assertEqual(context_window("gpt-4-32k-0613"), 32768)
+        self.assertEqual(context_window("gpt-4o-2024-08-06"), 128000)
+        self.assertEqual(context_window("ft:gpt-4o-mini:acme::abc123"), 128000)
+        self.assertEqual(context_window("unknown-model"), tokenizer.DEFAULT_CONTEXT_WINDOW)
+
+    @patch("tiktoken.encoding_for_model")
+    def test_count_message_tokens_includes_chat_formatting(self, mock_encoding_for_model):
+        """
+        Test that message counts include every field plus the per-message and reply priming tokens.
+        """
+        mock_encoding_for_model.return_value = make_fake_encoding()
+        messages = [
+            {"role": "system", "content": "You are helpful."},
+            {"role": "user", "content": "What is LangChain?", "name": "analyst"},
+        ]
+
+        # Fields: 1 + 3 + 1 + 3 + 1 tokens; 3 per message, 1 for the name and 3 to prime the reply
+        self.assertEqual(count_message_tokens(messages), 9 + 2 * 3 + 1 + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
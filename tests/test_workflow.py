@@ -1,15 +1,30 @@
+import asyncio
+import re
+import threading
+import time
 import unittest
-from unittest.mock import patch, MagicMock
-from src.integration_nodes import TavilyAPI, OpenAINode
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, AsyncMock
+from src.integration_nodes import TavilyAPI, OpenAINode, AsyncTavilyAPI, AsyncOpenAINode
+from src.utils.tokenizer import clear_token_memo
 from src.langgraph_workflow import (
     fetch_search_results,
     process_search_results,
+    select_context,
     generate_response,
-    ai_workflow
+    ai_workflow,
+    ai_workflow_async,
+    ai_workflow_stream,
+    get_default_engine,
+    WorkflowEngine
 )
+from tests.helpers import use_fake_encoding
 
 
 class TestLangGraphWorkflow(unittest.TestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
     @patch("src.integration_nodes.TavilyAPI.search")
     def test_fetch_search_results(self, mock_search):
         """
@@ -60,6 +75,23 @@ class TestLangGraphWorkflow(unittest.TestCase):
         self.assertIn("Predictions for AI in 2024.", context, "Second result should be included")
         self.assertNotIn("Generative AI", context, "Excess results should not be included")
 
+    def test_select_context_counts_the_separators(self):
+        """
+        Test that the reported context tokens include the separators between snippets.
+        """
+        encoding = MagicMock()
+        encoding.encode.side_effect = lambda text: re.findall(r"\n\n|\S+", text)
+        encoding.encode_batch.side_effect = lambda texts: [re.findall(r"\n\n|\S+", text) for text in texts]
+        search_results = {"results": [{"content": "AI is transforming industries."}, {"content": "Predictions for AI."}]}
+
+        clear_token_memo()
+        with patch("src.utils.tokenizer.get_encoding", return_value=encoding):
+            context, tokens = select_context(search_results, max_results=2)
+        clear_token_memo()
+
+        self.assertEqual(context, "AI is transforming industries.\n\nPredictions for AI.")
+        self.assertEqual(tokens, 8)
+
     @patch("src.integration_nodes.OpenAINode.generate_response")
     def test_generate_response(self, mock_openai_response):
         """
@@ -115,6 +147,216 @@ class TestLangGraphWorkflow(unittest.TestCase):
             "Search results should include two items"
         )
 
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    @patch("src.integration_nodes.OpenAINode._generate_upstream")
+    @patch("src.integration_nodes.TavilyAPI._search_upstream")
+    def test_ai_workflow_coalesces_identical_queries(self, mock_search, mock_generate, mock_select_context):
+        """
+        Test that concurrent ai_workflow calls for the same query share one search and one generation.
+        """
+        release = threading.Event()
+
+        def slow_search(query):
+            release.wait(1)
+            return {"results": [{"content": "AI is transforming industries.", "url": "http://example.com/ai"}]}
+
+        mock_search.side_effect = slow_search
+        mock_generate.return_value = "Multimodal models."
+
+        search_flights = get_default_engine().tavily_api.single_flight
+        coalesced_before = search_flights.metrics()["coalesced"]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(ai_workflow, query) for query in ["AI trends", "ai trends", "AI  trends"]]
+            while search_flights.metrics()["coalesced"] - coalesced_before < 2:
+                time.sleep(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertTrue(all(result["gpt_response"] == "Multimodal models." for result in results))
+        self.assertEqual(mock_search.call_count, 1, "Identical searches should be coalesced")
+
+    @patch("src.integration_nodes.TavilyAPI._post")
+    def test_engines_do_not_share_in_flight_searches(self, mock_search):
+        """
+        Test that identical searches of engines with different settings are not coalesced.
+        """
+        release = threading.Event()
+        raw_payload = {"results": [{"content": "AI is transforming industries.", "url": "http://example.com/ai"}]}
+
+        def slow_search(payload):
+            release.wait(1)
+            response = MagicMock()
+            response.json.return_value = raw_payload
+            return response
+
+        mock_search.side_effect = slow_search
+        compact_engine = WorkflowEngine()
+        raw_engine = WorkflowEngine(keep_raw=True)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(engine.tavily_api.search, "AI trends") for engine in (compact_engine, raw_engine)]
+            while mock_search.call_count < 2:
+                time.sleep(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertIsNot(compact_engine.tavily_api.single_flight, raw_engine.tavily_api.single_flight)
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertIsNone(results[0].raw)
+        self.assertIs(results[1].raw, raw_payload, "keep_raw must not receive the other engine's result")
+
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    def test_ai_workflow_stream(self, mock_select_context):
+        """
+        Test that the streaming workflow yields search results, deltas and a timed final result.
+        """
+        tavily_api = MagicMock()
+        tavily_api.search.return_value = {
+            "results": [{"content": "AI is transforming industries.", "url": "http://example.com/ai"}]
+        }
+        openai_node = MagicMock()
+        openai_node.generate_stream.return_value = iter(["Multimodal ", "models."])
+
+        events = list(ai_workflow_stream("AI advancements", tavily_api, openai_node))
+
+        self.assertEqual([event["type"] for event in events], ["search_results", "delta", "delta", "result"])
+        result = events[-1]["result"]
+        self.assertEqual(result["gpt_response"], "Multimodal models.")
+        self.assertLessEqual(result["timings"]["time_to_first_token"], result["timings"]["generation_time"])
+
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    def test_ai_workflow_stream_generation_error(self, mock_select_context):
+        """
+        Test that an empty stream ends with an error result.
+        """
+        tavily_api = MagicMock()
+        tavily_api.search.return_value = {"results": [{"content": "AI is transforming industries."}]}
+        openai_node = MagicMock()
+        openai_node.generate_stream.return_value = iter([])
+
+        events = list(ai_workflow_stream("AI advancements", tavily_api, openai_node))
+
+        self.assertIn("error", events[-1]["result"])
+        self.assertIsNone(events[-1]["result"]["timings"]["time_to_first_token"])
+
+
+class TestWorkflowEngine(unittest.TestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    @patch("src.integration_nodes.OpenAINode.generate_response", return_value="Multimodal models.")
+    @patch("src.integration_nodes.TavilyAPI.search")
+    def test_engine_reuses_nodes_across_queries(self, mock_search, mock_generate):
+        """
+        Test that an engine builds its nodes once and shares them across threads.
+        """
+        mock_search.return_value = {
+            "results": [{"content": "AI is transforming industries.", "url": "http://example.com/ai"}]
+        }
+
+        with patch("src.integration_nodes.get_api_keys", return_value=("tavily-key", "openai-key")) as mock_keys:
+            engine = WorkflowEngine()
+            batch = engine.run_many([f"AI trends {idx}" for idx in range(8)], max_concurrency=4)
+
+        self.assertEqual(batch["summary"]["successful"], 8)
+        self.assertEqual(mock_keys.call_count, 2, "API keys should be read once per node, not per query")
+        self.assertIs(engine.tavily_api, engine.tavily_api)
+        self.assertEqual(batch["entries"][0]["results"]["relevant_links"], ["http://example.com/ai"])
+
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    def test_engine_applies_its_settings(self, mock_select_context):
+        """
+        Test that the engine's context settings reach select_context.
+        """
+        tavily_api = MagicMock()
+        tavily_api.search.return_value = {"results": [{"content": "AI is transforming industries."}]}
+        openai_node = MagicMock()
+        openai_node.generate_response.return_value = "Multimodal models."
+        engine = WorkflowEngine(
+            tavily_api=tavily_api, openai_node=openai_node, model="gpt-4o", max_tokens=500, max_results=2,
+            rerank=False
+        )
+
+        results = engine.run("AI advancements")
+
+        self.assertEqual(results["gpt_response"], "Multimodal models.")
+        mock_select_context.assert_called_once_with(
+            tavily_api.search.return_value, 2, None, max_tokens=500, model="gpt-4o", max_passages=None
+        )
+        openai_node.generate_response.assert_called_once_with(
+            "AI is transforming industries.", "AI advancements", context_tokens=5
+        )
+
+    def test_engine_rejects_empty_query(self):
+        """
+        Test that the engine keeps the workflow's error contract and builds no nodes for invalid input.
+        """
+        engine = WorkflowEngine()
+        self.assertEqual(engine.run("  "), {"error": "Invalid user query. The query cannot be empty."})
+        self.assertIsNone(engine._nodes["tavily"])
+
+
+class TestAsyncWorkflow(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        use_fake_encoding(self)
+
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    async def test_ai_workflow_async(self, mock_process):
+        """
+        Test the end-to-end async workflow with concurrent queries sharing nodes.
+        """
+        tavily_api = AsyncTavilyAPI(client=MagicMock())
+        tavily_api.search = AsyncMock(return_value={
+            "results": [{"content": "AI is transforming industries.", "url": "http://example.com/ai"}]
+        })
+        openai_node = AsyncOpenAINode(client=MagicMock())
+        openai_node.generate_response = AsyncMock(return_value="Multimodal models.")
+
+        results = await asyncio.gather(*(
+            ai_workflow_async(query, tavily_api, openai_node) for query in ["AI advancements", "AI trends"]
+        ))
+
+        for result in results:
+            self.assertEqual(result["gpt_response"], "Multimodal models.", "Response should match the mocked value")
+            self.assertEqual(result["relevant_links"], ["http://example.com/ai"])
+        self.assertEqual(tavily_api.search.await_count, 2, "Each query should issue its own search")
+
+    async def test_ai_workflow_async_empty_query(self):
+        """
+        Test that the async workflow rejects empty queries with the same error contract.
+        """
+        results = await ai_workflow_async("   ")
+        self.assertIn("error", results, "Empty query should return an error")
+
+    async def test_ai_workflow_async_search_error(self):
+        """
+        Test that a failed search returns an error dict.
+        """
+        tavily_api = AsyncTavilyAPI(client=MagicMock())
+        tavily_api.search = AsyncMock(return_value=None)
+        openai_node = AsyncOpenAINode(client=MagicMock())
+
+        results = await ai_workflow_async("AI advancements", tavily_api, openai_node)
+        self.assertEqual(results, {"error": "No results found from Tavily API."})
+
+    @patch("src.langgraph_workflow.select_context", return_value=("AI is transforming industries.", 5))
+    async def test_engine_run_async(self, mock_select_context):
+        """
+        Test that concurrent tasks can share one engine's async nodes.
+        """
+        tavily_api = AsyncTavilyAPI(client=MagicMock())
+        tavily_api.search = AsyncMock(return_value={
+            "results": [{"content": "AI is transforming industries.", "url": "http://example.com/ai"}]
+        })
+        openai_node = AsyncOpenAINode(client=MagicMock())
+        openai_node.generate_response = AsyncMock(return_value="Multimodal models.")
+        engine = WorkflowEngine(async_tavily_api=tavily_api, async_openai_node=openai_node)
+
+        results = await asyncio.gather(*(engine.run_async(query) for query in ["AI advancements", "AI trends"]))
+
+        self.assertEqual([result["gpt_response"] for result in results], ["Multimodal models."] * 2)
+        self.assertEqual(openai_node.generate_response.await_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()